@@ -1,7 +1,7 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 ##############################################################################################################
 # HouseHeatingCurve.py 
-# Last Update: December 26th 2019
+# Last Update: October 16th 2026
 # V0.1 : Initial Creation
 # V0.2 : Update comments, added scaling on placement of text labels in the plot, added Gas Sensor.
 # V0.3 : Added option to read data from .csv file i.s.o. Domoticz query.
@@ -10,6 +10,34 @@
 # V0.4 : Added python reference for shell in first line of the script, made csv as data source default
 # V0.41: Added Python3 style urllib with fallback for python 2 style changed some constructs to be python3.5 compatible.
 # v0.5 : Added Gas Only file option with temperature query from KNMI, updated introduction.
+# V0.6 : Replaced the nested KNMI/Gas date loop with a hash join supporting inner, left and nearest date joins,
+#        the Main part only runs when the script is executed, added HouseHeatingCurveBenchmark.py.
+# V0.61: Added a KNMI temperature cache file so only missing dates are queried, added an offline mode.
+# V0.62: The .csv files are parsed straight into numpy arrays and converted with whole array operations.
+# V0.63: Replaced curve_fit by a one pass straight line fit on sums of the samples, removing the need for scipy.
+# V0.64: Added a batch mode analysing the houses of a manifest file in parallel processes.
+# V0.65: Added headless report rendering to png/svg/pdf files in background processes reusing the figure.
+# V0.66: Days per year below a temperature are looked up in a cumulative index, also for arrays of temperatures.
+# V0.67: Moved the temperature distributions per period to DaysPerYearAverageTemperature.npy, the period is now 
+#        configurable and the yearly energy is also estimated over all periods.
+# V0.68: The temperature distribution can be built from the KNMI data of a selectable station and years.
+# V0.69: The Domoticz sensors are queried concurrently over kept open connections, with timeout and retries.
+# V0.70: Domoticz responses are parsed while they are read and reading stops after the analyses window.
+# V0.71: Domoticz sensor data is merged into typed columns on a sorted date index instead of a dictionary.
+# V0.72: Added a live mode that adds new days to the fit as they arrive and serves the results as JSON.
+# V0.73: Added rolling fits over a number of days and fits per heating season.
+# V0.74: Added bootstrap intervals of the fit, heating power and yearly energy.
+# V0.75: Added robust (Huber) and hinge heating curve models next to the straight line fit.
+# V0.76: Added optional time, bytes, samples, memory and profile measurements of the stages of a run.
+# V0.77: Added library functions taking a config, matplotlib and the SSL context are only loaded when used.
+# V0.78: KNMI data is parsed as bytes with numpy, the etmgeg_ files of the KNMI can be used instead of the site.
+# V0.79: Added station coordinates and a weighted average of the nearest stations to the house, in batch mode the
+#        KNMI temperatures of all houses are fetched once and shared with the worker processes.
+# V0.80: Added an hourly analysis of hourly gas, Domoticz short log and KNMI hourly data with degree hours.
+# V0.81: Added a simulation of the heat pump models of a table over the temperature distribution.
+# V0.82: Added a sweep mode over the design point parameters with memoised fits and estimates and a Pareto front.
+# V0.83: Added versioned binary snapshots of the samples, results and config of a house that load memory-mapped.
+# V0.84: Dropped the Python 2 imports, Python 3.7 or newer is needed.
 ##############################################################################################################
 #
 # This script uses heating energy and outdoor temperature data to estimate the required heatpump capacity
@@ -45,6 +73,9 @@
 #
 # When using Domoticz as data source, make sure you update the IP adress and port number of [DomoticzHostAndPort] so
 # it reflects the correct Domoticz host for you.
+# The sensors are queried at the same time by [DomoticzWorkers] threads that each keep their connection to Domoticz
+# open for the next query. A query that fails to connect or gets no answer within [DomoticzRequestTimeout] seconds
+# is tried again up to [DomoticzRequestRetries] times.
 #
 # DataSource.FromCSVFile:
 ##########################
@@ -76,51 +107,218 @@
 # The script will query the KNMI site for average outdoor temperature data from the weather station defined by 
 # [KNMIStationToUse] between the first and last date. 
 # (Look in the StationIDDictionary below for available names to configure) example: KNMIStationToUse="Volkel"
+# Instead of one station, [HouseLatitude] and [HouseLongitude] can be set to the location of the house, the daily
+# temperature is then the average of the [KNMINearestStations] nearest stations weighted by 1/distance^[KNMIWeightPower],
+# on days a station has no value the others are used.
+#
+# The gas and KNMI data are matched on date as configured by [GasOnlyJoinType], JoinType.Inner only uses the dates
+# present in both, JoinType.Left reports the gas dates without temperature and JoinType.Nearest uses the temperature
+# of the nearest date within [NearestJoinMaxDays] days for them. Unmatched and duplicate dates are printed.
+#
+# The KNMI temperatures are stored in [KNMICacheFile] so only dates that are not in it yet are queried, the last
+# [KNMICacheRevisionDays] days before a query are queried again on a later day since the KNMI can still revise them.
+# When [KNMIOfflineMode] is set to True the KNMI is not queried at all and dates missing in the cache give an error,
+# [KNMIRequestTimeout] limits the seconds to wait for the KNMI.
+# To work offline on many years or stations, the daily data files of the KNMI (etmgeg_260.txt etc., unzipped) can be
+# put in the directory [KNMIArchiveDirectory], the temperatures are then read from those files instead of the KNMI.
 #
 # From the Gas, the Energy is estimated by deducting the amount of Gas you use for Warm Water and Cooking indicated 
 # by [CubicMetersGasADayForWarmWaterAndCooking] and multiplied with [EnergyPerCubicMeterGas] 
 # Default setting of [EnergyPerCubicMeterGas] is 31.65/3.6 which equals the energy content of Natural Gas used in Holland,
 # assuming the heater is not finely tuned to make use of additional energy from condensation of the water vapor.
 #
+# Batch Mode:
+##########################
+# When [BatchManifestFile] is set, the houses listed in that .csv file are analysed in parallel by [BatchWorkers]
+# processes (0 uses all cores) instead of the single house configured here, and nothing is plotted.
+# The manifest has a header line, the columns are House (a name), DataFile and any of the parameters in the
+# BatchHouseParameters dictionary below, e.g.: 
+# House,GetDataFrom,DataFile,KNMIStationToUse,HoursForHeatingADay
+# Home,FromCSVFileGasOnly,GasOnly.csv,Volkel,22
+# DataFile is used as [CSVFile] or [CSVGasOnlyFile] depending on GetDataFrom, parameters that are left out or blank
+# get the value configured in this script. One row of results per house is written to [BatchSummaryFile].
+# When [RenderReport] is RenderMode.File a report per house is written to [ReportFileName]_House.
+# The KNMI temperatures of all stations the houses need are fetched once before the houses are analysed and are
+# shared with all worker processes, so a station used by many houses is only fetched and parsed once.
+#
+# Heating Curve Models:
+##########################
+# The model fitted to the heating power samples is set by [HeatingCurveModel]. FitModel.Linear fits a straight line
+# through all samples. FitModel.Huber fits a straight line that gives less weight to samples further than
+# [HuberThreshold] times the spread of the samples off the line, like days with a lot of hot water, iterating at most
+# [HuberIterations] times. FitModel.Hinge fits a line up to a heating limit and a flat base level above it, so the
+# many days around zero above the heating limit do not pull the line, the limit is found in steps of [HingeLimitStep].
+# The yearly energy only counts the line below the heating limit. Rolling fits and live mode always fit a straight
+# line, bootstrap intervals are only calculated for FitModel.Linear.
+#
+# Bootstrap Intervals:
+##########################
+# Since heat pumps are sized on these results, [BootstrapResamples] can be set to a number of resamples, like 10000, to
+# also get intervals with [BootstrapConfidence] percent of the fit, heating limit, heating power and yearly energy.
+# Each resample fits the samples drawn again with replacement, [BootstrapSeed] can be set to repeat the same resamples.
+#
+# Rolling Fits:
+##########################
+# To follow how the heating curve changes over time, for example after insulating, set [RollingFitDays] to a number
+# of days. The curve is then also fitted over the [RollingFitDays] days up to each day with data and written to 
+# [RollingFitFile], and fitted per heating season starting in [HeatingSeasonStartMonth] and written to [SeasonFitFile].
+# Fits with less than [RollingFitMinimumSamples] samples are left empty. Since the [CSVFile] has no dates, its rows
+# are used as days and no season fits are made. In batch mode the files get the name of the house added.
+#
+# Live Mode:
+##########################
+# When [LiveMode] is set to True the script keeps running instead of analysing the data once. Every [LivePollSeconds]
+# seconds only the new days are read, from Domoticz or from the lines added to the .csv file, and added to the fit.
+# A day that is read again with a new value, like today in Domoticz, replaces its previous value. [DateEndAnalyses]
+# is moved to today at every poll, indoor temperature and electricity are not used and gas days are matched to the
+# KNMI on exact dates, gas days the KNMI has no temperature for yet are tried again at the next poll.
+# The latest results are served as JSON on http://[LiveHost]:[LivePort]/ for dashboards.
+#
+# Heat Pump Models:
+##########################
+# The alternative power above is a rough estimate. When [HeatPumpModelFile] is set to a .csv file with heat pump
+# performance curves, every model in it is simulated over the temperature distribution used for the yearly energy.
+# The file has a header line and the columns Model, Temperature, Capacity (kW) and COP, one line per temperature of
+# a model, e.g. the points of its datasheet. Between these temperatures the capacity and COP are interpolated, outside
+# them the value of the nearest temperature is used. At each temperature the heat pump delivers the heating power of
+# the fitted model up to its capacity, a backup heater with efficiency [BackupHeaterEfficiency] delivers the rest.
+# All models are simulated at once, so hundreds of models take about as long as one. Per model the yearly heat,
+# electricity, seasonal COP, backup heater energy, days (hours) per year the backup heater is needed and the cost
+# at [CostPerkWh] are written to [HeatPumpResultFile], the [HeatPumpPrintModels] cheapest models are printed.
+# See HeatPumpModels.csv for an example of the format with generic models.
+#
+# Design Point Sweep:
+##########################
+# To find the cheapest design point without running the script again for every setting, set [SweepMode] to True.
+# The house is then analysed for all combinations of the values in [SweepOutsideTemperatures],
+# [SweepHoursForHeatingADay], [SweepCubicMetersGasADay] and [SweepCostPerkWh], an empty list uses the value configured
+# for [OutsideTemperatureOfInterest], [HoursForHeatingADay], [CubicMetersGasADayForWarmWaterAndCooking] or [CostPerkWh].
+# The data is read once, the gas for warm water and cooking and the hours for heating only shift and scale the heating
+# power samples. Each step is remembered for the parameters it depends on: the fit for the gas and hours, the estimates
+# also for the outside temperature, so a cost only multiplies the energy and thousands of combinations take seconds.
+# The installed capacity is the heating power required at the outside temperature of interest and the annual cost is
+# that of the alternative energy below it. When [HeatPumpModelFile] is set, the installed capacity is that of the heat
+# pump model with the lowest electricity use of the models that deliver the required power at that temperature (the
+# largest one when none does), and the annual cost is the cost of its electricity including the backup heater.
+# All combinations are written to [SweepResultFile], the Pareto front of annual cost versus installed capacity per
+# cost per kWh, the points that no other point beats on both, to [SweepParetoFile], up to [SweepPrintPoints] points
+# of each front are printed.
+#
+# Snapshots:
+##########################
+# Reading and matching the data of a house is most of the time of a run. When [SnapshotExportFile] is set, the samples
+# as they are fitted (dates, outdoor and indoor temperature, heating power and electricity, after matching to the KNMI
+# and converting gas to kWh), all results and the config used are written to that file after the analysis, in batch
+# mode with the name of the house added. When [SnapshotImportFile] is set, the samples are read from that snapshot
+# instead of from [GetDataFrom] and analysed again with the config of this script, [HourlyAnalysis] has to be the same
+# as when the snapshot was written. The samples keep the [HoursForHeatingADay] and gas settings they were made with.
+# A snapshot is a small fixed header (magic, format version), the results and config as JSON and the arrays at
+# aligned offsets, so reading one only maps the file into memory and takes milliseconds. From Python code a report
+# can be drawn again from a snapshot without analysing it:
+#   Config, Results = HHC.ReadSnapshot("Home.hhcs")
+#   HHC.RenderHouseReport(Config, Results, "Home")
+#
+# Hourly Analysis:
+##########################
+# Heat pumps are sized on cold hours rather than cold days, so when [HourlyAnalysis] is set to True each sample is an
+# hour instead of a day and the heating power is the energy of that hour, [HoursForHeatingADay] is not used then.
+# - The [CSVGasOnlyFile] has the gas per hour, the date field has the hour like "2019-12-25 13:00" (minutes are
+#   ignored), it is matched to the hourly temperatures (T) of the KNMI, on hours up to [NearestJoinMaxDays] hours away
+#   with JoinType.Nearest. The KNMI gives hours in UT, [KNMIHourlyTimeOffset] hours are added to get the local time.
+# - Domoticz is queried for the short log (range=day) of the sensors instead of the daily values, the 5 minute values
+#   are binned per hour: temperatures are averaged, the gas and electricity used and the increase of the heating
+#   energy meter are added up. Domoticz only keeps the short log for the days set in its log history settings.
+# - The [CSVFile] rows are read as hours.
+# The yearly energy is estimated with the hours per year at each temperature, built from the KNMI hourly temperatures
+# of [ClimateStation] from [ClimateFirstYear] up to and including [ClimateLastYear]. Without a [ClimateStation] each
+# day of the [ClimatePeriod] distribution counts as 24 hours of its average temperature, which misses the cold nights.
+# The heating degree hours per year below the heating limit are given as well. Hourly data is 24 times as much, so
+# the files are parsed, the KNMI queried and the distribution built in chunks of [HourlyChunkDays] days. The KNMI
+# hourly temperatures are kept per day as an array of 24 values in the [KNMICacheFile], the [KNMIArchiveDirectory]
+# is only used for daily temperatures. Live mode always works per day.
+#
+# Library Use:
+##########################
+# Importing this script does not run anything, so it can also be used from other Python code. CreateConfig gives a
+# config with the parameters configured here, changed by the ones given. The config is used by LoadHouse, FitHouse,
+# EstimateHouse, AnalyseHouse, SweepHouse and RenderHouseReport, e.g.:
+#   import HouseHeatingCurve as HHC
+#   Config=HHC.CreateConfig(GetDataFrom=HHC.DataSource.FromCSVFile, CSVFile="Home.csv", HoursForHeatingADay=20.0)
+#   Results=HHC.AnalyseHouse(Config)
+#   HHC.RenderHouseReport(Config, Results, "Home")
+# Calls from several threads take turns, since the config is set for the duration of a call. matplotlib is only
+# imported when a report is drawn.
+#
+# Instrumentation:
+##########################
+# To see where the time of a run goes, set [InstrumentStages] to True. The wall time, CPU time of its thread, bytes
+# read and number of samples of each stage (reading files, querying Domoticz and the KNMI, parsing, fitting, drawing)
+# are then printed as a table at the end of the run, and appended as JSON lines to [InstrumentOutput] when set.
+# In batch mode the stages of all worker processes are in the table; reports rendered in background processes only
+# show up in [InstrumentOutput]. When [InstrumentTraceMemory] is True the peak memory of each stage is measured with
+# tracemalloc, which makes the run slower. Stages named in [InstrumentProfileStages] are run under cProfile and
+# their statistics are written to [InstrumentProfilePrefix]Stage_Process_Number.prof.
+# When [InstrumentStages] is False nothing is measured, so the stages cost no noticeable time.
+#
 # Generic Parameters:
 ###########################
 #
+# [RenderReport] selects how the results are shown, RenderMode.Window opens a plot window as before, RenderMode.File
+# writes the report without a display to [ReportFileName] in each of the [ReportFileFormats] (png, svg, pdf) and
+# RenderMode.Off only prints the results. Reports are rendered by [RenderWorkers] background processes.
+#
 # The script will calculate the required heating power at [OutsideTemperatureOfInterest] while taking into account a 
 # maximum number of hours it can run a day defined by [HoursForHeatingADay].
 #
 # It will also calculate the required maximum power of additional heating which will be required not to have 
 # the house cooling down based on historic data since 1951 from ALL KNMI weather stations in the Netherlands.
+# The yearly energy is estimated with the daily average temperature distribution of [ClimatePeriod], and as a band
+# over all periods stored in [ClimateHistogramFile].
+# Since these are averages over all stations, the distribution can instead be built from the KNMI daily average
+# temperatures of the station [ClimateStation] from [ClimateFirstYear] up to and including [ClimateLastYear].
+# The temperatures are kept in the [KNMICacheFile] so these are only queried once.
 # Based on this it will give an estimate on the amount of energy spend this way in kWh per year and the cost of
 # it based on the [CostPerkWh].
 #
 # Other defines do not need changing.
 # 
-# This script uses the scipy library package, make sure it is installed.
+# This script needs Python 3.7 or newer and uses the numpy (1.17 or newer) and matplotlib library packages, make sure
+# they are installed.
 #
 ##############################################################################################################
 # Imports
 ##############################################################################################################
 import datetime
-try:
-   #Python 3 
-   from urllib.request import Request as PostRequest
-   from urllib.request import urlopen
-   from urllib.error import HTTPError as HTTPError
-   from urllib.error import URLError as URLError
-except ImportError:
-   #Python 2
-   from urllib2 import urlopen
-   from urllib2 import Request as PostRequest
-   from urllib2 import HTTPError as HTTPError
-   from urllib2 import URLError as URLError
+from urllib.request import Request as PostRequest
+from urllib.request import urlopen
+from urllib.error import HTTPError as HTTPError
+from urllib.error import URLError as URLError
+from urllib.parse import urlsplit
+import http.client as HTTPClient
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
 import ssl
+import codecs
+import re
+import socket
+import threading
+import time
+import cProfile
+import tracemalloc
 import json
 import collections
 import csv
 import enum
-import pylab
-from scipy.optimize import curve_fit
-from scipy import argmax
+import bisect
+import itertools
+import sqlite3
+import os
+import mmap
+import concurrent.futures
+import contextlib
+import functools
+import numpy
+from numpy import argmax
 
 ##############################################################################################################
 # Definitions                                                                                                #
@@ -130,6 +328,24 @@ class DataSource(enum.Enum):
    FromCSVFile = 2
    FromCSVFileGasOnly = 3
 
+class RenderMode(enum.Enum):
+   Window = 1
+   File = 2
+   Off = 3
+
+class JoinType(enum.Enum):
+   Inner = 1
+   Left = 2
+   Nearest = 3
+
+class FitModel(enum.Enum):
+   Linear = 1
+   Huber = 2
+   Hinge = 3
+
+#The names defined between Config Start and Config End are the config parameters, see CreateConfig.
+NamesBeforeConfig=set(globals())|{'NamesBeforeConfig'}
+
 ##############################################################################################################
 # Config Start                                                                                               #
 ##############################################################################################################
@@ -165,9 +381,62 @@ OutsideTemperatureOfInterest=float(-7.0)
 # or to indicate for example not to heat during the night.
 HoursForHeatingADay = float(22.0)
 
+# When HourlyAnalysis is True the samples are hours instead of days, see Hourly Analysis above. Hourly files and
+# KNMI data are read in chunks of HourlyChunkDays days, the KNMI hours in UT are moved KNMIHourlyTimeOffset hours.
+HourlyAnalysis = False
+HourlyChunkDays = 366
+KNMIHourlyTimeOffset = 1
+
 # Price per kWh for the alternative energy to calculate the variabel cost of additional heating.
 CostPerkWh = float(0.227)
 
+# When HeatPumpModelFile is set, each heat pump model in it (Model,Temperature,Capacity,COP) is simulated over the
+# temperature distribution, the heat the model can not deliver is delivered by a backup heater with efficiency
+# BackupHeaterEfficiency. The results per model are written to HeatPumpResultFile.
+HeatPumpModelFile = ""
+BackupHeaterEfficiency = float(1.0)
+HeatPumpResultFile = "HeatPumps.csv"
+HeatPumpPrintModels = 5
+
+# Period of the daily average temperature distribution used to estimate the yearly energy, the estimate is also
+# given as a band over all periods in the ClimateHistogramFile. (see the list of periods below)
+ClimatePeriod="AllScaledToLast5"
+ClimateHistogramFile="DaysPerYearAverageTemperature.npy"
+
+# When ClimateStation is set to a name from the StationIDDictionary, the distribution is built from the KNMI daily
+# average temperatures of that station from ClimateFirstYear up to and including ClimateLastYear instead.
+ClimateStation=""
+ClimateFirstYear=1991
+ClimateLastYear=2020
+
+#Model fitted to the heating power samples, use one of the FitModel members to configure. FitModel.Huber gives
+#less weight to samples more than HuberThreshold times the spread of the residuals off the line, FitModel.Hinge fits
+#a line up to a heating limit and a flat base level above it, trying limits every HingeLimitStep degrees.
+HeatingCurveModel=FitModel.Linear
+HuberThreshold=1.345
+HuberIterations=50
+HingeLimitStep=0.05
+
+#When BootstrapResamples is more than 0 the fit is repeated on that many resamples of the samples to give intervals
+#with BootstrapConfidence percent of the results, BootstrapSeed can be set to a number to repeat the same resamples.
+BootstrapResamples=0
+BootstrapConfidence=90.0
+BootstrapSeed=None
+
+#When RollingFitDays is more than 0 the heating curve is also fitted over the RollingFitDays days up to each day with
+#data (RollingFitFile) and over each heating season starting in HeatingSeasonStartMonth (SeasonFitFile), fits with less
+#than RollingFitMinimumSamples samples are left empty.
+RollingFitDays=0
+RollingFitMinimumSamples=10
+HeatingSeasonStartMonth=7
+RollingFitFile="RollingFit.csv"
+SeasonFitFile="SeasonFit.csv"
+
+#Snapshots, when SnapshotExportFile is set the samples, results and config of the analysis are written to it, when
+#SnapshotImportFile is set the samples are read from it instead of from GetDataFrom. See Snapshots above.
+SnapshotExportFile=""
+SnapshotImportFile=""
+
 #File to use when GetDataFrom=DataSource.FromCSVFile
 CSVFile="MyDataFile.csv"
 
@@ -175,6 +444,29 @@ CSVFile="MyDataFile.csv"
 CSVGasOnlyFile="GasOnly.csv"
 KNMIStationToUse="Volkel"
 
+#When HouseLatitude and HouseLongitude (degrees north and east) are set, the temperatures of the KNMINearestStations
+#nearest stations are averaged with weights 1/distance^KNMIWeightPower, instead of using KNMIStationToUse.
+HouseLatitude=None
+HouseLongitude=None
+KNMINearestStations=3
+KNMIWeightPower=2.0
+
+#How the gas dates are matched to the KNMI dates, use one of the JoinType Members to configure, with
+#JoinType.Nearest a gas date without KNMI data uses the temperature of a date at most NearestJoinMaxDays away
+#(hours in the HourlyAnalysis).
+GasOnlyJoinType=JoinType.Inner
+NearestJoinMaxDays=1
+
+#KNMI temperatures are cached per station in the KNMICacheFile (SQLite), set it to "" to always query the KNMI.
+#The last KNMICacheRevisionDays days before a query can still be revised by the KNMI and are queried again the next day.
+#With KNMIOfflineMode=True the KNMI is never queried and temperatures missing in the cache give an error.
+KNMICacheFile="KNMICache.sqlite"
+KNMICacheRevisionDays=7
+KNMIOfflineMode=False
+KNMIRequestTimeout=30.0
+#Directory with the etmgeg_<station>.txt daily data files of the KNMI, when set these are used instead of the KNMI site.
+KNMIArchiveDirectory=""
+
 #Sensor IDx from Domoticz
 OutDoorTemperatureSensorID="20"
 InDoorTemperatureSensorID="69"
@@ -184,31 +476,129 @@ TotalElectricSensorID="3"
 
 # Domoticz Host IP
 DomoticzHostAndPort="https://192.168.225.86:443/"
+
+#Number of threads querying the Domoticz sensors at the same time, seconds to wait for an answer and the number
+#of times a query is tried again when it fails to connect or times out.
+DomoticzWorkers=4
+DomoticzRequestTimeout=30.0
+DomoticzRequestRetries=2
+
+#How to show the results, RenderMode.Window opens a plot window, RenderMode.File writes the report without a
+#display to ReportFileName with each of the ReportFileFormats as extension using RenderWorkers background processes,
+#RenderMode.Off only prints the results.
+RenderReport=RenderMode.Window
+ReportFileName="HouseHeatingCurve"
+ReportFileFormats=['png']
+RenderWorkers=1
+
+#Batch mode, when a BatchManifestFile is set all houses in it are analysed in BatchWorkers processes (0 = all cores)
+#and one result row per house is written to BatchSummaryFile, nothing is plotted.
+BatchManifestFile=""
+BatchSummaryFile="BatchSummary.csv"
+BatchWorkers=0
+
+#Sweep mode, when SweepMode is True the house is analysed for all combinations of the values in the Sweep lists below,
+#an empty list uses the configured value. See Design Point Sweep above.
+SweepMode=False
+SweepOutsideTemperatures=[]
+SweepHoursForHeatingADay=[]
+SweepCubicMetersGasADay=[]
+SweepCostPerkWh=[]
+SweepResultFile="Sweep.csv"
+SweepParetoFile="SweepPareto.csv"
+SweepPrintPoints=10
+
+#Live mode, when LiveMode is True the script keeps running and adds the new days from Domoticz or the data file to
+#the fit every LivePollSeconds, the results are served as JSON on http://LiveHost:LivePort/
+LiveMode=False
+LivePollSeconds=300
+LiveHost="127.0.0.1"
+LivePort=8080
+
+#Instrumentation, when InstrumentStages is True the time, bytes and samples of each stage are measured and printed,
+#and written as JSON lines to InstrumentOutput when set. See Instrumentation above.
+InstrumentStages=False
+InstrumentOutput=""
+InstrumentTraceMemory=False
+InstrumentProfileStages=[]
+InstrumentProfilePrefix="Profile_"
 ##############################################################################################################
 # Config End                                                                                                 #
 ##############################################################################################################
+ConfigParameterNames=[Name for Name in globals() if Name not in NamesBeforeConfig]
+DefaultConfig={Name:globals()[Name] for Name in ConfigParameterNames}
+
+#Library use changes the config above for each call, one call at a time. (see UsingConfig)
+ConfigLock=threading.RLock()
 
 
 #Domoticz URL constructs to get data
-QueryPreFix=DomoticzHostAndPort+"json.htm?type=graph&sensor="
-QueryPostFix="&range=year&method=1"
 Percentage="Percentage&idx="
 Temperature="temp&idx="
 Counter="counter&idx="
 
-#Domoticz URLs
-OutdoorTemperatureDataURL=QueryPreFix+Temperature+OutDoorTemperatureSensorID+QueryPostFix
-IndoorTemperatureDataURL=QueryPreFix+Temperature+InDoorTemperatureSensorID+QueryPostFix
-HeatingEnergyDataURL=QueryPreFix+Percentage+HeatingEnergySensorID+QueryPostFix
-GasUsageDataURL=QueryPreFix+Counter+GasSensorID+QueryPostFix
-TotalElectricUsageDataURL=QueryPreFix+Counter+TotalElectricSensorID+QueryPostFix
+def UpdateDomoticzURLs():
+   #Domoticz URLs, these are updated when the host or a sensor ID is changed, like in batch mode. The HourlyAnalysis
+   #queries the short log, which has the temperature in 'te' and the heating energy meter reading in 'v'.
+   global QueryPreFix, QueryPostFix, DomoticzTemperatureKey, DomoticzEnergyKeys
+   global OutdoorTemperatureDataURL, IndoorTemperatureDataURL, HeatingEnergyDataURL, GasUsageDataURL, TotalElectricUsageDataURL
+   QueryPreFix=DomoticzHostAndPort+"json.htm?type=graph&sensor="
+   if HourlyAnalysis:
+      QueryPostFix="&range=day&method=1"
+      DomoticzTemperatureKey='te'
+      DomoticzEnergyKeys=('v',)
+   else:
+      QueryPostFix="&range=year&method=1"
+      DomoticzTemperatureKey='ta'
+      DomoticzEnergyKeys=('v_max', 'v_min')
+   OutdoorTemperatureDataURL=QueryPreFix+Temperature+OutDoorTemperatureSensorID+QueryPostFix
+   IndoorTemperatureDataURL=QueryPreFix+Temperature+InDoorTemperatureSensorID+QueryPostFix
+   HeatingEnergyDataURL=QueryPreFix+Percentage+HeatingEnergySensorID+QueryPostFix
+   GasUsageDataURL=QueryPreFix+Counter+GasSensorID+QueryPostFix
+   TotalElectricUsageDataURL=QueryPreFix+Counter+TotalElectricSensorID+QueryPostFix
 
-#KNMI URL to use for daily average temperature data
+UpdateDomoticzURLs()
+
+#KNMI URLs to use for daily average and hourly temperature data
 KNMIDataURL="http://projects.knmi.nl/klimatologie/daggegevens/getdata_dag.cgi"
+KNMIHourlyDataURL="http://projects.knmi.nl/klimatologie/uurgegevens/getdata_uur.cgi"
+KNMICacheStatistics={'Hits':0, 'Misses':0, 'Requests':0, 'BytesFetched':0}
+
+#Context to indicate that we don't want SSL verification in case the domoticz setup does not have a valid CERT
+#certificate, created for the first https connection. (see GetUnverifiedContext)
+UnverifiedContext = None
+
+#Threads querying Domoticz, created when first used, each with its own open connection per Domoticz host.
+DomoticzFetchExecutor=None
+DomoticzConnections=threading.local()
+
+#Maximum number of sample counts per chunk of bootstrap resamples, limits the memory used by BootstrapFit.
+BootstrapChunkCounts=2**22
+
+#Instrumentation state, the records of the measured stages and the stages being measured in each thread.
+StageRecords=[]
+StageRecordsLock=threading.Lock()
+StageMeasurementState=threading.local()
+StageProfileCounter=[0]
 
-#Creating a context to indicate to urllib(2) that we don't want SSL verification
-#in case the domoticz setup does not have a valid CERT certificate.
-UnverifiedContext = ssl._create_unverified_context()
+#Live mode state, the fit sums and samples per day (or per row of the CSVFile) and the latest results.
+LiveState={}
+LiveResults={}
+LiveLock=threading.Lock()
+LiveFetchFromDate=None
+
+#Domoticz responses are parsed in parts of DomoticzReadSize bytes while they are read.
+DomoticzReadSize=65536
+JsonWhiteSpace=re.compile(r'[ \t\n\r]*')
+JsonDateKey=re.compile(r'"d"\s*:\s*"([0-9-]{10})')
+
+#Cumulative days index of the last used histogram, see GetDaysPerYearBelowTemperatureIndex.
+DaysPerYearBelowTemperatureIndex=(None, None, None)
+
+#Headless report figure and background render processes, created when first used.
+ReportFigure=None
+ReportPlotList=None
+ReportRenderExecutor=None
 
 #Plot properties
 PlotMinTemperature=-15.0
@@ -217,42 +607,54 @@ PlotMaxTemperature=30.0
 #PlotMaxPower will be determined from calculated Maxpower @ PlotMinTemperature.
 
 EnergyTemperatureList=[-30.0, -29.5, -29.0, -28.5, -28.0, -27.5, -27.0, -26.5, -26.0, -25.5, -25.0, -24.5, -24.0, -23.5, -23.0, -22.5, -22.0, -21.5, -21.0, -20.5, -20.0, -19.5, -19.0, -18.5, -18.0, -17.5, -17.0, -16.5, -16.0, -15.5, -15.0, -14.5, -14.0, -13.5, -13.0, -12.5, -12.0, -11.5, -11.0, -10.5, -10.0, -9.5, -9.0, -8.5, -8.0, -7.5, -7.0, -6.5, -6.0, -5.5, -5.0, -4.5, -4.0, -3.5, -3.0, -2.5, -2.0, -1.5, -1.0, -0.5, 0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 5.5, 6.0, 6.5, 7.0, 7.5, 8.0, 8.5, 9.0, 9.5, 10.0, 10.5, 11.0, 11.5, 12.0, 12.5, 13.0, 13.5, 14.0, 14.5, 15.0, 15.5, 16.0, 16.5, 17.0, 17.5, 18.0, 18.5, 19.0, 19.5, 20.0, 20.5, 21.0, 21.5, 22.0, 22.5, 23.0, 23.5, 24.0, 24.5, 25.0, 25.5, 26.0, 26.5, 27.0, 27.5, 28.0, 28.5, 29.0, 29.5, 30.0]
-#Using the AVG Allyears distribution scaled to the temperature days integration value of the last 5 years average.
-DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0177, 0.0, 0.05311, 0.05311, 0.05311, 0.0177, 0.0177, 0.07082, 0.10624, 0.05311, 0.12394, 0.14165, 0.03541, 0.38953, 0.23018, 0.40724, 0.37183, 0.37183, 0.51347, 0.54888, 0.79677, 0.97382, 1.29252, 1.31023, 1.36335, 2.08929, 2.05387, 2.46111, 2.7444, 3.50575, 3.98381, 4.28481, 4.62122, 5.02845, 5.66587, 6.26786, 6.33868, 6.46262, 7.27709, 8.10927, 8.19779, 8.78208, 9.01226, 8.87062, 8.33944, 8.30403, 8.09156, 7.64891, 8.42797, 7.13545, 7.68433, 7.40104, 7.9145, 7.56039, 8.37485, 8.26862, 8.58732, 8.88832, 8.39256, 9.49032, 8.41027, 8.48109, 8.09156, 6.74592, 6.58657, 5.93145, 4.83369, 4.49727, 4.2494, 3.3464, 2.97458, 2.69129, 1.75287, 1.55811, 1.62893, 1.31023, 1.13317, 0.70823, 0.79677, 0.47805, 0.53118, 0.24788, 0.301, 0.15935, 0.08853, 0.05311, 0.0177, 0.0177, 0.0177, 0.0]
+#The days per year with each average temperature of EnergyTemperatureList for the ClimatePeriod, loaded from the
+#ClimateHistogramFile when first needed, see GetDaysPerYearAverageTemperature.
+DaysPerYearAverageTemperature=None
+DaysPerYearAverageTemperaturePeriod=None
+ClimateHistogramTable=None
+
+#Temperature distributions built from KNMI station data, see GetStationTemperatureHistogram.
+TemperatureHistogramCache={}
+
+#Capacity and COP curves of the heat pump models per HeatPumpModelFile version, see LoadHeatPumpModels.
+HeatPumpModelCache={}
+
+#Snapshot files start with the SnapshotMagic and SnapshotVersion, the arrays in it start at multiples of
+#SnapshotAlignment bytes. Enums of these types are stored by name.
+SnapshotMagic=b"HHCSNAP\x00"
+SnapshotVersion=1
+SnapshotAlignment=64
+SnapshotEnums={EnumType.__name__:EnumType for EnumType in (DataSource, RenderMode, JoinType, FitModel)}
+
+#The samples the memoised steps of the sweep start from, see SetSweepSamples.
+SweepSamples={}
+
+#Station names and positions on the unit sphere of the StationCoordinatesDictionary, see GetStationIndex.
+StationIndex=None
+EarthRadius=6371.0
+
+#KNMI temperatures fetched before a batch, shared with the worker processes: StationID:(FirstDate, LastDate,
+#Dates, Temperatures), see PrefetchBatchStationTemperatures.
+SharedStationTemperatures={}
+
+#Dates and temperatures of the etmgeg_ files in the KNMIArchiveDirectory per station, see ReadKNMIArchive.
+KNMIArchiveCache={}
+
+#Day number of 1970-01-01, the day numbers of datetime64[D] are counted from it.
+EpochOrdinal=datetime.date(1970,1,1).toordinal()
 
 ##############################################################################################################
-# Below are some lists containing the average over all KNMI weather stations of the daily average temperature 
-# distribution over a year.
-# These averages have been calculated over various time periods and binned per 0.5 C. They can be used to 
-# calculate the predicted energy usage over a year for heating based on the fitted data.
-# As can be seen from the lists, using the more recent years will lead to lower heating energy estimates since
+# The ClimateHistogramFile contains a numpy table with the average over all KNMI weather stations of the daily 
+# average temperature distribution over a year, one row (Period, Station, Days) per period with Station "All".
+# These averages have been calculated over various time periods and binned per 0.5 C as in EnergyTemperatureList.
+# They can be used to calculate the predicted energy usage over a year for heating based on the fitted data.
+# As can be seen from the periods, using the more recent years will lead to lower heating energy estimates since
 # the average daily outdoor temperatures are indeed increasing ...
-##############################################################################################################
-# 
-# AllScaledToLast5  DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0177, 0.0, 0.05311, 0.05311, 0.05311, 0.0177, 0.0177, 0.07082, 0.10624, 0.05311, 0.12394, 0.14165, 0.03541, 0.38953, 0.23018, 0.40724, 0.37183, 0.37183, 0.51347, 0.54888, 0.79677, 0.97382, 1.29252, 1.31023, 1.36335, 2.08929, 2.05387, 2.46111, 2.7444, 3.50575, 3.98381, 4.28481, 4.62122, 5.02845, 5.66587, 6.26786, 6.33868, 6.46262, 7.27709, 8.10927, 8.19779, 8.78208, 9.01226, 8.87062, 8.33944, 8.30403, 8.09156, 7.64891, 8.42797, 7.13545, 7.68433, 7.40104, 7.9145, 7.56039, 8.37485, 8.26862, 8.58732, 8.88832, 8.39256, 9.49032, 8.41027, 8.48109, 8.09156, 6.74592, 6.58657, 5.93145, 4.83369, 4.49727, 4.2494, 3.3464, 2.97458, 2.69129, 1.75287, 1.55811, 1.62893, 1.31023, 1.13317, 0.70823, 0.79677, 0.47805, 0.53118, 0.24788, 0.301, 0.15935, 0.08853, 0.05311, 0.0177, 0.0177, 0.0177, 0.0]
-# 2018-2019         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5112, 0.0, 0.0, 0.0, 0.5112, 0.5112, 0.5112, 2.04482, 0.5112, 1.53361, 1.02241, 2.04482, 1.02241, 2.04482, 1.53361, 3.57843, 5.11204, 6.13445, 3.06723, 4.08964, 7.15686, 5.11204, 9.71289, 7.66807, 6.64566, 11.7577, 13.29132, 9.20168, 8.69048, 8.17927, 10.73529, 6.64566, 8.17927, 9.71289, 9.20168, 7.15686, 7.66807, 8.17927, 7.66807, 6.64566, 7.66807, 6.13445, 7.15686, 6.64566, 8.17927, 11.2465, 6.64566, 7.66807, 10.73529, 9.20168, 8.17927, 8.69048, 7.66807, 11.7577, 5.11204, 5.11204, 7.66807, 4.60084, 2.55602, 2.04482, 3.06723, 1.53361, 1.53361, 1.53361, 1.02241, 1.53361, 1.02241, 0.0, 1.02241, 0.0, 0.5112, 0.0, 0.5112, 0.5112, 0.0]
-# 2012-2017         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.16651, 0.0, 0.0, 0.0, 0.0, 0.16651, 0.0, 0.0, 0.0, 0.0, 0.16651, 0.49954, 0.33303, 0.0, 0.0, 0.33303, 0.16651, 1.1656, 0.66606, 1.33212, 0.83257, 0.66606, 1.49863, 2.49772, 2.99726, 2.83075, 2.66423, 3.33029, 3.99635, 4.82892, 4.49589, 5.32847, 6.49407, 5.32847, 6.49407, 7.9927, 10.82345, 9.49133, 9.99088, 9.49133, 11.32299, 9.1583, 11.82254, 11.82254, 8.32573, 9.65785, 9.49133, 6.8271, 8.65876, 9.82436, 7.65967, 9.65785, 9.1583, 9.65785, 8.65876, 9.49133, 9.82436, 9.32482, 11.65602, 9.82436, 8.15922, 6.66058, 7.49316, 7.65967, 5.99453, 4.16286, 4.66241, 3.33029, 4.16286, 3.33029, 1.99818, 2.3312, 1.66515, 0.66606, 0.49954, 0.83257, 0.49954, 0.83257, 0.0, 0.66606, 0.0, 0.49954, 0.0, 0.0, 0.0, 0.0, 0.0]
-# 2006-2011         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.16659, 0.0, 0.0, 0.0, 0.16659, 0.0, 0.16659, 0.16659, 0.33318, 0.49977, 0.16659, 0.16659, 0.49977, 0.99954, 1.99909, 1.66591, 2.33227, 1.8325, 2.83204, 2.33227, 2.66545, 2.99863, 4.83113, 4.99772, 6.49703, 5.49749, 3.4984, 6.33044, 7.1634, 5.66408, 5.99726, 6.33044, 6.49703, 7.66317, 6.33044, 10.6618, 9.66225, 11.16157, 10.49521, 6.99681, 7.1634, 9.32907, 7.66317, 7.49658, 9.66225, 6.99681, 8.66271, 8.66271, 10.49521, 9.82885, 9.16248, 9.66225, 10.49521, 10.32862, 10.16203, 12.16111, 10.16203, 9.99544, 6.83021, 5.83067, 5.66408, 5.66408, 4.66454, 4.99772, 2.33227, 1.33272, 1.49932, 2.49886, 1.16613, 1.66591, 0.49977, 1.33272, 0.49977, 0.66636, 0.33318, 0.49977, 0.33318, 0.0, 0.33318, 0.0, 0.0, 0.0, 0.0]
-# 2000-2005         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.16651, 0.0, 0.0, 0.0, 0.0, 0.0, 0.33303, 0.33303, 0.49954, 0.33303, 0.49954, 0.33303, 0.83257, 1.1656, 1.49863, 2.83075, 1.99818, 2.99726, 2.49772, 4.32938, 4.99544, 5.32847, 5.49498, 5.6615, 5.6615, 6.49407, 6.16104, 7.16013, 6.99361, 7.82619, 6.66058, 9.32482, 9.82436, 10.82345, 8.15922, 8.15922, 10.98996, 9.32482, 8.32573, 7.16013, 9.32482, 7.49316, 9.65785, 10.65693, 9.99088, 9.99088, 7.32664, 11.15648, 11.48951, 10.32391, 9.82436, 10.65693, 8.32573, 9.1583, 7.32664, 7.49316, 8.15922, 5.82801, 5.49498, 3.49681, 3.16378, 3.66332, 3.16378, 1.66515, 1.66515, 1.33212, 1.49863, 0.33303, 0.66606, 0.83257, 1.33212, 0.49954, 0.33303, 0.33303, 0.0, 0.0, 0.16651, 0.0, 0.0, 0.0]
-# 1994-1999         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.16659, 0.16659, 0.0, 0.0, 0.16659, 0.0, 0.0, 0.0, 0.16659, 0.33318, 0.16659, 0.49977, 0.16659, 0.16659, 0.83295, 0.83295, 0.83295, 0.99954, 1.16613, 0.99954, 2.33227, 1.49932, 1.8325, 2.33227, 2.83204, 2.33227, 3.99817, 3.16522, 3.83158, 3.16522, 5.16431, 4.83113, 6.16385, 7.32999, 7.66317, 4.16476, 8.99589, 8.66271, 11.66134, 8.66271, 9.49566, 8.66271, 7.99635, 11.32816, 11.16157, 10.49521, 9.16248, 7.32999, 10.99498, 7.82976, 8.49612, 6.83021, 11.16157, 8.8293, 10.82839, 8.99589, 9.99544, 9.16248, 7.82976, 9.66225, 8.99589, 7.1634, 7.32999, 7.99635, 4.66454, 4.66454, 3.66499, 3.16522, 3.33181, 2.49886, 2.66545, 1.33272, 1.99909, 2.49886, 2.49886, 1.66591, 1.8325, 0.99954, 0.66636, 0.49977, 0.16659, 0.0, 0.16659, 0.0, 0.0, 0.0, 0.0, 0.0]
-# 1988-1993         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.16651, 0.0, 0.0, 0.0, 0.33303, 0.0, 0.49954, 0.0, 0.0, 0.49954, 0.83257, 0.99909, 0.16651, 0.49954, 1.1656, 0.66606, 0.83257, 1.83166, 2.16469, 2.99726, 4.82892, 3.16378, 3.66332, 4.66241, 4.32938, 5.49498, 6.8271, 6.99361, 7.32664, 8.82527, 10.98996, 12.32208, 14.65328, 11.48951, 10.65693, 9.49133, 9.65785, 9.49133, 7.65967, 9.82436, 8.49224, 7.65967, 8.49224, 10.82345, 8.49224, 9.82436, 10.15739, 9.49133, 8.99179, 9.1583, 12.48859, 8.99179, 9.65785, 8.15922, 8.15922, 8.65876, 5.16195, 5.6615, 4.99544, 5.82801, 4.16286, 3.66332, 2.66423, 1.49863, 1.99818, 1.49863, 0.83257, 0.66606, 1.33212, 0.33303, 0.33303, 0.16651, 0.33303, 0.16651, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-# 1982-1987         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.16659, 0.0, 0.33318, 0.0, 0.33318, 0.0, 0.0, 0.33318, 0.49977, 0.16659, 0.66636, 0.33318, 0.16659, 0.83295, 0.83295, 0.83295, 0.83295, 0.66636, 1.33272, 0.49977, 1.33272, 1.49932, 1.8325, 2.33227, 2.49886, 3.83158, 3.4984, 2.66545, 2.49886, 4.66454, 6.33044, 5.3309, 5.16431, 6.33044, 7.82976, 7.1634, 8.49612, 7.66317, 8.32953, 8.32953, 7.66317, 7.99635, 9.32907, 6.99681, 8.32953, 5.83067, 8.8293, 9.16248, 10.32862, 8.66271, 10.16203, 10.82839, 9.49566, 9.32907, 11.16157, 8.16294, 9.66225, 11.16157, 9.32907, 10.16203, 8.99589, 9.16248, 8.49612, 6.16385, 4.99772, 5.66408, 4.49795, 3.99817, 3.99817, 2.49886, 2.16568, 2.49886, 1.8325, 2.33227, 2.16568, 1.49932, 1.8325, 1.33272, 0.99954, 0.33318, 0.33318, 0.0, 0.0, 0.16659, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-# 1976-1981         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.16651, 0.16651, 0.16651, 0.0, 0.16651, 0.16651, 0.16651, 0.0, 0.16651, 0.0, 0.83257, 0.33303, 0.83257, 0.66606, 0.99909, 0.83257, 0.99909, 0.66606, 1.99818, 2.49772, 1.99818, 1.83166, 3.16378, 2.66423, 4.66241, 4.16286, 5.49498, 5.6615, 6.49407, 5.32847, 6.99361, 6.49407, 7.16013, 8.32573, 7.49316, 8.15922, 8.32573, 7.82619, 10.15739, 9.49133, 10.32391, 10.49042, 6.8271, 5.82801, 7.9927, 10.82345, 7.82619, 8.32573, 7.9927, 8.65876, 10.15739, 9.82436, 8.65876, 11.15648, 12.82162, 8.82527, 15.15283, 10.82345, 8.15922, 8.15922, 4.66241, 6.16104, 6.16104, 3.33029, 3.82984, 3.66332, 2.16469, 2.83075, 2.49772, 0.49954, 1.49863, 1.1656, 0.99909, 0.83257, 0.33303, 0.33303, 0.33303, 0.16651, 0.16651, 0.33303, 0.33303, 0.16651, 0.0, 0.0, 0.0, 0.0, 0.0]
-# 1970-1975         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.16659, 0.0, 0.16659, 0.16659, 0.0, 0.66636, 0.16659, 0.66636, 0.33318, 0.49977, 0.0, 0.66636, 0.49977, 1.16613, 0.49977, 0.66636, 1.49932, 1.8325, 0.99954, 2.16568, 3.16522, 2.49886, 3.99817, 3.99817, 5.3309, 9.99544, 8.49612, 7.82976, 9.32907, 11.32816, 10.32862, 12.66089, 9.99544, 11.16157, 11.99452, 12.16111, 10.99498, 10.49521, 8.8293, 9.16248, 8.66271, 7.49658, 9.16248, 6.16385, 7.82976, 6.83021, 6.33044, 9.82885, 10.82839, 10.32862, 8.8293, 8.99589, 9.32907, 8.49612, 9.49566, 6.33044, 7.82976, 6.33044, 2.83204, 4.83113, 3.66499, 4.99772, 2.83204, 2.49886, 0.66636, 1.49932, 1.33272, 1.33272, 0.49977, 0.16659, 0.66636, 0.33318, 0.33318, 0.16659, 0.66636, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-# 1964-1969         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.16651, 0.33303, 0.0, 0.0, 0.16651, 0.16651, 0.33303, 0.49954, 0.99909, 0.16651, 0.99909, 0.99909, 0.99909, 0.83257, 1.49863, 1.33212, 2.16469, 2.66423, 2.49772, 4.49589, 4.66241, 5.99453, 4.66241, 5.6615, 7.49316, 4.82892, 6.99361, 7.49316, 8.82527, 10.65693, 6.99361, 7.49316, 8.32573, 8.65876, 8.82527, 7.9927, 7.32664, 8.32573, 6.32755, 9.82436, 7.32664, 6.66058, 6.49407, 6.49407, 9.82436, 11.82254, 9.65785, 7.16013, 7.82619, 9.49133, 12.48859, 12.32208, 11.82254, 12.32208, 9.1583, 6.49407, 8.15922, 6.32755, 5.49498, 5.6615, 5.32847, 4.99544, 3.49681, 2.3312, 0.83257, 0.66606, 0.99909, 0.83257, 0.16651, 1.83166, 0.83257, 0.66606, 0.33303, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-# 1958-1963         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.16851, 0.33703, 0.50554, 0.50554, 0.67405, 0.16851, 0.50554, 0.67405, 0.84257, 0.84257, 1.34811, 1.17959, 1.17959, 1.85365, 1.51662, 2.02216, 2.5277, 3.03324, 3.87581, 2.69621, 3.70729, 3.70729, 5.56094, 5.0554, 5.39243, 6.235, 5.89797, 5.39243, 6.06648, 7.5831, 5.89797, 7.41459, 9.09972, 9.09972, 6.06648, 9.77378, 8.42567, 8.08864, 9.77378, 7.07756, 9.26824, 8.93121, 7.07756, 8.59418, 7.75162, 10.27932, 10.1108, 9.43675, 11.2904, 8.42567, 11.62742, 13.64958, 11.96445, 12.6385, 10.44783, 7.41459, 6.90905, 7.92013, 4.54986, 3.87581, 4.21283, 1.85365, 3.03324, 3.37027, 1.68513, 2.02216, 1.51662, 1.01108, 0.84257, 0.33703, 0.16851, 0.0, 0.67405, 0.0, 0.0, 0.16851, 0.16851, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-# 1952-1957         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.40873, 0.0, 0.0, 0.40873, 0.0, 0.40873, 0.40873, 0.0, 0.81747, 0.0, 1.63494, 0.0, 0.81747, 0.40873, 0.40873, 2.04367, 0.0, 1.63494, 0.0, 0.0, 0.0, 1.2262, 1.63494, 1.63494, 0.81747, 2.86114, 4.08735, 3.67861, 2.04367, 3.26988, 4.90482, 4.08735, 7.35722, 6.53975, 6.13102, 6.13102, 4.90482, 7.76596, 8.17469, 11.03583, 4.90482, 10.6271, 9.80963, 8.99216, 9.4009, 11.8533, 8.17469, 8.99216, 8.99216, 10.6271, 8.17469, 10.21837, 9.4009, 9.80963, 12.26204, 15.12318, 13.07951, 8.58343, 9.80963, 8.17469, 8.99216, 8.99216, 6.13102, 5.31355, 6.13102, 7.76596, 4.49608, 4.90482, 6.13102, 0.0, 2.04367, 2.04367, 2.45241, 0.0, 0.81747, 0.81747, 0.81747, 0.81747, 0.40873, 0.40873, 0.81747, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-# AVG AllYears      DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.01553, 0.01553, 0.0, 0.06214, 0.0466, 0.06214, 0.03107, 0.01553, 0.12427, 0.15534, 0.15534, 0.15534, 0.21747, 0.07767, 0.41942, 0.38835, 0.52815, 0.48155, 0.54369, 0.62136, 0.68349, 0.99417, 1.18058, 1.50679, 1.59999, 1.833, 2.56309, 2.60969, 2.99804, 3.43299, 4.20969, 4.64464, 5.21939, 5.32813, 5.82521, 6.38443, 7.05239, 7.54947, 7.17666, 8.18636, 8.91646, 9.24267, 9.46014, 9.89509, 9.59995, 9.28927, 9.08733, 9.00966, 8.59025, 9.24267, 7.82908, 8.52811, 8.48151, 9.36694, 8.93199, 9.46014, 9.52228, 9.52228, 10.40771, 10.0815, 10.87373, 10.0349, 9.49121, 8.59025, 7.54947, 7.39414, 6.30676, 5.31259, 5.06405, 4.36503, 3.6194, 3.21552, 2.68736, 1.7864, 1.63106, 1.63106, 1.27378, 1.22718, 0.73009, 0.77669, 0.54369, 0.46602, 0.21747, 0.27961, 0.15534, 0.07767, 0.0466, 0.01553, 0.01553, 0.01553, 0.0]
-# AVG Last 50 years DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.01999, 0.0, 0.05997, 0.05997, 0.05997, 0.01999, 0.01999, 0.07996, 0.11995, 0.05997, 0.13994, 0.15993, 0.03998, 0.43981, 0.25989, 0.4598, 0.41982, 0.41982, 0.57975, 0.61973, 0.89961, 1.09952, 1.45936, 1.47935, 1.53933, 2.35897, 2.31898, 2.77878, 3.09864, 3.95826, 4.49803, 4.83788, 5.21771, 5.67751, 6.3972, 7.0769, 7.15686, 7.2968, 8.2164, 9.15599, 9.25594, 9.91565, 10.17554, 10.01561, 9.41587, 9.37589, 9.136, 8.63621, 9.51583, 8.05647, 8.6762, 8.35634, 8.93608, 8.53626, 9.45585, 9.33591, 9.69575, 10.0356, 9.47585, 10.7153, 9.49584, 9.5758, 9.136, 7.61666, 7.43674, 6.69706, 5.45761, 5.07777, 4.7979, 3.77834, 3.35853, 3.03867, 1.97913, 1.75923, 1.83919, 1.47935, 1.27944, 0.79965, 0.89961, 0.53976, 0.59974, 0.27988, 0.33985, 0.17992, 0.09996, 0.05997, 0.01999, 0.01999, 0.01999, 0.0]
-# AVG Last 30 years DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.03332, 0.06665, 0.0, 0.0, 0.03332, 0.03332, 0.03332, 0.03332, 0.06665, 0.09997, 0.03332, 0.23327, 0.16662, 0.29992, 0.33324, 0.26659, 0.46654, 0.59984, 0.99973, 0.86643, 1.46626, 1.39962, 1.36629, 2.13275, 2.36602, 2.66594, 3.09915, 3.83228, 4.06555, 4.83201, 5.19858, 4.36547, 5.69844, 6.69816, 6.16498, 6.26495, 7.66457, 8.69762, 9.56405, 9.83064, 9.93061, 10.09723, 8.93089, 10.3305, 10.03059, 8.69762, 9.29745, 8.03113, 8.46435, 8.56432, 8.89756, 8.531, 9.63069, 9.43075, 9.26413, 9.13083, 9.56405, 10.06391, 9.3641, 10.06391, 9.43075, 8.73094, 8.09778, 7.19803, 6.63152, 5.66511, 5.33187, 3.93226, 3.69899, 3.39907, 2.63261, 1.79951, 1.99945, 1.69953, 1.49959, 0.89975, 1.0997, 0.66648, 0.83311, 0.39989, 0.36657, 0.19995, 0.1333, 0.09997, 0.03332, 0.03332, 0.03332, 0.0]
-# AVG Last 20 years DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.04999, 0.0, 0.0, 0.0, 0.04999, 0.04999, 0.0, 0.04999, 0.04999, 0.0, 0.09999, 0.19997, 0.24997, 0.24997, 0.14998, 0.29996, 0.34995, 0.84988, 0.94987, 1.34982, 1.34982, 1.34982, 2.24969, 2.29968, 2.69963, 2.74962, 3.74949, 4.3994, 5.24928, 5.39926, 4.3994, 5.64923, 6.74908, 5.74921, 6.84906, 7.14902, 8.29886, 8.29886, 8.99877, 9.89864, 10.49856, 9.34872, 10.1986, 9.59869, 8.24887, 9.14875, 8.19888, 7.79893, 8.49884, 8.7488, 8.84879, 9.14875, 9.64868, 8.64882, 9.39871, 9.84865, 9.99863, 9.94864, 10.39858, 9.84865, 9.29873, 8.09889, 7.34899, 7.34899, 5.99918, 5.74921, 4.3494, 3.94946, 3.79948, 2.79962, 1.79975, 2.14971, 1.54979, 1.29982, 0.54992, 0.99986, 0.64991, 0.99986, 0.34995, 0.44994, 0.29996, 0.14998, 0.14998, 0.04999, 0.04999, 0.04999, 0.0]
-# AVG Last 15 years DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.06668, 0.0, 0.0, 0.0, 0.06668, 0.06668, 0.0, 0.0, 0.06668, 0.0, 0.13336, 0.26672, 0.33339, 0.20004, 0.06668, 0.26672, 0.33339, 1.00018, 1.13354, 1.53361, 1.40026, 1.33358, 2.26708, 2.46712, 2.60047, 3.00055, 3.53398, 4.13409, 5.53434, 5.40099, 3.86737, 5.60102, 6.86792, 5.46767, 6.73456, 7.20132, 8.06814, 8.66825, 9.00164, 9.73511, 10.26854, 9.60175, 10.66862, 9.20168, 8.13482, 9.135, 8.40153, 7.13464, 9.26836, 8.60157, 8.46821, 8.80161, 9.60175, 8.86829, 8.80161, 9.86847, 10.06851, 10.00183, 10.33522, 10.33522, 9.135, 8.33486, 7.06796, 6.86792, 6.20113, 5.86774, 4.46748, 4.20077, 4.00073, 2.93387, 1.86701, 2.2004, 1.73365, 1.20022, 0.60011, 1.13354, 0.53343, 0.80015, 0.33339, 0.53343, 0.26672, 0.20004, 0.20004, 0.0, 0.06668, 0.06668, 0.0]
-# AVG Last 10 years DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.10005, 0.0, 0.0, 0.0, 0.0, 0.10005, 0.0, 0.0, 0.0, 0.0, 0.10005, 0.40022, 0.40022, 0.30016, 0.0, 0.30016, 0.40022, 1.30071, 1.1006, 1.60088, 1.40077, 1.60088, 2.10115, 2.40132, 2.80154, 3.00164, 3.00164, 3.80208, 5.00274, 5.20285, 3.90214, 5.70313, 6.70367, 5.00274, 7.40406, 7.20395, 9.00493, 9.3051, 9.70532, 9.90543, 10.60581, 9.10499, 11.00603, 9.80537, 8.10444, 9.90543, 8.80482, 6.80373, 8.2045, 8.80482, 7.304, 9.00493, 8.90488, 9.3051, 8.40461, 9.3051, 9.40515, 9.60526, 10.10554, 10.10554, 9.10499, 8.10444, 7.70422, 7.50411, 6.2034, 5.50302, 4.60252, 3.70203, 4.50247, 3.20175, 1.90104, 2.30126, 1.70093, 0.80044, 0.70038, 1.00055, 0.70038, 0.80044, 0.20011, 0.60033, 0.30016, 0.30016, 0.20011, 0.0, 0.10005, 0.10005, 0.0]
-# AVG Last  5 years DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.20033, 0.0, 0.0, 0.0, 0.20033, 0.20033, 0.40066, 1.80296, 0.80132, 0.60099, 1.80296, 2.00329, 2.00329, 2.40395, 2.20362, 4.40724, 5.00823, 6.61087, 4.40724, 5.00823, 6.61087, 6.00988, 7.81284, 8.2135, 8.61416, 10.81778, 11.21844, 9.81614, 9.61581, 7.41218, 12.01976, 9.41548, 8.41383, 9.61581, 9.01482, 6.8112, 9.41548, 9.81614, 7.21186, 7.81284, 8.2135, 9.21515, 6.8112, 7.81284, 7.61251, 9.21515, 9.41548, 8.81449, 10.41712, 8.2135, 7.81284, 9.61581, 6.41054, 6.41054, 4.40724, 4.8079, 6.00988, 4.00659, 2.00329, 1.80296, 2.20362, 1.00165, 1.00165, 1.40231, 0.80132, 1.20198, 0.40066, 0.60099, 0.40066, 0.0, 0.20033, 0.0, 0.20033, 0.20033, 0.0]
-# AVG Last  3 years DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.33456, 0.0, 0.0, 0.0, 0.33456, 0.33456, 0.66911, 2.34189, 0.66911, 1.00367, 2.34189, 3.011, 1.67278, 2.00733, 2.00733, 4.01467, 4.34922, 6.69111, 3.34555, 5.01833, 5.68744, 5.68744, 7.02566, 9.033, 8.02933, 11.04033, 13.04766, 8.69844, 9.033, 7.69478, 11.04033, 10.03666, 8.69844, 8.02933, 8.69844, 7.02566, 9.033, 8.36389, 5.68744, 7.02566, 7.02566, 7.69478, 7.02566, 6.69111, 9.033, 10.03666, 9.36755, 8.69844, 11.37489, 9.033, 8.69844, 9.033, 7.36022, 9.70211, 4.34922, 4.34922, 7.02566, 4.01467, 2.00733, 1.67278, 2.34189, 1.67278, 1.33822, 1.33822, 1.00367, 1.00367, 0.66911, 0.0, 0.66911, 0.0, 0.33456, 0.0, 0.33456, 0.33456, 0.0]
-# AVG Last  2 years DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.50275, 0.0, 0.0, 0.0, 0.50275, 0.50275, 0.50275, 2.01102, 0.50275, 1.50826, 1.00551, 2.01102, 1.00551, 2.01102, 1.50826, 3.51928, 5.02755, 6.03306, 3.51928, 4.52479, 7.03857, 5.02755, 9.55234, 7.54132, 7.03857, 12.06612, 13.07163, 9.04959, 9.55234, 8.04408, 11.56336, 8.04408, 8.04408, 9.55234, 9.04959, 7.03857, 8.04408, 8.04408, 7.54132, 6.53581, 7.54132, 6.03306, 7.03857, 6.53581, 8.04408, 11.06061, 6.53581, 7.54132, 10.55785, 9.04959, 8.04408, 8.54683, 7.54132, 11.56336, 5.02755, 5.02755, 7.54132, 4.52479, 2.51377, 2.01102, 3.01653, 1.50826, 1.50826, 1.50826, 1.00551, 1.50826, 1.00551, 0.0, 1.00551, 0.0, 0.50275, 0.0, 0.50275, 0.50275, 0.0]
-# Last year         DaysPerYearAverageTemperature=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 2.02216, 1.01108, 1.01108, 0.0, 2.02216, 2.02216, 1.01108, 1.01108, 2.02216, 7.07756, 3.03324, 1.01108, 2.02216, 6.06648, 4.04432, 11.12188, 9.09972, 8.08864, 10.1108, 14.15512, 12.13296, 14.15512, 10.1108, 14.15512, 8.08864, 10.1108, 12.13296, 7.07756, 7.07756, 10.1108, 5.0554, 7.07756, 6.06648, 7.07756, 10.1108, 7.07756, 5.0554, 12.13296, 13.14404, 9.09972, 11.12188, 12.13296, 10.1108, 6.06648, 9.09972, 4.04432, 9.09972, 2.02216, 3.03324, 4.04432, 1.01108, 2.02216, 1.01108, 3.03324, 1.01108, 1.01108, 2.02216, 2.02216, 1.01108, 1.01108, 0.0, 0.0, 0.0, 1.01108, 0.0, 1.01108, 0.0, 0.0]
-#
+# Available periods:
+# AllScaledToLast5 (the AllYears distribution scaled to the temperature days integration value of Last5Years),
+# 2018-2019, 2012-2017, 2006-2011, 2000-2005, 1994-1999, 1988-1993, 1982-1987, 1976-1981, 1970-1975, 1964-1969,
+# 1958-1963, 1952-1957, AllYears, Last50Years, Last30Years, Last20Years, Last15Years, Last10Years, Last5Years,
+# Last3Years, Last2Years, LastYear
 ##############################################################################################################
 
 #KNMI Stations Dictionary for GasOnly CSV
@@ -309,54 +711,508 @@ StationIDDictionary = {
    'Arcen'                 :'391',
 }
 
+#Latitude (north) and longitude (east) in degrees of the stations of the StationIDDictionary.
+StationCoordinatesDictionary = {
+   'IJmond'                :(52.465, 4.518),
+   'Valkenburg'            :(52.171, 4.430),
+   'Voorschoten'           :(52.141, 4.437),
+   'IJmuiden'              :(52.463, 4.555),
+   'De Kooy'               :(52.928, 4.781),
+   'Schiphol'              :(52.318, 4.790),
+   'Vlieland'              :(53.241, 4.921),
+   'Wijdenes'              :(52.634, 5.174),
+   'Berkhout'              :(52.644, 4.979),
+   'Hoorn(Terschelling)'   :(53.392, 5.346),
+   'WijkaanZee'            :(52.506, 4.603),
+   'Houtribdijk'           :(52.649, 5.401),
+   'DeBilt'                :(52.100, 5.180),
+   'Soesterberg'           :(52.130, 5.274),
+   'Stavoren'              :(52.898, 5.384),
+   'Lelystad'              :(52.458, 5.520),
+   'Leeuwarden'            :(53.224, 5.752),
+   'Marknesse'             :(52.703, 5.888),
+   'Deelen'                :(52.056, 5.873),
+   'Lauwersoog'            :(53.413, 6.200),
+   'Heino'                 :(52.435, 6.259),
+   'Hoogeveen'             :(52.750, 6.574),
+   'Eelde'                 :(53.125, 6.585),
+   'Hupsel'                :(52.069, 6.657),
+   'Huibertgat'            :(53.575, 6.399),
+   'NieuwBeerta'           :(53.196, 7.150),
+   'Twenthe'               :(52.274, 6.891),
+   'Cadzand'               :(51.381, 3.379),
+   'Vlissingen'            :(51.442, 3.596),
+   'Hoofdplaat'            :(51.379, 3.672),
+   'Oosterschelde'         :(51.768, 3.622),
+   'Vlaktev.d.raan'        :(51.505, 3.242),
+   'Hansweert'             :(51.447, 3.998),
+   'Schaar'                :(51.657, 3.694),
+   'Westdorpe'             :(51.226, 3.861),
+   'Wilhelminadorp'        :(51.527, 3.884),
+   'Stavenisse'            :(51.596, 4.006),
+   'HoekvanHolland'        :(51.992, 4.122),
+   'Tholen'                :(51.480, 4.193),
+   'Woensdrecht'           :(51.449, 4.342),
+   'Rdam-Geulhaven'        :(51.893, 4.313),
+   'Rotterdam'             :(51.962, 4.447),
+   'Cabauw'                :(51.970, 4.926),
+   'Gilze-Rijen'           :(51.566, 4.936),
+   'Herwijnen'             :(51.859, 5.146),
+   'Eindhoven'             :(51.451, 5.377),
+   'Volkel'                :(51.659, 5.707),
+   'Ell'                   :(51.198, 5.763),
+   'Maastricht'            :(50.906, 5.762),
+   'Arcen'                 :(51.498, 6.197),
+}
+
+#Config parameters that can be set per house in the batch manifest and how to convert them from text.
+BatchHouseParameters = {
+   'GetDataFrom'                                 :lambda Value: DataSource[Value.strip()],
+   'CSVFile'                                     :str.strip,
+   'CSVGasOnlyFile'                              :str.strip,
+   'KNMIStationToUse'                            :str.strip,
+   'HouseLatitude'                               :float,
+   'HouseLongitude'                              :float,
+   'KNMINearestStations'                         :int,
+   'KNMIWeightPower'                             :float,
+   'GasOnlyJoinType'                             :lambda Value: JoinType[Value.strip()],
+   'DateStartAnalyses'                           :lambda Value: ParseDate(Value),
+   'DateEndAnalyses'                             :lambda Value: ParseDate(Value),
+   'UseGasDataForHeatingEnergyEstimation'        :lambda Value: ParseBoolean(Value),
+   'EnergyPerCubicMeterGas'                      :float,
+   'CubicMetersGasADayForWarmWaterAndCooking'    :float,
+   'EstimateAdditionalInternalAndExternalEnergy' :lambda Value: ParseBoolean(Value),
+   'TotalUsageCorrectionFactor'                  :float,
+   'HeatFromWarmBodies'                          :float,
+   'OutsideTemperatureOfInterest'                :float,
+   'HoursForHeatingADay'                         :float,
+   'HeatPumpModelFile'                           :str.strip,
+   'HourlyAnalysis'                              :lambda Value: ParseBoolean(Value),
+   'CostPerkWh'                                  :float,
+   'HeatingCurveModel'                           :lambda Value: FitModel[Value.strip()],
+   'RollingFitDays'                              :int,
+   'SnapshotImportFile'                          :str.strip,
+   'BootstrapResamples'                          :int,
+   'ClimatePeriod'                               :str.strip,
+   'ClimateStation'                              :str.strip,
+   'ClimateFirstYear'                            :int,
+   'ClimateLastYear'                             :int,
+   'DomoticzHostAndPort'                         :str.strip,
+   'OutDoorTemperatureSensorID'                  :str.strip,
+   'InDoorTemperatureSensorID'                   :str.strip,
+   'HeatingEnergySensorID'                       :str.strip,
+   'GasSensorID'                                 :str.strip,
+   'TotalElectricSensorID'                       :str.strip,
+}
+DefaultHouseParameters = {Name:globals()[Name] for Name in BatchHouseParameters}
+
+#Results written per house to the BatchSummaryFile.
+BatchSummaryColumns = ['FitModel', 'HeatingPowerBase', 'HeatingPowerPerxxhGain', 'HeatingPowerPerxxhOffset', 'Correlation', 'HeatingLimit',
+                       'OutsideTemperatureOfInterest', 'HeatingPowerTemperatureOffInterest', 'DaysAlternativePower',
+                       'AlternativePower', 'AlternativeEnergy', 'AlternativeEnergyCost', 'ClimatePeriod',
+                       'YearlyHeatingEnergy', 'YearlyHeatingEnergyMin', 'YearlyHeatingEnergyMax', 'HeatingDegreeHours',
+                       'BestHeatPump', 'BestHeatPumpCost',
+                       'HeatingPowerTemperatureOffInterestLow', 'HeatingPowerTemperatureOffInterestHigh',
+                       'YearlyHeatingEnergyLow', 'YearlyHeatingEnergyHigh']
+
+#The curves of the models are drawn through this many temperatures between PlotMinTemperature and PlotMaxTemperature.
+PlotCurvePoints=91
+
 
 ##############################################################################################################
 # Functions
 ##############################################################################################################
 
-def DataInAnalysesWindow(DateString): 
-   Year=int(DateString.split("-")[0])
-   Month=int(DateString.split("-")[1])
-   Day=int(DateString.split("-")[2])
-   CompareDate=datetime.date(Year,Month,Day)
-   return (DateStartAnalyses <= CompareDate and CompareDate <= DateEndAnalyses)
-
-def CalculateDaysPerYearBelowTemperature(Temperature):
-   LowValue=0.0
-   HighValue = 0.0
-   HighValueTemperature = 0.0
-   HighValueFound = False
-   for temp,day in zip(EnergyTemperatureList,DaysPerYearAverageTemperature):
-      if temp < Temperature:
-         LowValue=LowValue+day
-      elif temp == Temperature:
-         LowValue=LowValue+day
-         HighValue=LowValue
-         HighValueTemperature = temp
-         HighValueFound = True
+class StageMeasurement(object):
+   # Measures a stage in a with block, the record returned by with can be given the Samples and Bytes of the stage.
+   def __init__(self, Stage, Detail):
+      self.Record=collections.OrderedDict([('Stage',Stage), ('Detail',Detail), ('Samples',None), ('Bytes',None)])
+      self.Profile=None
+
+   def __enter__(self):
+      if not hasattr(StageMeasurementState, 'Stack'):
+         StageMeasurementState.Stack=[]
+      if InstrumentTraceMemory:
+         if not tracemalloc.is_tracing():
+            tracemalloc.start()
+         self.StartMemory, Peak = tracemalloc.get_traced_memory()
+         #The peak so far belongs to the stages this stage is part of, it is reset to measure this stage.
+         for Outer in StageMeasurementState.Stack:
+            Outer.PeakMemory=max(Outer.PeakMemory, Peak)
+         tracemalloc.reset_peak()
+         self.PeakMemory=self.StartMemory
+      StageMeasurementState.Stack.append(self)
+      if self.Record['Stage'] in InstrumentProfileStages:
+         self.Profile=cProfile.Profile()
+         self.Profile.enable()
+      self.StartTime=time.time()
+      self.StartCounter=time.perf_counter()
+      self.StartCPUTime=time.thread_time()
+      return(self.Record)
+
+   def __exit__(self, ExceptionType, ExceptionValue, Traceback):
+      WallTime=time.perf_counter()-self.StartCounter
+      CPUTime=time.thread_time()-self.StartCPUTime
+      if self.Profile is not None:
+         self.Profile.disable()
+         with StageRecordsLock:
+            StageProfileCounter[0]=StageProfileCounter[0]+1
+            ProfileFile=InstrumentProfilePrefix+self.Record['Stage']+"_"+os.getpid().__str__()+"_"+StageProfileCounter[0].__str__()+".prof"
+         self.Profile.dump_stats(ProfileFile)
+      StageMeasurementState.Stack.pop()
+      self.Record.update([('WallSeconds',round(WallTime,6)), ('CPUSeconds',round(CPUTime,6))])
+      if InstrumentTraceMemory:
+         self.PeakMemory=max(self.PeakMemory, tracemalloc.get_traced_memory()[1])
+         for Outer in StageMeasurementState.Stack:
+            Outer.PeakMemory=max(Outer.PeakMemory, self.PeakMemory)
+         self.Record['PeakMemoryBytes']=self.PeakMemory-self.StartMemory
+      self.Record.update([('Start',round(self.StartTime,3)), ('Process',os.getpid()), ('Thread',threading.current_thread().name)])
+      if ExceptionType is not None:
+         self.Record['Error']=str(ExceptionValue)
+      RecordStage(self.Record)
+      return(False)
+
+class NoStageMeasurement(object):
+   # Stands in for StageMeasurement when InstrumentStages is False, the record it returns is not used.
+   def __enter__(self):
+      return({})
+
+   def __exit__(self, ExceptionType, ExceptionValue, Traceback):
+      return(False)
+
+NoStage=NoStageMeasurement()
+
+def MeasureStage(Stage, Detail=""):
+   # Use as: with MeasureStage("Name") as Stage: ... Stage['Samples']=len(Samples)
+   if not InstrumentStages:
+      return(NoStage)
+   return(StageMeasurement(Stage, Detail))
+
+def RecordStage(Record):
+   with StageRecordsLock:
+      StageRecords.append(Record)
+      if InstrumentOutput:
+         with open(InstrumentOutput, 'a') as OutputFile:
+            OutputFile.write(json.dumps(Record)+"\n")
+
+def PrintStageSummary():
+   # Totals per stage of the StageRecords, in the order the stages first finished.
+   Totals=collections.OrderedDict()
+   for Record in StageRecords:
+      Total=Totals.setdefault(Record['Stage'], {'Count':0, 'WallSeconds':0.0, 'CPUSeconds':0.0, 'Samples':0, 'Bytes':0, 'PeakMemoryBytes':0})
+      Total['Count']=Total['Count']+1
+      for Name in ('WallSeconds', 'CPUSeconds', 'Samples', 'Bytes'):
+         Total[Name]=Total[Name]+(Record[Name] or 0)
+      Total['PeakMemoryBytes']=max(Total['PeakMemoryBytes'], Record.get('PeakMemoryBytes', 0))
+   print("Stage                    Count    Wall[s]     CPU[s]    Samples       Bytes  PeakMem[B]")
+   for Stage, Total in Totals.items():
+      print("%-22s %7d %10.4f %10.4f %10d %11d %11d" % (Stage, Total['Count'], Total['WallSeconds'], Total['CPUSeconds'], Total['Samples'], Total['Bytes'], Total['PeakMemoryBytes']))
+
+def GetAnalysesWindowBounds():
+   # The first and last date of the analyses window as YYYY-mm-dd strings, these compare like the dates themselves.
+   # In live mode the days before LiveFetchFromDate are already known and left out.
+   if LiveFetchFromDate is not None and LiveFetchFromDate > DateStartAnalyses:
+      return(LiveFetchFromDate.isoformat(), DateEndAnalyses.isoformat())
+   return(DateStartAnalyses.isoformat(), DateEndAnalyses.isoformat())
+
+def GetClimateHistogramTable():
+   # The ClimateHistogramFile is memory mapped on first use, so only the rows that are used are read.
+   # A relative file name is relative to the directory of this script.
+   global ClimateHistogramTable
+   if ClimateHistogramTable is None:
+      FileName=os.path.join(os.path.dirname(os.path.abspath(__file__)), ClimateHistogramFile)
+      ClimateHistogramTable=numpy.load(FileName, mmap_mode='r')
+   return(ClimateHistogramTable)
+
+def LoadClimateHistogram(Period, Station="All"):
+   Table=GetClimateHistogramTable()
+   Rows=numpy.flatnonzero((Table['Period'] == Period) & (Table['Station'] == Station))
+   if len(Rows) == 0:
+      raise KeyError("Climate period "+Period+" of station "+Station+" not found in "+ClimateHistogramFile)
+   return(numpy.array(Table['Days'][Rows[0]]))
+
+def GetClimateDescription():
+   if ClimateStation:
+      return(ClimateStation+" "+ClimateFirstYear.__str__()+"-"+ClimateLastYear.__str__())
+   return(ClimatePeriod)
+
+def GetDaysPerYearAverageTemperature():
+   # The histogram of the ClimateStation years, or else of the ClimatePeriod, only loaded again when these change.
+   # In the HourlyAnalysis it has the hours per year instead of the days, see GetHoursPerYearTemperature.
+   global DaysPerYearAverageTemperature, DaysPerYearAverageTemperaturePeriod
+   Climate=(GetClimateDescription(), HourlyAnalysis)
+   if DaysPerYearAverageTemperature is None or DaysPerYearAverageTemperaturePeriod != Climate:
+      if HourlyAnalysis:
+         DaysPerYearAverageTemperature=GetHoursPerYearTemperature()
+      elif ClimateStation:
+         DaysPerYearAverageTemperature=GetStationTemperatureHistogram(ClimateStation, ClimateFirstYear, ClimateLastYear)
       else:
-         if not HighValueFound:
-            HighValue = LowValue+day
-            HighValueTemperature = temp
-            HighValueFound = True
-   Fraction=1.0-((HighValueTemperature-Temperature)/0.5)
-   DaysPerYear=LowValue+(Fraction*(HighValue-LowValue))
+         DaysPerYearAverageTemperature=LoadClimateHistogram(ClimatePeriod)
+      DaysPerYearAverageTemperaturePeriod=Climate
+   return(DaysPerYearAverageTemperature)
+
+def BuildTemperatureHistogram(Temperatures, TemperatureList):
+   # Average days per year for each temperature of the equally spaced TemperatureList, a daily temperature counts 
+   # for the nearest temperature in the list, temperatures outside the list for the first or last one.
+   Days=CountTemperatures(Temperatures, TemperatureList)
+   return(Days*(365.2425/len(Temperatures)))
+
+def CountTemperatures(Temperatures, TemperatureList):
+   # Number of temperatures nearest to each temperature of the equally spaced TemperatureList.
+   Grid=numpy.asarray(TemperatureList)
+   BinWidth=Grid[1]-Grid[0]
+   Bins=numpy.floor((numpy.asarray(Temperatures, dtype=numpy.float64)-Grid[0])/BinWidth+0.5).astype(numpy.int64)
+   return(numpy.bincount(numpy.clip(Bins, 0, len(Grid)-1), minlength=len(Grid)))
+
+def GetHoursPerYearTemperature():
+   # Average hours per year at each temperature of EnergyTemperatureList, from the KNMI hourly temperatures of the
+   # ClimateStation. The hours are counted a chunk of HourlyChunkDays days at a time, so only one chunk of hours is
+   # in memory. Without a ClimateStation each day of the ClimatePeriod distribution counts as 24 hours.
+   if not ClimateStation:
+      return(LoadClimateHistogram(ClimatePeriod)*24.0)
+   StationID=StationIDDictionary[ClimateStation]
+   Key=(StationID, ClimateFirstYear, ClimateLastYear, EnergyTemperatureList[1]-EnergyTemperatureList[0], 'Hourly')
+   if Key not in TemperatureHistogramCache:
+      FirstDate=datetime.date(ClimateFirstYear,1,1)
+      LastDate=min(datetime.date(ClimateLastYear,12,31), datetime.date.today()-datetime.timedelta(days=1))
+      Hours=numpy.zeros(len(EnergyTemperatureList), dtype=numpy.int64)
+      for SpanFirstDate, SpanLastDate in SplitDateSpans([(FirstDate, LastDate)], HourlyChunkDays):
+         HourList, TemperatureList = GetStationHourlyTemperatures(StationID, SpanFirstDate, SpanLastDate)
+         Hours=Hours+CountTemperatures(TemperatureList, EnergyTemperatureList)
+      if Hours.sum() == 0:
+         raise ValueError("No KNMI hourly temperatures of station "+ClimateStation+" from "+ClimateFirstYear.__str__()+" to "+ClimateLastYear.__str__())
+      TemperatureHistogramCache[Key]=Hours*(365.2425*24.0/Hours.sum())
+   return(TemperatureHistogramCache[Key])
+
+def CalculateHeatingDegreeHours(HeatingLimit):
+   # Degree hours per year below the HeatingLimit, from the hours (days in the daily analysis) per year at each
+   # temperature of the distribution.
+   DegreesBelowLimit=numpy.maximum(HeatingLimit-numpy.asarray(EnergyTemperatureList), 0.0)
+   return(float(numpy.dot(DegreesBelowLimit, GetDaysPerYearAverageTemperature()))*24.0*GetDaysPerSample())
+
+def GetStationTemperatureHistogram(StationName, FirstYear, LastYear):
+   # Temperature distribution of a KNMI station over the years FirstYear up to and including LastYear, binned
+   # like EnergyTemperatureList. Built once per station, years and bin width, the daily temperatures are cached
+   # in the KNMICacheFile.
+   StationID=StationIDDictionary[StationName]
+   Key=(StationID, FirstYear, LastYear, EnergyTemperatureList[1]-EnergyTemperatureList[0])
+   if Key not in TemperatureHistogramCache:
+      FirstDate=datetime.date(FirstYear,1,1)
+      LastDate=min(datetime.date(LastYear,12,31), datetime.date.today()-datetime.timedelta(days=1))
+      DateList, TemperatureList = GetStationTemperatures(StationID, FirstDate, LastDate)
+      if len(TemperatureList) == 0:
+         raise ValueError("No KNMI temperatures of station "+StationName+" from "+FirstYear.__str__()+" to "+LastYear.__str__())
+      TemperatureHistogramCache[Key]=BuildTemperatureHistogram(TemperatureList, EnergyTemperatureList)
+   return(TemperatureHistogramCache[Key])
+
+def BuildDaysPerYearBelowTemperatureIndex(TemperatureList, DaysList):
+   # The cumulative number of days per year up to and including each temperature of a histogram, the temperatures
+   # must be ascending but do not need to be evenly spaced.
+   return(numpy.asarray(TemperatureList, dtype=numpy.float64), numpy.cumsum(DaysList, dtype=numpy.float64))
+
+def GetDaysPerYearBelowTemperatureIndex(TemperatureList, DaysList):
+   # The index is built once per histogram and kept for as long as the same histogram lists are used.
+   global DaysPerYearBelowTemperatureIndex
+   CachedTemperatureList, CachedDaysList, Index = DaysPerYearBelowTemperatureIndex
+   if CachedTemperatureList is not TemperatureList or CachedDaysList is not DaysList:
+      Index=BuildDaysPerYearBelowTemperatureIndex(TemperatureList, DaysList)
+      DaysPerYearBelowTemperatureIndex=(TemperatureList, DaysList, Index)
+   return(Index)
+
+def CalculateDaysPerYearBelowTemperature(Temperature, Index=None):
+   # Days per year below Temperature, interpolated between the histogram temperatures. Temperature can be a single
+   # value or a numpy array of them, each is looked up with a binary search in the cumulative index.
+   # Temperatures outside the histogram give 0 or all days.
+   if Index is None:
+      Index=GetDaysPerYearBelowTemperatureIndex(EnergyTemperatureList, GetDaysPerYearAverageTemperature())
+   IndexTemperatures, CumulativeDays = Index
+   DaysPerYear=numpy.interp(Temperature, IndexTemperatures, CumulativeDays)
+   if numpy.ndim(DaysPerYear) == 0:
+      return(float(DaysPerYear))
    return(DaysPerYear)
 
+def GetUnverifiedContext():
+   global UnverifiedContext
+   if UnverifiedContext is None:
+      UnverifiedContext = ssl._create_unverified_context()
+   return(UnverifiedContext)
+
+def GetDomoticzConnection(URLParts):
+   # Returns the connection of this thread to the Domoticz host, and whether it was used before.
+   Connections=DomoticzConnections.__dict__.setdefault('Connections', {})
+   Key=(URLParts.scheme, URLParts.netloc)
+   if Key in Connections:
+      return(Connections[Key], True)
+   if URLParts.scheme == "https":
+      Connection=HTTPClient.HTTPSConnection(URLParts.netloc, timeout=DomoticzRequestTimeout, context=GetUnverifiedContext())
+   else:
+      Connection=HTTPClient.HTTPConnection(URLParts.netloc, timeout=DomoticzRequestTimeout)
+   Connections[Key]=Connection
+   return(Connection, False)
+
+def CloseDomoticzConnection(URLParts):
+   Connections=DomoticzConnections.__dict__.setdefault('Connections', {})
+   Connection=Connections.pop((URLParts.scheme, URLParts.netloc), None)
+   if Connection is not None:
+      Connection.close()
+
+def FetchDomoticzData(URL, RequiredKeys):
+   # Returns the result items of a Domoticz query that are in the analyses window and have all RequiredKeys, see 
+   # ParseDomoticzResult. The query uses the open connection of this thread, a connection that was closed by Domoticz
+   # since it was last used is opened again, other failures are retried DomoticzRequestRetries times.
+   URLParts=urlsplit(URL)
+   Path=URLParts.path+"?"+URLParts.query
+   Attempt=0
+   while True:
+      Connection, Reused = GetDomoticzConnection(URLParts)
+      try:
+         Connection.request("GET", Path)
+         Response=Connection.getresponse()
+         if Response.status != 200:
+            Response.read()
+            raise HTTPError(URL, Response.status, Response.reason, Response.msg, None)
+         with MeasureStage("FetchDomoticz", URLParts.query) as Stage:
+            ResultList, Complete, BytesRead = ParseDomoticzResult(Response, RequiredKeys)
+            Stage['Samples']=len(ResultList)
+            Stage['Bytes']=BytesRead
+      except HTTPError:
+         #Domoticz answered, so asking again gives the same status, only connection failures are retried.
+         raise
+      except (HTTPClient.HTTPException, socket.error) as fout:
+         CloseDomoticzConnection(URLParts)
+         if not Reused:
+            Attempt=Attempt+1
+         if Attempt > DomoticzRequestRetries:
+            raise URLError(fout)
+         continue
+      if not Complete:
+         #The rest of the response was not read, so the connection can not be used for the next query.
+         CloseDomoticzConnection(URLParts)
+      return(ResultList)
+
+def ReadDomoticzStream(Stream):
+   # Adds the next part of the response to the not yet parsed part, returns False at the end of the response.
+   Chunk=Stream['Response'].read(DomoticzReadSize)
+   Stream['BytesRead']=Stream['BytesRead']+len(Chunk)
+   Stream['Buffer']=Stream['Buffer'][Stream['Position']:]+Stream['TextDecoder'].decode(Chunk, not Chunk)
+   Stream['Position']=0
+   Stream['Complete']=not Chunk
+   return(not Stream['Complete'])
+
+def NextDomoticzCharacter(Stream):
+   # Skips white space and returns the next character without parsing it, "" at the end of the response.
+   while True:
+      Stream['Position']=JsonWhiteSpace.match(Stream['Buffer'], Stream['Position']).end()
+      if Stream['Position'] < len(Stream['Buffer']):
+         return(Stream['Buffer'][Stream['Position']])
+      if not ReadDomoticzStream(Stream):
+         return("")
+
+def NextDomoticzValue(Stream):
+   # Parses the next JSON value, more of the response is read until the value is complete.
+   while True:
+      NextDomoticzCharacter(Stream)
+      try:
+         Value, End = Stream['Decoder'].raw_decode(Stream['Buffer'], Stream['Position'])
+         #A number at the end of the buffer can continue in the next part of the response.
+         if End < len(Stream['Buffer']) or Stream['Complete']:
+            Stream['Position']=End
+            return(Value)
+      except ValueError:
+         if Stream['Complete']:
+            raise
+      ReadDomoticzStream(Stream)
+
+def SkipDomoticzCharacter(Stream, Character):
+   if NextDomoticzCharacter(Stream) == Character:
+      Stream['Position']=Stream['Position']+1
+      return(True)
+   return(False)
+
+def SkipDomoticzItemsBefore(Buffer, Position, StartBound):
+   # Domoticz items are flat objects sorted by date, so when the last item starting in the buffer is before
+   # StartBound, all items before it can be skipped without parsing them. Returns the position to parse from.
+   DatePosition=Buffer.rfind('"d"', Position)
+   Match=JsonDateKey.match(Buffer, DatePosition) if DatePosition >= 0 else None
+   if Match and Match.group(1) < StartBound:
+      ItemStart=Buffer.rfind('{', Position, DatePosition)
+      if ItemStart >= 0 and Buffer.find('}', ItemStart, DatePosition) < 0 and Buffer.find(']', Position, ItemStart) < 0:
+         return(ItemStart)
+   return(Position)
+
+def ParseDomoticzResultItems(Stream, RequiredKeys, ReturnList):
+   # Parses the items of the "result" list up to its closing "]" and adds the ones in the analyses window with all
+   # RequiredKeys to ReturnList. Returns False when reading stopped at an item after the analyses window.
+   # All complete items in the buffer are parsed in one loop, more of the response is only read at its end.
+   StartBound, EndBound = GetAnalysesWindowBounds()
+   Decode=Stream['Decoder'].raw_decode
+   SkipWhiteSpace=JsonWhiteSpace.match
+   while True:
+      Buffer=Stream['Buffer']
+      BufferEnd=len(Buffer)
+      Position=SkipDomoticzItemsBefore(Buffer, Stream['Position'], StartBound)
+      while True:
+         Position=SkipWhiteSpace(Buffer, Position).end()
+         if Position >= BufferEnd:
+            break
+         if Buffer[Position] == ",":
+            Position=Position+1
+            continue
+         if Buffer[Position] == "]":
+            Stream['Position']=Position+1
+            return(True)
+         try:
+            Item, End = Decode(Buffer, Position)
+         except ValueError:
+            break
+         if End >= BufferEnd and not Stream['Complete']:
+            break
+         if 'd' in Item:
+            Date=Item['d'][:10]
+            if Date > EndBound:
+               return(False)
+            if Date >= StartBound and all(Key in Item for Key in RequiredKeys):
+               ReturnList.append(Item)
+         Position=End
+      Stream['Position']=Position
+      if Stream['Complete']:
+         raise ValueError("Domoticz response ends in the result list")
+      ReadDomoticzStream(Stream)
+
+def ParseDomoticzResult(Response, RequiredKeys):
+   # Parses the items of the "result" list of a Domoticz response one by one while the response is read, instead of
+   # reading and parsing it as a whole. Only the items in the analyses window with all RequiredKeys are kept. Domoticz
+   # sorts the items by date, so reading stops at the first item after the window.
+   # Returns the items, whether the response was read completely and the number of bytes read.
+   Stream={'Response':Response, 'Buffer':"", 'Position':0, 'Complete':False, 'BytesRead':0,
+           'TextDecoder':codecs.getincrementaldecoder('utf-8')(), 'Decoder':json.JSONDecoder()}
+   ReturnList=[]
+   if not SkipDomoticzCharacter(Stream, "{"):
+      raise ValueError("Domoticz response is not a JSON object")
+   while not SkipDomoticzCharacter(Stream, "}"):
+      Key=NextDomoticzValue(Stream)
+      if not SkipDomoticzCharacter(Stream, ":"):
+         raise ValueError("Domoticz response is not valid JSON")
+      if Key == "result" and SkipDomoticzCharacter(Stream, "["):
+         if not ParseDomoticzResultItems(Stream, RequiredKeys, ReturnList):
+            return(ReturnList, False, Stream['BytesRead'])
+      else:
+         NextDomoticzValue(Stream)
+      SkipDomoticzCharacter(Stream, ",")
+   return(ReturnList, True, Stream['BytesRead']+len(Response.read()))
+
+def GetDomoticzFetchExecutor():
+   global DomoticzFetchExecutor
+   if DomoticzFetchExecutor is None:
+      DomoticzFetchExecutor = concurrent.futures.ThreadPoolExecutor(max_workers=DomoticzWorkers)
+   return(DomoticzFetchExecutor)
+
 def GetOutdoorTemp():
    #print('>GetOutdoorTemp')
    ReturnList=[]
    try:
-      Page=urlopen(OutdoorTemperatureDataURL, context=UnverifiedContext)
-      DataString=Page.read()
-      JsonData=json.loads(DataString.decode('utf-8'))
-      TemperatureList=JsonData['result']
-      #Filter out only the items with proper values
-      for item in TemperatureList:
-         if 'd' in item:
-            if DataInAnalysesWindow(item['d']):
-               if 'ta' in item:
-                  ReturnList.append(item)
+      #Only the items in the analyses window with proper values
+      ReturnList=FetchDomoticzData(OutdoorTemperatureDataURL, (DomoticzTemperatureKey,))
    except (HTTPError, URLError) as fout:
       print("Error: "+str(fout)+" URL: "+OutdoorTemperatureDataURL)
    #print('<GetOutdoorTemp:'+ReturnList.__str__())
@@ -366,16 +1222,8 @@ def GetIndoorTemp():
    #print('>GetIndoorTemp')
    ReturnList=[]
    try:
-      Page=urlopen(IndoorTemperatureDataURL, context=UnverifiedContext)
-      DataString=Page.read()
-      JsonData=json.loads(DataString.decode('utf-8'))
-      TemperatureList=JsonData['result']
-      #Filter out only the items with proper values
-      for item in TemperatureList:
-         if 'd' in item:
-            if DataInAnalysesWindow(item['d']):
-               if 'ta' in item:
-                  ReturnList.append(item)
+      #Only the items in the analyses window with proper values
+      ReturnList=FetchDomoticzData(IndoorTemperatureDataURL, (DomoticzTemperatureKey,))
    except (HTTPError, URLError) as fout:
       print("Error: "+str(fout)+" URL: "+IndoorTemperatureDataURL)
    #print('<GetIndoorTemp:'+ReturnList.__str__())
@@ -385,16 +1233,8 @@ def GetHeatingEnergy():
    #print('>GetHeatingEnergy')
    ReturnList=[]
    try:
-      Page=urlopen(HeatingEnergyDataURL, context=UnverifiedContext)
-      DataString=Page.read()
-      JsonData=json.loads(DataString.decode('utf-8'))
-      HeatingEnergyList=JsonData['result']
-      #Filter out only the items with proper values
-      for item in HeatingEnergyList:
-         if 'd' in item:
-            if DataInAnalysesWindow(item['d']):
-               if 'v_max' and 'v_min' in item:
-                  ReturnList.append(item)
+      #Only the items in the analyses window with proper values
+      ReturnList=FetchDomoticzData(HeatingEnergyDataURL, DomoticzEnergyKeys)
    except (HTTPError, URLError) as fout:
       print("Error: "+str(fout)+" URL: "+HeatingEnergyDataURL)
    #print('<GetHeatingEnergy:'+ReturnList.__str__())
@@ -404,16 +1244,8 @@ def GetTotalUsedElectricEnergy():
    #print('>GetTotalUsedElectricEnergy')
    ReturnList=[]
    try:
-      Page=urlopen(TotalElectricUsageDataURL, context=UnverifiedContext)
-      DataString=Page.read()
-      JsonData=json.loads(DataString.decode('utf-8'))
-      EnergyList=JsonData['result']
-      #Filter out only the items with proper values
-      for item in EnergyList:
-         if 'd' in item:
-            if DataInAnalysesWindow(item['d']):
-               if 'v' in item:
-                  ReturnList.append(item)
+      #Only the items in the analyses window with proper values
+      ReturnList=FetchDomoticzData(TotalElectricUsageDataURL, ('v',))
    except (HTTPError, URLError) as fout:
       print("Error: "+str(fout)+" URL: "+TotalElectricUsageDataURL)
    #print('<GetTotalUsedElectricEnergy:'+ReturnList.__str__())
@@ -436,224 +1268,914 @@ def GetHeatingEnergyFromGasUsage():
    #print('>GetHeatingEnergyFromGasUsage')
    ReturnList=[]
    try:
-      Page=urlopen(GasUsageDataURL, context=UnverifiedContext)
-      DataString=Page.read()
-      JsonData=json.loads(DataString.decode('utf-8'))
-      HeatingEnergyList=JsonData['result']
-      #Filter out only the items with proper values
-      for item in HeatingEnergyList:
-         if 'd' in item:
-            if DataInAnalysesWindow(item['d']):
-               if 'v' in item:
-                  ReturnList.append(item)
+      #Only the items in the analyses window with proper values
+      ReturnList=FetchDomoticzData(GasUsageDataURL, ('v',))
    except (HTTPError, URLError) as fout:
       print("Error: "+str(fout)+" URL: "+GasUsageDataURL)
    #print('<GetHeatingEnergyFromGasUsage:'+ReturnList.__str__())
    return(ReturnList)
 
-def ConvertGasTokWh(Gas):
-   return(((Gas-CubicMetersGasADayForWarmWaterAndCooking)*EnergyPerCubicMeterGas))
+def ConvertGasTokWh(Gas, DaysPerSample=1.0):
+   return(((Gas-CubicMetersGasADayForWarmWaterAndCooking*DaysPerSample)*EnergyPerCubicMeterGas))
+
+def GetHoursPerSample():
+   # Hours of heating in the energy of one sample, a day of HoursForHeatingADay or an hour in the HourlyAnalysis.
+   return(1.0 if HourlyAnalysis else HoursForHeatingADay)
 
-def CreateDictionaryOfData (IndoorData, OutdoorData, HeatingEnergyData, ElectricEnergyData):
-   OutputDict=collections.OrderedDict()
+def GetDaysPerSample():
+   return(1.0/24.0 if HourlyAnalysis else 1.0)
+
+def GetChannelFromData(Data, Key):
+   # The dates and values of a list of Domoticz items as arrays, dates are kept to the minute for short logs.
+   Dates=numpy.array([item['d'] for item in Data], dtype='datetime64[m]')
+   Values=numpy.array([float(item[Key]) for item in Data], dtype=numpy.float64)
+   return(Dates, Values)
+
+def AggregateHourly(Dates, Values, Sum):
+   # Bins the values of a channel on the hours of their dates, the sum or the mean of each hour, with one bincount.
+   Hours, HourIndex = numpy.unique(Dates.astype('datetime64[h]'), return_inverse=True)
+   HourSums=numpy.bincount(HourIndex, weights=Values, minlength=len(Hours))
+   if Sum:
+      return(Hours, HourSums)
+   return(Hours, HourSums/numpy.bincount(HourIndex, minlength=len(Hours)))
+
+def GetHourlyChannelsFromData(IndoorData, OutdoorData, HeatingEnergyData, ElectricEnergyData):
+   # The channels of the short logs of the sensors per hour. Gas and electricity have the use of each 5 minutes, the
+   # heating energy sensor has the meter reading of which the increases are added up, a meter reset counts as 0.
+   Channels=collections.OrderedDict()
    if (EstimateAdditionalInternalAndExternalEnergy):
-      for item in IndoorData:
-         ValueDict = dict()
-         ValueDict['IndoorTemperature']=item['ta']
-         if item['d'] in OutputDict:
-            OutputDict[item['d']].append(ValueDict)
-         else:
-            ValueList = []
-            ValueList.append(ValueDict)
-            OutputDict[item['d']]=ValueList
-      for item in ElectricEnergyData:
-         ValueDict = dict()
-         ValueDict['ElectricEnergy']=item['v']
-         if item['d'] in OutputDict:
-            OutputDict[item['d']].append(ValueDict)
-         else:
-            ValueList = []
-            ValueList.append(ValueDict)
-            OutputDict[item['d']]=ValueList
-   for item in OutdoorData:
-      ValueDict = dict()
-      ValueDict['OutdoorTemperature']=item['ta']
-      if item['d'] in OutputDict:
-         OutputDict[item['d']].append(ValueDict)
-      else:
-         ValueList = []
-         ValueList.append(ValueDict)
-         OutputDict[item['d']]=ValueList
+      Channels['IndoorTemperature']=AggregateHourly(*GetChannelFromData(IndoorData, 'te'), Sum=False)
+      Channels['ElectricEnergy']=AggregateHourly(*GetChannelFromData(ElectricEnergyData, 'v'), Sum=True)
+   Channels['OutdoorTemperature']=AggregateHourly(*GetChannelFromData(OutdoorData, 'te'), Sum=False)
+   Dates, Values = GetChannelFromData(HeatingEnergyData, 'v')
    if (UseGasDataForHeatingEnergyEstimation):
-      for item in HeatingEnergyData:
-         ValueDict = dict()
-         ValueDict['Energy']=ConvertGasTokWh(float(item['v'])).__str__()
-         if item['d'] in OutputDict:
-            OutputDict[item['d']].append(ValueDict)
-         else:
-            ValueList = []
-            ValueList.append(ValueDict)
-            OutputDict[item['d']]=ValueList
+      Hours, Gas = AggregateHourly(Dates, Values, Sum=True)
+      Channels['Energy']=(Hours, ConvertGasTokWh(Gas, GetDaysPerSample()))
    else:
-      for item in HeatingEnergyData:
-         ValueDict = dict()
-         ValueDict['Energy']=(float(item['v_max'])-float(item['v_min'])).__str__()
-         if item['d'] in OutputDict:
-            OutputDict[item['d']].append(ValueDict)
-         else:
-            ValueList = []
-            ValueList.append(ValueDict)
-            OutputDict[item['d']]=ValueList
-   return(OutputDict)
+      Order=numpy.argsort(Dates, kind='stable')
+      Channels['Energy']=AggregateHourly(Dates[Order][1:], numpy.maximum(numpy.diff(Values[Order]), 0.0), Sum=True)
+   return(Channels)
 
-def GetDataListsFromDictionary (Measurements):
-   #Initialize Previous Values, to be used when entry is missing.
-   HeatingPowerSamples=[]
-   IndoorTempSamples=[]
-   OutdoorTempSamples=[]
-   ElectricEnergySamples=[]
-   PreviousIndoorTemperature = 0.0
-   PreviousOutdoorTemperature = 0.0
-   PreviousHeatingPower = 0.0
-   PreviousElectricEnergy = 0.0
-   for Date, ValueList in Measurements.items():
-      for Value in ValueList:
-         if 'Energy' in Value:
-            PreviousHeatingPower = float(Value['Energy'])/HoursForHeatingADay
-         if 'OutdoorTemperature' in Value:
-            PreviousOutdoorTemperature = float(Value['OutdoorTemperature'])
-         if 'ElectricEnergy' in Value:
-            PreviousElectricEnergy = float(Value['ElectricEnergy'])
-         if 'IndoorTemperature' in Value:
-            PreviousIndoorTemperature = float(Value['IndoorTemperature'])
-      ElectricEnergySamples.append(PreviousElectricEnergy)
-      HeatingPowerSamples.append(PreviousHeatingPower)
-      IndoorTempSamples.append(PreviousIndoorTemperature)
-      OutdoorTempSamples.append(PreviousOutdoorTemperature)
+def GetDailyChannelsFromData(IndoorData, OutdoorData, HeatingEnergyData, ElectricEnergyData):
+   # The channels of the daily values of the sensors.
+   Channels=collections.OrderedDict()
+   if (EstimateAdditionalInternalAndExternalEnergy):
+      Channels['IndoorTemperature']=GetChannelFromData(IndoorData, 'ta')
+      Channels['ElectricEnergy']=GetChannelFromData(ElectricEnergyData, 'v')
+   Channels['OutdoorTemperature']=GetChannelFromData(OutdoorData, 'ta')
+   if (UseGasDataForHeatingEnergyEstimation):
+      Dates, Gas = GetChannelFromData(HeatingEnergyData, 'v')
+      Channels['Energy']=(Dates, ConvertGasTokWh(Gas))
+   else:
+      Dates, EnergyMax = GetChannelFromData(HeatingEnergyData, 'v_max')
+      Dates, EnergyMin = GetChannelFromData(HeatingEnergyData, 'v_min')
+      Channels['Energy']=(Dates, EnergyMax-EnergyMin)
+   return(Channels)
+
+def CreateColumnsOfData(IndoorData, OutdoorData, HeatingEnergyData, ElectricEnergyData):
+   # Merges the sensor data into one sorted date index with a value array per channel, NaN where a channel has no
+   # value on a date (hour in the HourlyAnalysis). When a channel has a date more than once the last value is used.
+   if HourlyAnalysis:
+      Channels=GetHourlyChannelsFromData(IndoorData, OutdoorData, HeatingEnergyData, ElectricEnergyData)
+   else:
+      Channels=GetDailyChannelsFromData(IndoorData, OutdoorData, HeatingEnergyData, ElectricEnergyData)
+   Columns=collections.OrderedDict()
+   Columns['Date']=numpy.unique(numpy.concatenate([Dates for Dates, Values in Channels.values()]))
+   for Channel, (Dates, Values) in Channels.items():
+      Columns[Channel]=numpy.full(len(Columns['Date']), numpy.nan)
+      Columns[Channel][numpy.searchsorted(Columns['Date'], Dates)]=Values
+   return(Columns)
+
+def ForwardFillColumn(Column):
+   # Replaces each NaN by the last value before it, or by 0.0 when there is none.
+   LastValueIndex=numpy.where(numpy.isnan(Column), 0, numpy.arange(1, len(Column)+1))
+   numpy.maximum.accumulate(LastValueIndex, out=LastValueIndex)
+   return(numpy.concatenate(([0.0], Column))[LastValueIndex])
+
+def GetDataListsFromColumns (Columns):
+   # Sample arrays for each date, a channel without a value on a date uses its previous value.
+   Zeros=numpy.zeros(len(Columns['Date']))
+   HeatingPowerSamples=ForwardFillColumn(Columns['Energy'])/GetHoursPerSample()
+   OutdoorTempSamples=ForwardFillColumn(Columns['OutdoorTemperature'])
+   if 'IndoorTemperature' in Columns:
+      IndoorTempSamples=ForwardFillColumn(Columns['IndoorTemperature'])
+      ElectricEnergySamples=ForwardFillColumn(Columns['ElectricEnergy'])
+   else:
+      IndoorTempSamples=Zeros
+      ElectricEnergySamples=Zeros
    return(IndoorTempSamples, OutdoorTempSamples, HeatingPowerSamples, ElectricEnergySamples)
 
-def GetDataListsFromCSVFile():
-   HeatingPowerSamples=[]
-   OutdoorTempSamples=[]
-   IndoorTempSamples=[]
-   ElectricitySamples=[]
-   with open(CSVFile) as csvfile:
-      readCSV=csv.reader(csvfile, delimiter=',')
-      for row in readCSV:
-         if row[0].strip() and row[1].strip():
-            OutdoorTempSamples.append(float(row[0]))
-            if UseGasDataForHeatingEnergyEstimation:
-               HeatingPower=ConvertGasTokWh(float(row[1]))/HoursForHeatingADay
-            else:
-               HeatingPower= float(row[1])/HoursForHeatingADay  
-            HeatingPowerSamples.append(HeatingPower)
-         if EstimateAdditionalInternalAndExternalEnergy:
-            if row[2].strip() and row[3].strip():
-               IndoorTempSamples.append(float(row[2]))
-               ElectricitySamples.append(round(TotalUsageCorrectionFactor*float(row[3]),3))
+def LoadCSVFloatColumns(FileName, Columns):
+   # Parses the columns of a .csv file straight into a 2D float array (row, column), blank cells become NaN.
+   try:
+      Data=numpy.loadtxt(FileName, delimiter=',', usecols=Columns, dtype=numpy.float64, ndmin=2)
+   except ValueError:
+      #The fast parser does not accept blank cells, use the slower one that does.
+      Data=numpy.genfromtxt(FileName, delimiter=',', usecols=Columns, dtype=numpy.float64, filling_values=numpy.nan, ndmin=2)
+   return(Data)
+
+def GetDataListsFromCSVFile(Source=None):
+   # Source is the CSVFile, or a list of lines read from it.
+   if Source is None:
+      Source=CSVFile
+   if EstimateAdditionalInternalAndExternalEnergy:
+      Data=LoadCSVFloatColumns(Source, (0,1,2,3))
+   else:
+      Data=LoadCSVFloatColumns(Source, (0,1))
+   #Rows with a blank temperature or energy are skipped, same for blank indoor temperature or electricity.
+   EnergyRows=~(numpy.isnan(Data[:,0]) | numpy.isnan(Data[:,1]))
+   OutdoorTempSamples=Data[EnergyRows,0]
+   if UseGasDataForHeatingEnergyEstimation:
+      HeatingPowerSamples=ConvertGasTokWh(Data[EnergyRows,1], GetDaysPerSample())/GetHoursPerSample()
+   else:
+      HeatingPowerSamples=Data[EnergyRows,1]/GetHoursPerSample()
+   if EstimateAdditionalInternalAndExternalEnergy:
+      InternalRows=~(numpy.isnan(Data[:,2]) | numpy.isnan(Data[:,3]))
+      IndoorTempSamples=Data[InternalRows,2]
+      ElectricitySamples=numpy.round(TotalUsageCorrectionFactor*Data[InternalRows,3],3)
+   else:
+      IndoorTempSamples=numpy.empty(0)
+      ElectricitySamples=numpy.empty(0)
    return(OutdoorTempSamples, HeatingPowerSamples, IndoorTempSamples, ElectricitySamples)
 
-def GetGasOnlyFromCSVFile():
-   DateSamples=[]
-   GasEnergySamples=[]
+def GetGasOnlyFromCSVFile(Source=None):
+   # Source is the CSVGasOnlyFile, or a list of lines read from it. The file is parsed in chunks of HourlyChunkDays
+   # days of hourly lines, so the text of a long hourly file is never in memory as a whole, only the arrays.
+   if Source is not None:
+      return(ParseGasOnlyLines(Source))
+   DateChunks=[]
+   GasEnergyChunks=[]
    with open(CSVGasOnlyFile) as csvfile:
-      readCSV=csv.reader(csvfile, delimiter=',')
-      for row in readCSV:
-         if row[0].strip() and row[1].strip():
-            DateString=row[0].split(" ")[0]
-            DateObject=datetime.datetime.strptime(DateString, '%Y-%m-%d').date()
-            DateSamples.append(DateObject)
-            HeatingPower=ConvertGasTokWh(float(row[1]))/HoursForHeatingADay
-            GasEnergySamples.append(HeatingPower)
-   return(DateSamples, GasEnergySamples)
+      for Lines in iter(lambda: list(itertools.islice(csvfile, HourlyChunkDays*24)), []):
+         DateSamples, GasEnergySamples = ParseGasOnlyLines(Lines)
+         DateChunks.append(DateSamples)
+         GasEnergyChunks.append(GasEnergySamples)
+   if not DateChunks:
+      return(ParseGasOnlyLines([]))
+   return(numpy.concatenate(DateChunks), numpy.concatenate(GasEnergyChunks))
+
+def ParseGasOnlyLines(Lines):
+   #Only the first 10 characters (YYYY-mm-dd) of the date are parsed, so a time part is ignored. In the HourlyAnalysis
+   #the first 13 (YYYY-mm-dd HH) are parsed, so only the minutes are ignored.
+   if HourlyAnalysis:
+      DateType, DateUnit = 'U13', 'datetime64[h]'
+   else:
+      DateType, DateUnit = 'U10', 'datetime64[D]'
+   Lines=[Line for Line in Lines if Line.strip()]
+   if not Lines:
+      return(numpy.empty(0, dtype=DateUnit), numpy.empty(0))
+   DateStrings=numpy.char.strip(numpy.loadtxt(Lines, delimiter=',', usecols=0, dtype=DateType, ndmin=1))
+   DateSamples=DateStrings.astype(DateUnit)
+   GasSamples=LoadCSVFloatColumns(Lines, (1,))[:,0]
+   ValidRows=~(numpy.isnat(DateSamples) | numpy.isnan(GasSamples))
+   GasEnergySamples=ConvertGasTokWh(GasSamples[ValidRows], GetDaysPerSample())/GetHoursPerSample()
+   return(DateSamples[ValidRows], GasEnergySamples)
 
 def GetTemperaturesFromKNMI(DateSamples):
-   StationID=StationIDDictionary[KNMIStationToUse]
-   data="vars=TG&start="+DateSamples[0].strftime('%Y%m%d')+"&end="+DateSamples[-1].strftime('%Y%m%d')+"&stns="+StationID
-   req = PostRequest(KNMIDataURL, data.encode('utf-8'))
-   response = urlopen(req)
-   QueryResponse = response.read()
-   DateList, TemperatureList = ParseKNMIData(QueryResponse,StationID)
-   return(DateList, TemperatureList)
-   
-def ParseKNMIData(QueryResponse,StationID):
-   LineCounter = 0
+   # Daily temperatures as lists, or in the HourlyAnalysis hourly temperatures as arrays.
+   FirstDate=numpy.datetime64(DateSamples[0],'D').astype(datetime.date)
+   LastDate=numpy.datetime64(DateSamples[-1],'D').astype(datetime.date)
+   if HourlyAnalysis:
+      return(GetHourlyTemperaturesFromKNMI(FirstDate, LastDate))
+   if HouseLatitude is not None and HouseLongitude is not None:
+      return(GetBlendedTemperatures(HouseLatitude, HouseLongitude, FirstDate, LastDate))
+   return(GetStationTemperatures(StationIDDictionary[KNMIStationToUse], FirstDate, LastDate))
+
+def GetHourlyTemperaturesFromKNMI(FirstDate, LastDate):
+   # The hours in UT of the day before are queried too, since the first local hours can fall on it.
+   if HouseLatitude is not None and HouseLongitude is not None:
+      Hours, Temperatures = GetBlendedTemperatures(HouseLatitude, HouseLongitude, FirstDate-datetime.timedelta(days=1), LastDate, Hourly=True)
+   else:
+      Hours, Temperatures = GetStationHourlyTemperatures(StationIDDictionary[KNMIStationToUse], FirstDate-datetime.timedelta(days=1), LastDate)
+   InSpan=Hours >= numpy.datetime64(FirstDate).astype('datetime64[h]')
+   return(Hours[InSpan], Temperatures[InSpan])
+
+def GetStationIndex():
+   # The stations as points on the unit sphere, so the distances to all of them are found with one matrix product.
+   global StationIndex
+   if StationIndex is None:
+      Names=list(StationCoordinatesDictionary)
+      Latitudes, Longitudes = numpy.radians(numpy.array([StationCoordinatesDictionary[Name] for Name in Names])).T
+      StationIndex=(Names, numpy.column_stack((numpy.cos(Latitudes)*numpy.cos(Longitudes), numpy.cos(Latitudes)*numpy.sin(Longitudes), numpy.sin(Latitudes))))
+   return(StationIndex)
+
+def FindNearestStations(Latitude, Longitude, Count):
+   # Names of the Count stations nearest to the location and their great circle distances in km, nearest first.
+   Names, Positions = GetStationIndex()
+   LatitudeRadians, LongitudeRadians = numpy.radians(Latitude), numpy.radians(Longitude)
+   Location=numpy.array([numpy.cos(LatitudeRadians)*numpy.cos(LongitudeRadians), numpy.cos(LatitudeRadians)*numpy.sin(LongitudeRadians), numpy.sin(LatitudeRadians)])
+   Distances=EarthRadius*numpy.arccos(numpy.clip(numpy.dot(Positions, Location), -1.0, 1.0))
+   Nearest=numpy.argsort(Distances)[:max(1, Count)]
+   return([Names[Index] for Index in Nearest], Distances[Nearest])
+
+def GetBlendedTemperatures(Latitude, Longitude, FirstDate, LastDate, Hourly=False):
+   # Daily temperatures at the location, the inverse distance weighted average of the nearest stations. On days
+   # a station has no temperature the weights of the other stations are used, days none of them has are left out.
+   # With Hourly the hourly temperatures are blended the same way and returned as arrays.
+   Names, Distances = FindNearestStations(Latitude, Longitude, KNMINearestStations)
+   #A house right next to a station gets (almost) only its temperature.
+   Weights=1.0/numpy.maximum(Distances, 0.01)**KNMIWeightPower
+   Unit='datetime64[h]' if Hourly else 'datetime64[D]'
+   Times=numpy.arange(numpy.datetime64(FirstDate).astype(Unit), (numpy.datetime64(LastDate)+1).astype(Unit))
+   if Hourly:
+      Times=Times+KNMIHourlyTimeOffset
+   Temperatures=numpy.full((len(Names), len(Times)), numpy.nan)
+   for Row, Name in enumerate(Names):
+      if Hourly:
+         StationTimes, StationTemperatures = GetStationHourlyTemperatures(StationIDDictionary[Name], FirstDate, LastDate)
+      else:
+         StationTimes, StationTemperatures = GetStationTemperatures(StationIDDictionary[Name], FirstDate, LastDate)
+      Temperatures[Row, (numpy.array(StationTimes, dtype=Unit)-Times[0]).astype(numpy.int64)]=StationTemperatures
+   Weights=numpy.where(numpy.isnan(Temperatures), 0.0, Weights[:,None])
+   WeightSums=Weights.sum(axis=0)
+   Found=WeightSums > 0
+   Blended=(numpy.nan_to_num(Temperatures)*Weights).sum(axis=0)[Found]/WeightSums[Found]
+   if Hourly:
+      return(Times[Found], numpy.round(Blended, 2))
+   return(Times[Found].astype(datetime.date).tolist(), numpy.round(Blended, 2).tolist())
+
+def PrintNearestStations():
+   Names, Distances = FindNearestStations(HouseLatitude, HouseLongitude, KNMINearestStations)
+   print("KNMI Stations: "+", ".join(Name+" ("+round(Distance,1).__str__()+" km)" for Name, Distance in zip(Names, Distances.tolist())))
+
+def GetStationTemperatures(StationID, FirstDate, LastDate):
+   # Daily average temperatures of a KNMI station, dates missing in the KNMICacheFile are queried.
+   if StationID in SharedStationTemperatures:
+      SharedFirstDate, SharedLastDate, Dates, Temperatures = SharedStationTemperatures[StationID]
+      if SharedFirstDate <= FirstDate and LastDate <= SharedLastDate:
+         InSpan=(Dates >= numpy.datetime64(FirstDate)) & (Dates <= numpy.datetime64(LastDate))
+         KNMICacheStatistics['Hits'] = KNMICacheStatistics['Hits'] + int(numpy.count_nonzero(InSpan))
+         return(Dates[InSpan].astype(datetime.date).tolist(), Temperatures[InSpan].tolist())
+   if KNMIArchiveDirectory:
+      Dates, Temperatures = ReadKNMIArchive(StationID)
+      InSpan=(Dates >= numpy.datetime64(FirstDate)) & (Dates <= numpy.datetime64(LastDate))
+      return(Dates[InSpan].astype(datetime.date).tolist(), Temperatures[InSpan].tolist())
+   if not KNMICacheFile:
+      if KNMIOfflineMode:
+         raise URLError("KNMI offline mode and no KNMICacheFile configured")
+      QueryResponse = FetchKNMIData(StationID, FirstDate, LastDate)
+      with MeasureStage("ParseKNMIData", StationID) as Stage:
+         Dates, Temperatures = ParseKNMIData(QueryResponse,StationID)
+         Stage['Samples']=len(Dates)
+      KNMICacheStatistics['Misses'] = KNMICacheStatistics['Misses'] + len(Dates)
+      return(Dates.astype(datetime.date).tolist(), Temperatures.tolist())
+   Connection = OpenKNMICache()
+   try:
+      with MeasureStage("ReadKNMICache", StationID) as Stage:
+         CachedTemperatures = GetCachedKNMIData(Connection, StationID, FirstDate, LastDate)
+         Stage['Samples']=len(CachedTemperatures)
+      MissingDateSpans = FindMissingDateSpans(CachedTemperatures, FirstDate, LastDate)
+      KNMICacheStatistics['Hits'] = KNMICacheStatistics['Hits'] + len(CachedTemperatures)
+      if MissingDateSpans and KNMIOfflineMode:
+         raise URLError("KNMI offline mode, station "+StationID+" not cached from "+MissingDateSpans[0][0].__str__()+" to "+MissingDateSpans[-1][1].__str__())
+      for FirstDate, LastDate in MissingDateSpans:
+         QueryResponse = FetchKNMIData(StationID, FirstDate, LastDate)
+         with MeasureStage("ParseKNMIData", StationID) as Stage:
+            Dates, Temperatures = ParseKNMIData(QueryResponse,StationID)
+            Stage['Samples']=len(Dates)
+         SpanTemperatures = StoreKNMIData(Connection, StationID, FirstDate, LastDate, Dates, Temperatures)
+         CachedTemperatures.update(SpanTemperatures)
+         KNMICacheStatistics['Misses'] = KNMICacheStatistics['Misses'] + len(SpanTemperatures)
+   finally:
+      Connection.close()
    DateList=[]
    TemperatureList=[]
-   QueryResponseLines=QueryResponse.decode().split('\n')
-   for line in QueryResponseLines:
-      LineList=line.split(',')
-      if LineList[0].strip() == StationID:
-         LineCounter = LineCounter + 1 
-         rawdate=LineList[1].strip()
-         rawtemp=LineList[2].strip()
-         if rawtemp and rawdate:
-            DateToAdd = datetime.datetime.strptime(rawdate.__str__(), '%Y%m%d').date()
-            DateList.append(DateToAdd)
-            TemperatureList.append((float(rawtemp)/10.0))
-   return(DateList,TemperatureList)
+   for Day in sorted(CachedTemperatures):
+      if CachedTemperatures[Day] is not None:
+         DateList.append(datetime.date.fromordinal(Day))
+         TemperatureList.append(CachedTemperatures[Day])
+   return(DateList, TemperatureList)
 
-   
-def FitEnergyVsTOutsideFunction(OutdoorTempSamples, Gain, Offset):
-   return(OutdoorTempSamples*Gain + Offset)
+def GetStationHourlyTemperatures(StationID, FirstDate, LastDate):
+   # Hourly temperatures of a KNMI station from the first hour of FirstDate up to the last of LastDate in UT, as a
+   # datetime64[h] array in local time (KNMIHourlyTimeOffset) and a float array. Days missing in the KNMICacheFile are
+   # queried in spans of at most HourlyChunkDays days.
+   if KNMIOfflineMode and not KNMICacheFile:
+      raise URLError("KNMI offline mode and no KNMICacheFile configured")
+   if not KNMICacheFile:
+      HourChunks=[]
+      TemperatureChunks=[]
+      for SpanFirstDate, SpanLastDate in SplitDateSpans([(FirstDate, LastDate)], HourlyChunkDays):
+         QueryResponse = FetchKNMIData(StationID, SpanFirstDate, SpanLastDate, Hourly=True)
+         with MeasureStage("ParseKNMIData", StationID) as Stage:
+            Hours, Temperatures = ParseKNMIHourlyData(QueryResponse,StationID)
+            Stage['Samples']=len(Hours)
+         KNMICacheStatistics['Misses'] = KNMICacheStatistics['Misses'] + (SpanLastDate-SpanFirstDate).days+1
+         HourChunks.append(Hours)
+         TemperatureChunks.append(Temperatures)
+      return(numpy.concatenate(HourChunks)+KNMIHourlyTimeOffset, numpy.concatenate(TemperatureChunks))
+   Connection = OpenKNMICache()
+   try:
+      with MeasureStage("ReadKNMICache", StationID) as Stage:
+         CachedTemperatures = GetCachedKNMIData(Connection, StationID, FirstDate, LastDate, "HourlyTemperature")
+         Stage['Samples']=len(CachedTemperatures)
+      MissingDateSpans = FindMissingDateSpans(CachedTemperatures, FirstDate, LastDate)
+      KNMICacheStatistics['Hits'] = KNMICacheStatistics['Hits'] + len(CachedTemperatures)
+      if MissingDateSpans and KNMIOfflineMode:
+         raise URLError("KNMI offline mode, station "+StationID+" not cached from "+MissingDateSpans[0][0].__str__()+" to "+MissingDateSpans[-1][1].__str__())
+      for SpanFirstDate, SpanLastDate in SplitDateSpans(MissingDateSpans, HourlyChunkDays):
+         QueryResponse = FetchKNMIData(StationID, SpanFirstDate, SpanLastDate, Hourly=True)
+         with MeasureStage("ParseKNMIData", StationID) as Stage:
+            Hours, Temperatures = ParseKNMIHourlyData(QueryResponse,StationID)
+            Stage['Samples']=len(Hours)
+         SpanTemperatures = StoreKNMIHourlyData(Connection, StationID, SpanFirstDate, SpanLastDate, Hours, Temperatures)
+         CachedTemperatures.update(SpanTemperatures)
+         KNMICacheStatistics['Misses'] = KNMICacheStatistics['Misses'] + len(SpanTemperatures)
+   finally:
+      Connection.close()
+   #Each cached day is an array of 24 float32 temperatures, NaN for hours without a value.
+   Days=[Day for Day in sorted(CachedTemperatures) if CachedTemperatures[Day] is not None]
+   DayTemperatures=numpy.frombuffer(b"".join(CachedTemperatures[Day] for Day in Days), dtype=numpy.float32).reshape(-1, 24)
+   Hours=(numpy.array(Days, dtype=numpy.int64)-EpochOrdinal).astype('datetime64[D]').astype('datetime64[h]')[:,None]+numpy.arange(24)
+   Found=~numpy.isnan(DayTemperatures)
+   return(Hours[Found]+KNMIHourlyTimeOffset, DayTemperatures[Found].astype(numpy.float64))
+
+def SplitDateSpans(DateSpans, MaxDays):
+   # The (FirstDate, LastDate) spans split in spans of at most MaxDays days.
+   for FirstDate, LastDate in DateSpans:
+      while FirstDate <= LastDate:
+         SpanLastDate=min(LastDate, FirstDate+datetime.timedelta(days=MaxDays-1))
+         yield(FirstDate, SpanLastDate)
+         FirstDate=SpanLastDate+datetime.timedelta(days=1)
+
+def FetchKNMIData(StationID, FirstDate, LastDate, Hourly=False):
+   # The daily average temperatures (TG) of the days, or with Hourly the temperatures (T) of hour 1 to 24 of them.
+   if Hourly:
+      URL=KNMIHourlyDataURL
+      data="vars=T&start="+FirstDate.strftime('%Y%m%d')+"01&end="+LastDate.strftime('%Y%m%d')+"24&stns="+StationID
+   else:
+      URL=KNMIDataURL
+      data="vars=TG&start="+FirstDate.strftime('%Y%m%d')+"&end="+LastDate.strftime('%Y%m%d')+"&stns="+StationID
+   req = PostRequest(URL, data.encode('utf-8'))
+   with MeasureStage("FetchKNMI", StationID) as Stage:
+      response = urlopen(req, timeout=KNMIRequestTimeout)
+      QueryResponse = response.read()
+      Stage['Bytes']=len(QueryResponse)
+   KNMICacheStatistics['Requests'] = KNMICacheStatistics['Requests'] + 1
+   KNMICacheStatistics['BytesFetched'] = KNMICacheStatistics['BytesFetched'] + len(QueryResponse)
+   return(QueryResponse)
+
+def OpenKNMICache():
+   Connection = sqlite3.connect(KNMICacheFile, timeout=60)
+   # Days are stored as date ordinals, a NULL Temperature means the KNMI had no value for that day.
+   Connection.execute("CREATE TABLE IF NOT EXISTS DailyTemperature (Station INTEGER, Day INTEGER, Temperature REAL, FetchedOn INTEGER, PRIMARY KEY (Station, Day)) WITHOUT ROWID")
+   # The hourly temperatures of a day are stored as one BLOB of 24 float32 values in UT, hour 1 to 24 of the KNMI.
+   Connection.execute("CREATE TABLE IF NOT EXISTS HourlyTemperature (Station INTEGER, Day INTEGER, Temperature BLOB, FetchedOn INTEGER, PRIMARY KEY (Station, Day)) WITHOUT ROWID")
+   return(Connection)
+
+def GetCachedKNMIData(Connection, StationID, FirstDate, LastDate, Table="DailyTemperature"):
+   # Days within KNMICacheRevisionDays of the day they were fetched can still be revised by the KNMI, these are
+   # only used on the day they were fetched.
+   Today=datetime.date.today().toordinal()
+   Rows=Connection.execute("SELECT Day, Temperature FROM "+Table+" WHERE Station=? AND Day BETWEEN ? AND ? AND (Day <= FetchedOn-? OR FetchedOn >= ?)",
+                           (int(StationID), FirstDate.toordinal(), LastDate.toordinal(), KNMICacheRevisionDays, Today))
+   return(dict(Rows.fetchall()))
+
+def FindMissingDateSpans(CachedTemperatures, FirstDate, LastDate):
+   MissingDateSpans=[]
+   SpanStart=None
+   for Day in range(FirstDate.toordinal(), LastDate.toordinal()+1):
+      if Day not in CachedTemperatures:
+         if SpanStart is None:
+            SpanStart=Day
+      elif SpanStart is not None:
+         MissingDateSpans.append((datetime.date.fromordinal(SpanStart), datetime.date.fromordinal(Day-1)))
+         SpanStart=None
+   if SpanStart is not None:
+      MissingDateSpans.append((datetime.date.fromordinal(SpanStart), LastDate))
+   return(MissingDateSpans)
+
+def StoreKNMIData(Connection, StationID, FirstDate, LastDate, Dates, Temperatures):
+   Today=datetime.date.today().toordinal()
+   SpanTemperatures=dict.fromkeys(range(FirstDate.toordinal(), LastDate.toordinal()+1))
+   SpanTemperatures.update(zip((Dates.astype(numpy.int64)+EpochOrdinal).tolist(), Temperatures.tolist()))
+   with Connection:
+      Connection.executemany("INSERT OR REPLACE INTO DailyTemperature VALUES (?,?,?,?)",
+                             [(int(StationID), Day, Temperature, Today) for Day, Temperature in SpanTemperatures.items()])
+   return(SpanTemperatures)
+
+def StoreKNMIHourlyData(Connection, StationID, FirstDate, LastDate, Hours, Temperatures):
+   # Stores the hours of the span in UT per day, a day without any hour stored as NULL.
+   Today=datetime.date.today().toordinal()
+   DayTemperatures=numpy.full(((LastDate-FirstDate).days+1, 24), numpy.nan, dtype=numpy.float32)
+   HourIndex=(Hours-numpy.datetime64(FirstDate).astype('datetime64[h]')).astype(numpy.int64)
+   InSpan=(HourIndex >= 0) & (HourIndex < DayTemperatures.size)
+   DayTemperatures.reshape(-1)[HourIndex[InSpan]]=Temperatures[InSpan]
+   Found=~numpy.isnan(DayTemperatures).all(axis=1)
+   SpanTemperatures=dict((FirstDate.toordinal()+Index, DayTemperatures[Index].tobytes() if Found[Index] else None) for Index in range(len(DayTemperatures)))
+   with Connection:
+      Connection.executemany("INSERT OR REPLACE INTO HourlyTemperature VALUES (?,?,?,?)",
+                             [(int(StationID), Day, Temperature, Today) for Day, Temperature in SpanTemperatures.items()])
+   return(SpanTemperatures)
+
+def PrintKNMICacheStatistics():
+   CacheFileBytes = os.path.getsize(KNMICacheFile) if KNMICacheFile and os.path.exists(KNMICacheFile) else 0
+   print("KNMI Cache: "+KNMICacheStatistics['Hits'].__str__()+" days cached, "+KNMICacheStatistics['Misses'].__str__()+" days fetched in "+KNMICacheStatistics['Requests'].__str__()+" requests ("+KNMICacheStatistics['BytesFetched'].__str__()+" bytes), cache file "+CacheFileBytes.__str__()+" bytes")
+
+def ParseKNMIData(QueryResponse,StationID):
+   # Daily average temperatures (TG) of StationID in the bytes of a KNMI response or in a memory mapped etmgeg_ file,
+   # as a datetime64[D] array of dates and a float array of temperatures in C. Instead of splitting it into strings,
+   # the line ends and commas of the data are found as byte positions with numpy and the station, date and TG fields
+   # are read from those as integers. Comment and header lines are left out since their first field is no number,
+   # days without TG are left out too.
+   Buffer, FieldBounds = FindKNMIStationLines(QueryResponse, StationID)
+   if FieldBounds is None:
+      return(numpy.empty(0, dtype='datetime64[D]'), numpy.empty(0))
+   Dates, DateFound = ParseKNMIIntegers(Buffer, *GetKNMIFieldBounds(*FieldBounds, Column=1), Width=8)
+   Temperatures, TemperatureFound = ParseKNMIIntegers(Buffer, *GetKNMIFieldBounds(*FieldBounds, Column=FindKNMIColumn(QueryResponse, b"TG")), Width=6)
+   Found=DateFound & TemperatureFound
+   return(ConvertKNMIDates(Dates[Found]), Temperatures[Found]/10.0)
+
+def ParseKNMIHourlyData(QueryResponse,StationID):
+   # Hourly temperatures (T) of StationID in a KNMI response like ParseKNMIData, as a datetime64[h] array of the
+   # hours in UT and a float array of temperatures in C. The KNMI hour HH is the hour ending at HH.
+   Buffer, FieldBounds = FindKNMIStationLines(QueryResponse, StationID)
+   if FieldBounds is None:
+      return(numpy.empty(0, dtype='datetime64[h]'), numpy.empty(0))
+   Dates, DateFound = ParseKNMIIntegers(Buffer, *GetKNMIFieldBounds(*FieldBounds, Column=1), Width=8)
+   Hours, HourFound = ParseKNMIIntegers(Buffer, *GetKNMIFieldBounds(*FieldBounds, Column=FindKNMIColumn(QueryResponse, b"HH", 2)), Width=6)
+   Temperatures, TemperatureFound = ParseKNMIIntegers(Buffer, *GetKNMIFieldBounds(*FieldBounds, Column=FindKNMIColumn(QueryResponse, b"T", 3)), Width=6)
+   Found=DateFound & HourFound & TemperatureFound
+   return(ConvertKNMIDates(Dates[Found]).astype('datetime64[h]')+(Hours[Found]-1), Temperatures[Found]/10.0)
+
+def FindKNMIStationLines(QueryResponse, StationID):
+   # The buffer of the response and the commas and bounds of the lines of StationID, None when it has no data lines.
+   Buffer=numpy.frombuffer(QueryResponse, dtype=numpy.uint8)
+   LineEnds=numpy.append(numpy.flatnonzero(Buffer == 10), len(Buffer))
+   LineStarts=numpy.concatenate(([0], LineEnds[:-1]+1))
+   Commas=numpy.flatnonzero(Buffer == 44)
+   if len(Commas) == 0:
+      return(Buffer, None)
+   FirstCommas=numpy.searchsorted(Commas, LineStarts)
+   Stations, StationFound = ParseKNMIIntegers(Buffer, *GetKNMIFieldBounds(Commas, FirstCommas, LineStarts, LineEnds, 0), Width=6)
+   Rows=numpy.flatnonzero(StationFound & (Stations == int(StationID)))
+   return(Buffer, (Commas, FirstCommas[Rows], LineStarts[Rows], LineEnds[Rows]))
+
+def FindKNMIColumn(QueryResponse, Name, Default=2):
+   # Column of Name in the "STN,YYYYMMDD,..." header line, a query of only TG has it in column 2.
+   HeaderPosition=QueryResponse.find(b"STN,YYYYMMDD")
+   if HeaderPosition < 0:
+      return(Default)
+   HeaderEnd=QueryResponse.find(b"\n", HeaderPosition)
+   Columns=[Column.strip() for Column in QueryResponse[HeaderPosition:HeaderEnd if HeaderEnd >= 0 else len(QueryResponse)].split(b",")]
+   return(Columns.index(Name) if Name in Columns else Default)
+
+def GetKNMIFieldBounds(Commas, FirstCommas, LineStarts, LineEnds, Column):
+   # First and last+1 byte positions of a column in each line, empty when the line has less columns.
+   FieldStarts=LineStarts
+   if Column > 0:
+      Index=numpy.minimum(FirstCommas+Column-1, len(Commas)-1)
+      InLine=(FirstCommas+Column-1 < len(Commas)) & (Commas[Index] < LineEnds)
+      FieldStarts=numpy.where(InLine, Commas[Index]+1, LineEnds)
+   Index=numpy.minimum(FirstCommas+Column, len(Commas)-1)
+   InLine=(FirstCommas+Column < len(Commas)) & (Commas[Index] < LineEnds)
+   FieldEnds=numpy.where(InLine, Commas[Index], LineEnds)
+   return(FieldStarts, FieldEnds)
+
+def ParseKNMIIntegers(Buffer, FieldStarts, FieldEnds, Width):
+   # Integer values of the fields, all read at once from a (field, Width) array of the last Width bytes of each
+   # field. Returns the values and whether each field is a number, only spaces and a minus sign may surround it.
+   Positions=FieldEnds[:,None]-Width+numpy.arange(Width)
+   Characters=numpy.where(Positions >= FieldStarts[:,None], Buffer[numpy.clip(Positions, 0, max(len(Buffer)-1, 0))], 32)
+   Digits=(Characters >= 48) & (Characters <= 57)
+   #Each digit counts 10 to the power of the number of digits right of it.
+   DigitsRight=numpy.cumsum(Digits[:,::-1], axis=1)[:,::-1]-Digits
+   Values=numpy.where(Digits, (Characters.astype(numpy.int64)-48)*10**DigitsRight, 0).sum(axis=1)
+   Negative=(Characters == 45).any(axis=1)
+   IsNumber=(FieldEnds-FieldStarts <= Width) & Digits.any(axis=1) & (Digits | (Characters == 32) | (Characters == 45) | (Characters == 13)).all(axis=1)
+   return(numpy.where(Negative, -Values, Values), IsNumber)
+
+def ConvertKNMIDates(Dates):
+   # datetime64[D] dates of YYYYMMDD integers.
+   Months=(Dates//10000-1970).astype('datetime64[Y]').astype('datetime64[M]')+(Dates//100%100-1)
+   return(Months.astype('datetime64[D]')+(Dates%100-1))
+
+def ReadKNMIArchive(StationID):
+   # All dates and temperatures of the etmgeg_ file of the station in the KNMIArchiveDirectory, parsed once. The
+   # file is memory mapped, so it is parsed from the page cache without reading it into memory first.
+   if StationID not in KNMIArchiveCache:
+      FileName=os.path.join(KNMIArchiveDirectory, "etmgeg_"+StationID+".txt")
+      with MeasureStage("ReadKNMIArchive", FileName) as Stage:
+         with open(FileName, 'rb') as ArchiveFile:
+            ArchiveMap=mmap.mmap(ArchiveFile.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+               KNMIArchiveCache[StationID]=ParseKNMIData(ArchiveMap, StationID)
+            finally:
+               ArchiveMap.close()
+         Stage['Samples']=len(KNMIArchiveCache[StationID][0])
+         Stage['Bytes']=os.path.getsize(FileName)
+   return(KNMIArchiveCache[StationID])
+
+def JoinDateSeries(LeftDates, LeftValues, RightDates, RightValues, Join=JoinType.Inner, MaxNearestDays=1, Unit='D'):
+   # Joins two date keyed series in linear time by hashing the right series on date, the order of the left
+   # series is kept. Per left date the joined right value is:
+   # JoinType.Inner   : the value of the same date, left dates without a match are dropped.
+   # JoinType.Left    : the value of the same date, or NaN when there is no match.
+   # JoinType.Nearest : the value of the same date, or of the nearest date within MaxNearestDays (earliest wins on
+   #                    a tie), left dates without any right date in reach are dropped.
+   # Only the first entry of a duplicate date is used, all dates that were skipped are listed in the JoinReport.
+   # Dates can be datetime.date or datetime64 values, they are joined as day numbers and returned as datetime64[D].
+   # With Unit 'h' they are joined as hour numbers instead and MaxNearestDays is in hours.
+   DateType='datetime64['+Unit+']'
+   LeftKeys=numpy.asarray(LeftDates, dtype=DateType).astype(numpy.int64).tolist()
+   RightKeys=numpy.asarray(RightDates, dtype=DateType).astype(numpy.int64).tolist()
+   LeftValues=numpy.asarray(LeftValues, dtype=numpy.float64).tolist()
+   RightValues=numpy.asarray(RightValues, dtype=numpy.float64).tolist()
+   JoinReport={'UnmatchedLeft':[], 'UnmatchedRight':[], 'DuplicateLeft':[], 'DuplicateRight':[], 'NearestMatched':[]}
+   RightIndex=dict()
+   for Index, Day in enumerate(RightKeys):
+      if Day in RightIndex:
+         JoinReport['DuplicateRight'].append(Day)
+      else:
+         RightIndex[Day]=Index
+   if Join == JoinType.Nearest:
+      SortedRightKeys=sorted(RightIndex)
+   JoinedKeys=[]
+   JoinedLeftValues=[]
+   JoinedRightValues=[]
+   SeenLeftKeys=set()
+   MatchedRightKeys=set()
+   for Day, Value in zip(LeftKeys, LeftValues):
+      if Day in SeenLeftKeys:
+         JoinReport['DuplicateLeft'].append(Day)
+         continue
+      SeenLeftKeys.add(Day)
+      if Day in RightIndex:
+         MatchedRightKeys.add(Day)
+         JoinedKeys.append(Day)
+         JoinedLeftValues.append(Value)
+         JoinedRightValues.append(RightValues[RightIndex[Day]])
+         continue
+      JoinReport['UnmatchedLeft'].append(Day)
+      if Join == JoinType.Left:
+         JoinedKeys.append(Day)
+         JoinedLeftValues.append(Value)
+         JoinedRightValues.append(numpy.nan)
+      elif Join == JoinType.Nearest and SortedRightKeys:
+         Position=bisect.bisect_left(SortedRightKeys, Day)
+         Candidates=SortedRightKeys[max(Position-1,0):Position+1]
+         NearestDay=min(Candidates, key=lambda Candidate: abs(Candidate-Day))
+         if abs(NearestDay-Day) <= MaxNearestDays:
+            MatchedRightKeys.add(NearestDay)
+            JoinReport['NearestMatched'].append(Day)
+            JoinedKeys.append(Day)
+            JoinedLeftValues.append(Value)
+            JoinedRightValues.append(RightValues[RightIndex[NearestDay]])
+   JoinReport['UnmatchedRight']=[Day for Day in RightIndex if Day not in MatchedRightKeys]
+   for Key in JoinReport:
+      JoinReport[Key]=numpy.array(JoinReport[Key], dtype=numpy.int64).astype(DateType)
+   JoinedDates=numpy.array(JoinedKeys, dtype=numpy.int64).astype(DateType)
+   return(JoinedDates, numpy.array(JoinedLeftValues), numpy.array(JoinedRightValues), JoinReport)
+
+def PrintJoinReport(JoinReport, LeftName, RightName):
+   ReportNames=[('UnmatchedLeft', LeftName+" dates without "+RightName+" data"),
+                ('UnmatchedRight', RightName+" dates without "+LeftName+" data"),
+                ('DuplicateLeft', "Duplicate "+LeftName+" dates skipped"),
+                ('DuplicateRight', "Duplicate "+RightName+" dates skipped"),
+                ('NearestMatched', LeftName+" dates matched to a nearby "+RightName+" date")]
+   for Key, Description in ReportNames:
+      if len(JoinReport[Key]) > 0:
+         DateStrings=[Date.__str__() for Date in JoinReport[Key][:5]]
+         if len(JoinReport[Key]) > 5:
+            DateStrings.append("...")
+         print(Description+": "+len(JoinReport[Key]).__str__()+" ("+", ".join(DateStrings)+")")
+
+
+def CalculateFitSums(XSamples, YSamples):
+   # The straight line fit only needs these sums of the samples: [n, Sum x, Sum y, Sum xy, Sum xx, Sum yy]
+   # Sums of separate chunks, files or processes can simply be added (or subtracted) to combine them.
+   X=numpy.asarray(XSamples, dtype=numpy.float64)
+   Y=numpy.asarray(YSamples, dtype=numpy.float64)
+   return(numpy.array([X.size, X.sum(), Y.sum(), numpy.dot(X,Y), numpy.dot(X,X), numpy.dot(Y,Y)]))
+
+def SolveFitSums(FitSums):
+   # Least squares Gain and Offset and the correlation coefficient r from fit sums, the sums are in the last
+   # axis so an array of many fit sums is solved at once.
+   n, SumX, SumY, SumXY, SumXX, SumYY = numpy.moveaxis(numpy.asarray(FitSums, dtype=numpy.float64), -1, 0)
+   CovarianceXY=SumXY-SumX*SumY/n
+   VarianceX=SumXX-SumX*SumX/n
+   VarianceY=SumYY-SumY*SumY/n
+   Gain=CovarianceXY/VarianceX
+   Offset=(SumY-Gain*SumX)/n
+   #r of the fitted line against the measured values, which is the absolute value of r of x and y.
+   Correlation=numpy.abs(CovarianceXY)/numpy.sqrt(VarianceX*VarianceY)
+   return(Gain, Offset, Correlation)
 
 def FitHeatingAndTemperatureData(OutdoorTempSamples, HeatingPowerSamples):
-   FitParams = curve_fit(FitEnergyVsTOutsideFunction, OutdoorTempSamples, HeatingPowerSamples)
-   HeatingPowerGain=FitParams[0][0]
-   HeatingPowerOffset=FitParams[0][1]
-   #corrrelation
-   CorrPower=[]
-   for temperature in OutdoorTempSamples:
-      Power=HeatingPowerGain*temperature+HeatingPowerOffset
-      CorrPower.append(Power)
-   Correlation=round((pylab.corrcoef(CorrPower, HeatingPowerSamples)[0][1]),3)
-   return(HeatingPowerGain, HeatingPowerOffset,Correlation)
-
-def PlotData():
+   FitSums=CalculateFitSums(OutdoorTempSamples, HeatingPowerSamples)
+   HeatingPowerGain, HeatingPowerOffset, Correlation = SolveFitSums(FitSums)
+   return(float(HeatingPowerGain), float(HeatingPowerOffset), round(float(Correlation),3))
+
+def FitHuberHeatingModel(OutdoorTempSamples, HeatingPowerSamples):
+   # Straight line fit by iteratively reweighted least squares with Huber weights, samples with a residual of more
+   # than HuberThreshold times the robust spread (median absolute residual) count less, like hot water spikes.
+   X=numpy.asarray(OutdoorTempSamples, dtype=numpy.float64)
+   Y=numpy.asarray(HeatingPowerSamples, dtype=numpy.float64)
+   Gain, Offset, Correlation = SolveFitSums(CalculateFitSums(X, Y))
+   for Iteration in range(HuberIterations):
+      Residuals=Y-(Gain*X+Offset)
+      Scale=1.4826*numpy.median(numpy.abs(Residuals))
+      if Scale == 0.0:
+         break
+      Weights=numpy.minimum(1.0, HuberThreshold*Scale/numpy.maximum(numpy.abs(Residuals), 1e-12))
+      WX=Weights*X
+      WeightedSums=numpy.array([Weights.sum(), WX.sum(), numpy.dot(Weights,Y), numpy.dot(WX,Y), numpy.dot(WX,X), numpy.dot(Weights*Y,Y)])
+      NewGain, NewOffset, WeightedCorrelation = SolveFitSums(WeightedSums)
+      Converged=abs(NewGain-Gain) <= 1e-9*abs(Gain) and abs(NewOffset-Offset) <= 1e-9*max(abs(Offset), 1.0)
+      #The r of the weighted samples belongs to the line fitted to them.
+      Gain, Offset, Correlation = NewGain, NewOffset, WeightedCorrelation
+      if Converged:
+         break
+   return({'Gain':float(Gain), 'Offset':float(Offset), 'Limit':float(-1.0*Offset/Gain), 'Base':0.0,
+           'Correlation':round(float(Correlation),3)})
+
+def FitHingeHeatingModel(OutdoorTempSamples, HeatingPowerSamples):
+   # Power = Base + Gain * (temperature - Limit) below Limit and Base above it. For a given Limit this is a straight
+   # line fit on min(temperature - Limit, 0), whose fit sums follow from cumulative sums of the samples sorted by
+   # temperature, so all limits are tried at once and the one with the best fit is kept.
+   Order=numpy.argsort(OutdoorTempSamples)
+   X=numpy.asarray(OutdoorTempSamples, dtype=numpy.float64)[Order]
+   Y=numpy.asarray(HeatingPowerSamples, dtype=numpy.float64)[Order]
+   CumulativeSums=numpy.vstack((numpy.zeros(4), numpy.cumsum(numpy.column_stack((numpy.ones_like(X), X, X*Y, X*X)), axis=0)))
+   CumulativeY=numpy.concatenate(([0.0], numpy.cumsum(Y)))
+   Limits=numpy.arange(X[0], X[-1]+HingeLimitStep, HingeLimitStep)
+   Below=numpy.searchsorted(X, Limits)
+   n, SumX, SumXY, SumXX = CumulativeSums[Below].T
+   SumYBelow=CumulativeY[Below]
+   #The sums of min(temperature - Limit, 0), the samples above the limit add nothing.
+   FitSums=numpy.column_stack((numpy.full_like(Limits, len(X)), SumX-n*Limits, numpy.full_like(Limits, CumulativeY[-1]),
+                               SumXY-Limits*SumYBelow, SumXX-2.0*Limits*SumX+n*Limits*Limits, numpy.full_like(Limits, numpy.dot(Y,Y))))
+   with numpy.errstate(invalid='ignore', divide='ignore'):
+      Gain, Base, Correlation = SolveFitSums(FitSums)
+   #At least two samples below the limit for a slope, and the heating power has to fall with the temperature.
+   Correlation[(n < 2) | ~(Gain < 0.0)]=numpy.nan
+   if numpy.isnan(Correlation).all():
+      raise ValueError("No heating limit with a falling heating line found for the hinge fit, use another HeatingCurveModel")
+   Best=numpy.nanargmax(Correlation)
+   return({'Gain':float(Gain[Best]), 'Offset':float(Base[Best]-Gain[Best]*Limits[Best]), 'Limit':float(Limits[Best]),
+           'Base':float(Base[Best]), 'Correlation':round(float(Correlation[Best]),3)})
+
+def FitHeatingModel(OutdoorTempSamples, HeatingPowerSamples):
+   # Fits the HeatingCurveModel, every model gives the heating line Gain * temperature + Offset below the heating
+   # Limit and the Base power above it.
+   if HeatingCurveModel == FitModel.Huber:
+      return(FitHuberHeatingModel(OutdoorTempSamples, HeatingPowerSamples))
+   if HeatingCurveModel == FitModel.Hinge:
+      return(FitHingeHeatingModel(OutdoorTempSamples, HeatingPowerSamples))
+   Gain, Offset, Correlation = FitHeatingAndTemperatureData(OutdoorTempSamples, HeatingPowerSamples)
+   return({'Gain':Gain, 'Offset':Offset, 'Limit':-1.0*Offset/Gain, 'Base':0.0, 'Correlation':Correlation})
+
+def EvaluateHeatingModel(Temperatures, Gain, Offset, Limit, Base=0.0):
+   # Power of a fitted model at an array of temperatures, broadcasting over arrays of model parameters.
+   return(numpy.where(Temperatures < Limit, Gain*Temperatures+Offset, Base))
+
+def CalculateFitSumsPerSample(XSamples, YSamples):
+   # The fit sums of each sample on its own, one row per sample.
+   X=numpy.asarray(XSamples, dtype=numpy.float64)
+   Y=numpy.asarray(YSamples, dtype=numpy.float64)
+   return(numpy.column_stack((numpy.ones_like(X), X, Y, X*Y, X*X, Y*Y)))
+
+def SolveCenteredFitSums(FitSums, XCenter, YCenter):
+   # Solves fit sums of samples that had XCenter and YCenter subtracted, which keeps the sums of long series small
+   # so adding and removing samples does not lose precision. Fits with too few samples give NaN.
+   FitSums=numpy.where(FitSums[...,:1] >= max(RollingFitMinimumSamples, 2), FitSums, numpy.nan)
+   with numpy.errstate(invalid='ignore', divide='ignore'):
+      Gain, Offset, Correlation = SolveFitSums(FitSums)
+   Offset=Offset+YCenter-Gain*XCenter
+   return(Gain, Offset, -1.0*Offset/Gain, Correlation)
+
+def BootstrapFit(OutdoorTempSamples, HeatingPowerSamples, Resamples, Seed=None):
+   # Gain and Offset arrays of Resamples fits on samples drawn with replacement. A resample is a row of counts of how
+   # often each sample is drawn, so the fit sums of a chunk of resamples are one matrix product of the counts with the
+   # fit sums per sample.
+   X=numpy.asarray(OutdoorTempSamples, dtype=numpy.float64)
+   Y=numpy.asarray(HeatingPowerSamples, dtype=numpy.float64)
+   XCenter=X.mean()
+   YCenter=Y.mean()
+   SampleFitSums=CalculateFitSumsPerSample(X-XCenter, Y-YCenter)
+   Generator=numpy.random.default_rng(Seed)
+   ChunkSize=max(1, BootstrapChunkCounts//len(X))
+   FitSums=numpy.empty((Resamples, 6))
+   for Start in range(0, Resamples, ChunkSize):
+      Rows=min(ChunkSize, Resamples-Start)
+      Draws=Generator.integers(0, len(X), size=(Rows, len(X)))+numpy.arange(Rows)[:,None]*len(X)
+      Counts=numpy.bincount(Draws.ravel(), minlength=Rows*len(X)).reshape(Rows, len(X))
+      FitSums[Start:Start+Rows]=numpy.dot(Counts, SampleFitSums)
+   with numpy.errstate(invalid='ignore', divide='ignore'):
+      Gain, Offset, Correlation = SolveFitSums(FitSums)
+   return(Gain, Offset+YCenter-Gain*XCenter)
+
+def CalculateBootstrapIntervals(OutdoorTempSamples, HeatingPowerSamples):
+   # Low and High values of the BootstrapConfidence interval of the fit and the estimates derived from it, calculated
+   # for all resamples at once.
+   Gain, Offset = BootstrapFit(OutdoorTempSamples, HeatingPowerSamples, BootstrapResamples, BootstrapSeed)
+   with numpy.errstate(invalid='ignore', divide='ignore'):
+      HeatingLimit=-1.0*Offset/Gain
+      TemperatureOfInterest=numpy.where(HeatingLimit < OutsideTemperatureOfInterest, numpy.round(HeatingLimit,2), OutsideTemperatureOfInterest)
+      HeatingPowerTemperatureOffInterest=Gain*TemperatureOfInterest+Offset
+      YearlyHeatingEnergy=numpy.dot(CalculateHeatingEnergyPerDay(Gain[:,None], Offset[:,None], HeatingLimit[:,None]), GetDaysPerYearAverageTemperature())
+   Tail=(100.0-BootstrapConfidence)/2.0
+   Intervals={}
+   for Name, Values in (('HeatingPowerPerxxhGain', Gain), ('HeatingPowerPerxxhOffset', Offset), ('HeatingLimit', HeatingLimit),
+                        ('HeatingPowerTemperatureOffInterest', HeatingPowerTemperatureOffInterest), ('YearlyHeatingEnergy', YearlyHeatingEnergy)):
+      Intervals[Name+'Low'], Intervals[Name+'High'] = numpy.nanpercentile(Values, [Tail, 100.0-Tail]).tolist()
+   #The settings of the intervals, so the results can be printed and drawn after the config has changed.
+   Intervals.update({'BootstrapResamples':BootstrapResamples, 'BootstrapConfidence':BootstrapConfidence, 'BootstrapSeed':BootstrapSeed})
+   return(Intervals)
+
+def CalculateRollingFits(SampleDates, OutdoorTempSamples, HeatingPowerSamples, WindowDays):
+   # Fits the samples of the WindowDays days up to and including each date with samples. Each window is the difference
+   # of two cumulative fit sums, so moving the window adds and removes samples instead of fitting it again.
+   # SampleDates are datetime64 days, or sample numbers when the data has no dates.
+   Order=numpy.argsort(SampleDates, kind='stable')
+   Dates=numpy.asarray(SampleDates)[Order]
+   X=numpy.asarray(OutdoorTempSamples, dtype=numpy.float64)[Order]
+   Y=numpy.asarray(HeatingPowerSamples, dtype=numpy.float64)[Order]
+   XCenter=X.mean()
+   YCenter=Y.mean()
+   CumulativeFitSums=numpy.vstack((numpy.zeros(6), numpy.cumsum(CalculateFitSumsPerSample(X-XCenter, Y-YCenter), axis=0)))
+   WindowEnds=numpy.unique(Dates)
+   WindowSums=CumulativeFitSums[numpy.searchsorted(Dates, WindowEnds, side='right')]-CumulativeFitSums[numpy.searchsorted(Dates, WindowEnds-(WindowDays-1), side='left')]
+   Gain, Offset, HeatingLimit, Correlation = SolveCenteredFitSums(WindowSums, XCenter, YCenter)
+   return({'Date':WindowEnds, 'Samples':WindowSums[:,0].astype(numpy.int64), 'HeatingPowerPerxxhGain':Gain,
+           'HeatingPowerPerxxhOffset':Offset, 'HeatingLimit':HeatingLimit, 'Correlation':Correlation})
+
+def CalculateSeasonFits(SampleDates, OutdoorTempSamples, HeatingPowerSamples):
+   # Fits the samples of each heating season, a season starts on the first of HeatingSeasonStartMonth and is named by
+   # the year it starts in.
+   Dates=numpy.asarray(SampleDates, dtype='datetime64[D]')
+   Years=Dates.astype('datetime64[Y]').astype(numpy.int64)+1970
+   Months=Dates.astype('datetime64[M]').astype(numpy.int64)%12+1
+   SeasonYears=Years-(Months < HeatingSeasonStartMonth)
+   X=numpy.asarray(OutdoorTempSamples, dtype=numpy.float64)
+   Y=numpy.asarray(HeatingPowerSamples, dtype=numpy.float64)
+   XCenter=X.mean()
+   YCenter=Y.mean()
+   Seasons, SeasonIndex = numpy.unique(SeasonYears, return_inverse=True)
+   SeasonSums=numpy.zeros((len(Seasons), 6))
+   numpy.add.at(SeasonSums, SeasonIndex, CalculateFitSumsPerSample(X-XCenter, Y-YCenter))
+   Gain, Offset, HeatingLimit, Correlation = SolveCenteredFitSums(SeasonSums, XCenter, YCenter)
+   return({'Season':[Season.__str__()+"/"+(Season+1).__str__() for Season in Seasons], 'Samples':SeasonSums[:,0].astype(numpy.int64),
+           'HeatingPowerPerxxhGain':Gain, 'HeatingPowerPerxxhOffset':Offset, 'HeatingLimit':HeatingLimit, 'Correlation':Correlation})
+
+def WriteFits(Fits, FileName):
+   Columns=list(Fits.keys())
+   with open(FileName, 'w', newline='') as csvfile:
+      Writer=csv.writer(csvfile)
+      Writer.writerow(Columns)
+      for Row in zip(*[Fits[Column] for Column in Columns]):
+         Writer.writerow(["" if isinstance(Value, float) and numpy.isnan(Value) else Value for Value in Row])
+
+def WriteRollingFits(Results, FileNameSuffix=""):
+   # Writes the RollingFitFile and, when the samples have dates, the SeasonFitFile of the results.
+   SampleDates=Results['SampleDates']
+   if SampleDates is None:
+      SampleDates=numpy.arange(len(Results['OutdoorTempSamples']))
+   else:
+      #Hourly samples are fitted over windows of days too.
+      SampleDates=numpy.asarray(SampleDates, dtype='datetime64[D]')
+   with MeasureStage("RollingFits") as Stage:
+      RollingFits=CalculateRollingFits(SampleDates, Results['OutdoorTempSamples'], Results['HeatingPowerSamples'], RollingFitDays)
+      Stage['Samples']=len(RollingFits['Date'])
+   RollingFits['Date']=RollingFits['Date'].tolist()
+   FileName, Extension = os.path.splitext(RollingFitFile)
+   WriteFits(RollingFits, FileName+FileNameSuffix+Extension)
+   if Results['SampleDates'] is not None:
+      SeasonFits=CalculateSeasonFits(Results['SampleDates'], Results['OutdoorTempSamples'], Results['HeatingPowerSamples'])
+      FileName, Extension = os.path.splitext(SeasonFitFile)
+      WriteFits(SeasonFits, FileName+FileNameSuffix+Extension)
+      return(SeasonFits)
+   return(None)
+
+def PrintSeasonFits(SeasonFits):
+   for Season, Samples, Gain, Offset, HeatingLimit, Correlation in zip(SeasonFits['Season'], SeasonFits['Samples'], SeasonFits['HeatingPowerPerxxhGain'],
+                                                                       SeasonFits['HeatingPowerPerxxhOffset'], SeasonFits['HeatingLimit'], SeasonFits['Correlation']):
+      print("Season "+Season+": Power = "+round(Gain,5).__str__()+" * temperature + "+round(Offset,3).__str__()+"  (r="+round(Correlation,3).__str__()+", "+Samples.__str__()+" "+("hours" if HourlyAnalysis else "days")+"), Heating Required until "+round(HeatingLimit,2).__str__()+" C")
+
+def PlotData(Results):
+   #pylab is only imported when a plot window is opened, loading it takes most of the start up time.
+   import pylab
    Figure, PlotList = pylab.subplots(3,1, figsize=(8,16))
-   PlotList[0].xaxis.set_visible(False)
-   PlotList[0].yaxis.set_visible(False)
-   PlotBaseData(PlotList[1])
-   if EstimateAdditionalInternalAndExternalEnergy:
-      PlotExternalEnergyData(PlotList[1])
-   EnergyUsageString=PlotEnergyDistribution(PlotList[2])
-   PlotText(PlotList[0],EnergyUsageString)
+   DrawReport(PlotList, Results)
    Figure.set_tight_layout(True)
    pylab.show()
-   #pylab.savefig('Testje.pdf')
 
-def PlotText(PlotReference,EnergyUsageString):
+def DrawReport(PlotList, Results):
+   with MeasureStage("DrawReport") as Stage:
+      PlotList[0].xaxis.set_visible(False)
+      PlotList[0].yaxis.set_visible(False)
+      PlotBaseData(PlotList[1], Results)
+      if Results['EstimateAdditionalInternalAndExternalEnergy']:
+         PlotExternalEnergyData(PlotList[1], Results)
+      EnergyUsageString=PlotEnergyDistribution(PlotList[2], Results)
+      PlotText(PlotList[0], Results, EnergyUsageString)
+      Stage['Samples']=len(Results['OutdoorTempSamples'])
+
+def GetReportFigure():
+   # Headless report figure, created once per process and reused for every report rendered in it.
+   global ReportFigure, ReportPlotList
+   if ReportFigure is None:
+      import matplotlib.figure
+      from matplotlib.backends.backend_agg import FigureCanvasAgg
+      ReportFigure = matplotlib.figure.Figure(figsize=(8,16))
+      FigureCanvasAgg(ReportFigure)
+      ReportPlotList = ReportFigure.subplots(3,1)
+      #A fixed layout, tight layout would be recalculated for every report.
+      ReportFigure.subplots_adjust(left=0.09, right=0.97, bottom=0.04, top=0.96, hspace=0.18)
+   else:
+      for PlotReference in ReportPlotList:
+         PlotReference.clear()
+   return(ReportFigure, ReportPlotList)
+
+def RenderReportFiles(Results, FileName):
+   # Renders the report without a display to FileName with each of the ReportFileFormats as extension.
+   Figure, PlotList = GetReportFigure()
+   DrawReport(PlotList, Results)
+   ReportFiles=[]
+   for FileFormat in ReportFileFormats:
+      with MeasureStage("SaveReport", FileFormat) as Stage:
+         Figure.savefig(FileName+"."+FileFormat, format=FileFormat)
+         Stage['Bytes']=os.path.getsize(FileName+"."+FileFormat)
+      ReportFiles.append(FileName+"."+FileFormat)
+   return(ReportFiles)
+
+def SubmitReportRender(Results, FileName):
+   # Renders the report files in a background process, returns a Future with the list of written files so the
+   # numeric results can be used before the report is finished.
+   global ReportRenderExecutor
+   if ReportRenderExecutor is None:
+      ReportRenderExecutor = concurrent.futures.ProcessPoolExecutor(max_workers=RenderWorkers)
+   return(ReportRenderExecutor.submit(RenderReportFiles, Results, FileName))
+
+def WaitForReportRenders():
+   global ReportRenderExecutor
+   if ReportRenderExecutor is not None:
+      ReportRenderExecutor.shutdown(wait=True)
+      ReportRenderExecutor = None
+
+def GetFitFunctionString(Results):
+   FitFunctionString="Power = "+round(Results['HeatingPowerPerxxhGain'],5).__str__()+" * temperature + "+round(Results['HeatingPowerPerxxhOffset'],3).__str__()
+   if Results['FitModel'] == FitModel.Hinge.name:
+      FitFunctionString=FitFunctionString+" below "+round(Results['HeatingLimit'],2).__str__()+" C, "+round(Results['HeatingPowerBase'],3).__str__()+" above"
+   return(FitFunctionString+"  ("+Results['FitModel']+", r="+Results['Correlation'].__str__()+")")
+
+def PrintResults(Results):
+   print("Fitting function: "+GetFitFunctionString(Results))
+   print("Heating Required until Toutdoor: "+round(Results['HeatingLimit'],2).__str__()+" C")
+   print("Heating Power Required @ "+Results['OutsideTemperatureOfInterest'].__str__()+" C: "+round(Results['HeatingPowerTemperatureOffInterest'],2).__str__()+" kW")
+   print("Alternative Power: "+Results['DaysAlternativePower'].__str__()+" "+Results['SampleUnit']+"/Year, "+Results['AlternativePower'].__str__()+" kW, "+Results['AlternativeEnergy'].__str__()+" kWh ("+Results['AlternativeEnergyCost'].__str__()+" Euro)")
+   if 'YearlyHeatingEnergyLow' in Results:
+      print(Results['BootstrapConfidence'].__str__()+"% interval over "+Results['BootstrapResamples'].__str__()+" resamples: Power = "+round(Results['HeatingPowerPerxxhGainLow'],5).__str__()+" - "+round(Results['HeatingPowerPerxxhGainHigh'],5).__str__()+" * temperature + "+round(Results['HeatingPowerPerxxhOffsetLow'],3).__str__()+" - "+round(Results['HeatingPowerPerxxhOffsetHigh'],3).__str__())
+      print("   Heating Required until Toutdoor: "+round(Results['HeatingLimitLow'],2).__str__()+" - "+round(Results['HeatingLimitHigh'],2).__str__()+" C, Heating Power Required: "+round(Results['HeatingPowerTemperatureOffInterestLow'],2).__str__()+" - "+round(Results['HeatingPowerTemperatureOffInterestHigh'],2).__str__()+" kW, Year Total Energy: "+round(Results['YearlyHeatingEnergyLow']/1000.0,3).__str__()+" - "+round(Results['YearlyHeatingEnergyHigh']/1000.0,3).__str__()+" MWh")
+   print("Estimated Year Total Energy Required for Heating: "+(Results['YearlyHeatingEnergy']/1000.0).__str__()+" MWh ("+Results['ClimatePeriod']+"), over all climate periods: "+(Results['YearlyHeatingEnergyMin']/1000.0).__str__()+" - "+(Results['YearlyHeatingEnergyMax']/1000.0).__str__()+" MWh")
+   print("Heating Degree Hours: "+Results['HeatingDegreeHours'].__str__()+" per year below "+round(Results['HeatingLimit'],2).__str__()+" C")
+   if 'HeatPumps' in Results:
+      PrintHeatPumpResults(Results)
+
+def PlotText(PlotReference, Results, EnergyUsageString):
+   HeatingLimit=Results['HeatingLimit']
+   OutsideTemperatureOfInterest=Results['OutsideTemperatureOfInterest']
+   HeatingPowerTemperatureOffInterest=Results['HeatingPowerTemperatureOffInterest']
+   DaysAlternativePower=Results['DaysAlternativePower']
+   AlternativePower=Results['AlternativePower']
+   AlternativeEnergy=Results['AlternativeEnergy']
+   AlternativeEnergyCost=Results['AlternativeEnergyCost']
+   HoursForHeatingADay=Results['HoursForHeatingADay']
    #Define A Grid to plot the text labels in
    PlotReference.axis([0,20.0,0,10.0])
    PlotLineBase=[0,20]
    PlotLineResultsValues=[7.8,7.8]
    PlotReference.plot(PlotLineBase,PlotLineResultsValues, 'k-')
    # Create the label texts for the plot 
-   if UseGasDataForHeatingEnergyEstimation or GetDataFrom == DataSource.FromCSVFileGasOnly:
+   if Results['UseGasDataForHeatingEnergyEstimation'] or Results['GetDataFrom'] == DataSource.FromCSVFileGasOnly:
       EnergyTypeString = "(Gas Based)"
    else:
       EnergyTypeString = "(Power Meter Based)"
-   if GetDataFrom == DataSource.FromCSVFile:
-      AnalysesWindowString="Analysed File: "+CSVFile+" "
-   elif GetDataFrom == DataSource.FromCSVFileGasOnly:
-      AnalysesWindowString="Analysed File: "+CSVGasOnlyFile+" "
+   if Results['GetDataFrom'] in (DataSource.FromCSVFile, DataSource.FromCSVFileGasOnly):
+      AnalysesWindowString="Analysed File: "+Results['DataFile']+" "
    else:
-      StartString=DateStartAnalyses.strftime("%A %B %d %Y")
-      StopString=DateEndAnalyses.strftime("%A %B %d %Y")
+      StartString=Results['DateStartAnalyses'].strftime("%A %B %d %Y")
+      StopString=Results['DateEndAnalyses'].strftime("%A %B %d %Y")
       AnalysesWindowString="Analysed: "+StartString+" - "+StopString+" "
    HeatingLimitString="Heating Required until Toutdoor :"
    HeatingLimitValueString=round(HeatingLimit,2).__str__()+" C"
    OutsideTemperatureOfInterestString=OutsideTemperatureOfInterest.__str__()+" C"
    PowerRequiredTemperatureOffInterestString="Heating Power Required @ "+OutsideTemperatureOfInterest.__str__()+" C: "
    PowerRequiredTemperatureOffInterestValueString=round(HeatingPowerTemperatureOffInterest,2).__str__()+" kW"
-   AlternativeHeatingPowerString="When Heatpump can still deliver "+round(HeatingPowerTemperatureOffInterest,2).__str__()+" kW @ -15 C,\n"+DaysAlternativePower.__str__()+" Days/Year Alternative Power Required Below "+OutsideTemperatureOfInterestString+" of "+AlternativePower.__str__()+" kW \nfor a total of "+AlternativeEnergy.__str__()+" kWh ("+AlternativeEnergyCost.__str__()+" Euro)"
+   AlternativeHeatingPowerString="When Heatpump can still deliver "+round(HeatingPowerTemperatureOffInterest,2).__str__()+" kW @ -15 C,\n"+DaysAlternativePower.__str__()+" "+Results['SampleUnit']+"/Year Alternative Power Required Below "+OutsideTemperatureOfInterestString+" of "+AlternativePower.__str__()+" kW \nfor a total of "+AlternativeEnergy.__str__()+" kWh ("+AlternativeEnergyCost.__str__()+" Euro)"
    AlternativeHeatingPowerValueString=AlternativePower.__str__()+" kW"
-   if EstimateAdditionalInternalAndExternalEnergy:
-      HeatFromWarmBodiesString="Heat From People per day: "+HeatFromWarmBodies.__str__()+"kWh\n"
+   if Results['EstimateAdditionalInternalAndExternalEnergy']:
+      HeatFromWarmBodiesString="Heat From People per day: "+Results['HeatFromWarmBodies'].__str__()+"kWh\n"
    else:
       HeatFromWarmBodiesString="\n"
-   SettingValuesString="Used Settings:\nHours / Day Reserved for Heating: "+HoursForHeatingADay.__str__()+"\n"+HeatFromWarmBodiesString+"Outside Temperature Of Interest: "+OutsideTemperatureOfInterest.__str__()+" C"
-   PowerFitFunctionString="Results:\nFiting function:   Power = "+round(HeatingPowerPerxxhGain,5).__str__()+" * temperature + "+round(HeatingPowerPerxxhOffset,3).__str__()+"  (r="+Correlation.__str__()+")"
+   if Results['HourlyAnalysis']:
+      HoursForHeatingString="Hourly Analysis\n"
+   else:
+      HoursForHeatingString="Hours / Day Reserved for Heating: "+HoursForHeatingADay.__str__()+"\n"
+   SettingValuesString="Used Settings:\n"+HoursForHeatingString+HeatFromWarmBodiesString+"Outside Temperature Of Interest: "+OutsideTemperatureOfInterest.__str__()+" C"
+   PowerFitFunctionString="Results:\nFiting function:   "+GetFitFunctionString(Results)
+   if 'YearlyHeatingEnergyLow' in Results:
+      PowerFitFunctionString=PowerFitFunctionString+"\n"+Results['BootstrapConfidence'].__str__()+"% interval over "+Results['BootstrapResamples'].__str__()+" resamples: Heating until "+round(Results['HeatingLimitLow'],2).__str__()+" - "+round(Results['HeatingLimitHigh'],2).__str__()+" C, "+round(Results['HeatingPowerTemperatureOffInterestLow'],2).__str__()+" - "+round(Results['HeatingPowerTemperatureOffInterestHigh'],2).__str__()+" kW"
    
    PlotReference.set_title("Heating Power VS OutDoor Temperature. "+EnergyTypeString+"\n"+AnalysesWindowString)
    
@@ -666,12 +2188,16 @@ def PlotText(PlotReference,EnergyUsageString):
    PlotReference.text(12,(6-(2*LabelOffsetY+0.3)),PowerRequiredTemperatureOffInterestValueString)
    PlotReference.text(1,(6-(5*LabelOffsetY+0.3)),AlternativeHeatingPowerString)
    PlotReference.text(1,(6-(6.5*LabelOffsetY+0.3)),EnergyUsageString)
-   if EstimateAdditionalInternalAndExternalEnergy:
-      AdditionalPowerValueString="Estimated Average Additional Heating Power = "+round(abs(PowerPointAtIndoorTemperature),3).__str__()+" kW, of which:\n   Internal Heat From Electricity and People = "+round(abs(AverageInternalPower),3).__str__()+" kW \n   External Heat From Sun = "+round(abs(AverageExternalPower),3).__str__()+" kW"
+   if Results['EstimateAdditionalInternalAndExternalEnergy']:
+      AdditionalPowerValueString="Estimated Average Additional Heating Power = "+round(abs(Results['PowerPointAtIndoorTemperature']),3).__str__()+" kW, of which:\n   Internal Heat From Electricity and People = "+round(abs(Results['AverageInternalPower']),3).__str__()+" kW \n   External Heat From Sun = "+round(abs(Results['AverageExternalPower']),3).__str__()+" kW"
       PlotReference.text(1,(6-(9.5*LabelOffsetY+0.3)),AdditionalPowerValueString)
   
 
-def PlotBaseData(PlotReference):
+def PlotBaseData(PlotReference, Results):
+   HeatingPowerTemperatureOffInterest=Results['HeatingPowerTemperatureOffInterest']
+   OutsideTemperatureOfInterest=Results['OutsideTemperatureOfInterest']
+   PlotMinPower=Results['PlotMinPower']
+   PlotMaxPower=Results['PlotMaxPower']
 
    # Create points to draw the lines for the temperature of interest and the calculated required power.
    CrossSectionTempLine=[0,HeatingPowerTemperatureOffInterest]
@@ -683,13 +2209,13 @@ def PlotBaseData(PlotReference):
    LabelOffsetY=(PlotMaxPower/24.0)
    
    # Make the plot.
-   PlotReference.plot(OutdoorTempSamples, HeatingPowerSamples, 'r.', label="Measured HeatingPower")
-   PlotReference.plot(HeatingPowerFitlineTemp, HeatingPowerFitline, 'b-', label="Fitted HeatingPower")
+   PlotReference.plot(Results['OutdoorTempSamples'], Results['HeatingPowerSamples'], 'r.', label="Measured HeatingPower")
+   PlotReference.plot(Results['HeatingPowerFitlineTemp'], Results['HeatingPowerFitline'], 'b-', label="Fitted HeatingPower")
    PlotReference.plot(CrossSectionPowerLine, PowerBaseLine, 'k--')
    PlotReference.plot(TempBaseLine, CrossSectionTempLine, 'k--')
    PlotReference.plot((PlotMinTemperature,PlotMaxTemperature), (0.0,0.0), 'k-')
    PlotReference.axis([PlotMinTemperature,PlotMaxTemperature,PlotMinPower,PlotMaxPower])
-   ylabeltext="Required Heating Power / "+HoursForHeatingADay.__str__()+"h [kW]"
+   ylabeltext="Required Heating Power / "+Results['HoursForHeatingADay'].__str__()+"h [kW]"
    PlotReference.set_xlabel("OutDoor Temperature [C]")
    PlotReference.set_ylabel(ylabeltext)
    PowerRequiredTemperatureOffInterestValueString=round(HeatingPowerTemperatureOffInterest,2).__str__()+" kW"
@@ -701,13 +2227,105 @@ def PlotBaseData(PlotReference):
    #PlotReference.spines['left'].set_position('zero')
    PlotReference.grid(True)
    
-def PlotEnergyDistribution(PlotReference):
-   ScaledEnergyVsAverageTemperature=[]
-   for temp, days in zip(EnergyTemperatureList, DaysPerYearAverageTemperature):
-      if temp < HeatingLimit:
-         ScaledEnergyVsAverageTemperature.append(((HeatingPowerPerxxhGain*temp)+HeatingPowerPerxxhOffset)*days*HoursForHeatingADay)
-      else:
-         ScaledEnergyVsAverageTemperature.append(0.0)
+def CalculateHeatingEnergyPerDay(HeatingPowerGain, HeatingPowerOffset, HeatingLimit):
+   # Heating energy in kWh on a day (an hour in the HourlyAnalysis) with each outdoor temperature of EnergyTemperatureList.
+   return(EvaluateHeatingModel(numpy.asarray(EnergyTemperatureList), HeatingPowerGain, HeatingPowerOffset, HeatingLimit)*GetHoursPerSample())
+
+def CalculateEnergyDistribution(HeatingPowerGain, HeatingPowerOffset, HeatingLimit):
+   # Heating energy per year in kWh for each temperature in EnergyTemperatureList, from the number of days per year
+   # with that average outdoor temperature.
+   return(CalculateHeatingEnergyPerDay(HeatingPowerGain, HeatingPowerOffset, HeatingLimit)*GetDaysPerYearAverageTemperature())
+
+def CalculateYearlyEnergyPerClimatePeriod(HeatingPowerGain, HeatingPowerOffset, HeatingLimit):
+   # Yearly heating energy in kWh for all periods of the ClimateHistogramFile in one matrix product.
+   Table=GetClimateHistogramTable()
+   Rows=numpy.flatnonzero(Table['Station'] == "All")
+   #The periods have days per year, an hourly fit heats all 24 hours of them.
+   YearlyEnergy=numpy.asarray(Table['Days'][Rows]) @ CalculateHeatingEnergyPerDay(HeatingPowerGain, HeatingPowerOffset, HeatingLimit)/GetDaysPerSample()
+   return(dict(zip(Table['Period'][Rows].tolist(), YearlyEnergy.tolist())))
+
+def LoadHeatPumpModels(FileName):
+   # The names and the capacity and COP curves of the models of a heat pump table at the temperatures of
+   # EnergyTemperatureList, as (model, temperature) arrays. Loaded again when the file changes.
+   Key=(FileName, os.path.getmtime(FileName), tuple(EnergyTemperatureList))
+   if Key not in HeatPumpModelCache:
+      Names=numpy.char.strip(numpy.loadtxt(FileName, delimiter=',', skiprows=1, usecols=0, dtype=str, ndmin=1))
+      Data=numpy.loadtxt(FileName, delimiter=',', skiprows=1, usecols=(1,2,3), dtype=numpy.float64, ndmin=2)
+      ModelNames, FirstRows, ModelIndex = numpy.unique(Names, return_index=True, return_inverse=True)
+      #The models are kept in the order of the file.
+      Models=numpy.argsort(FirstRows)
+      Grid=numpy.asarray(EnergyTemperatureList)
+      Capacity=numpy.empty((len(Models), len(Grid)))
+      COP=numpy.empty((len(Models), len(Grid)))
+      for Row, Model in enumerate(Models):
+         Points=numpy.flatnonzero(ModelIndex == Model)
+         Points=Points[numpy.argsort(Data[Points,0])]
+         Capacity[Row]=numpy.interp(Grid, Data[Points,0], Data[Points,1])
+         COP[Row]=numpy.interp(Grid, Data[Points,0], Data[Points,2])
+      HeatPumpModelCache[Key]={'Names':ModelNames[Models].tolist(), 'Capacity':Capacity, 'COP':COP}
+   return(HeatPumpModelCache[Key])
+
+def InterpolateHeatPumpCurves(HeatPumpModels, Temperatures):
+   # Capacity and COP of all models at each of the temperatures as (model, temperature) arrays. The position of the
+   # temperatures between those of EnergyTemperatureList is found once and used for all models.
+   Grid=numpy.asarray(EnergyTemperatureList)
+   Positions=numpy.interp(Temperatures, Grid, numpy.arange(len(Grid), dtype=numpy.float64))
+   Low=numpy.minimum(Positions.astype(numpy.int64), len(Grid)-2)
+   Fraction=Positions-Low
+   Capacity=HeatPumpModels['Capacity'][:,Low]*(1.0-Fraction)+HeatPumpModels['Capacity'][:,Low+1]*Fraction
+   COP=HeatPumpModels['COP'][:,Low]*(1.0-Fraction)+HeatPumpModels['COP'][:,Low+1]*Fraction
+   return(Capacity, COP)
+
+def SimulateHeatPumps(HeatPumpModels, Temperatures, Durations, HeatingPowerGain, HeatingPowerOffset, HeatingLimit, HoursPerSample=None):
+   # Yearly results of all heat pump models at once. Durations is the number of days (hours) per year at each of the
+   # Temperatures, like the temperature distribution, or all ones for a series of days (hours). Each needs the power of
+   # the fitted model for HoursPerSample hours, the heat pump delivers it up to its capacity and the backup heater the
+   # rest. A long series is simulated in chunks of HourlyChunkDays days (hours), so the (model, temperature) arrays of
+   # hundreds of models stay small.
+   if HoursPerSample is None:
+      HoursPerSample=GetHoursPerSample()
+   Temperatures=numpy.asarray(Temperatures, dtype=numpy.float64)
+   Durations=numpy.asarray(Durations, dtype=numpy.float64)
+   Sums=numpy.zeros((5, len(HeatPumpModels['Names'])))
+   ChunkSize=HourlyChunkDays*24
+   for Start in range(0, len(Temperatures), ChunkSize):
+      ChunkTemperatures=Temperatures[Start:Start+ChunkSize]
+      ChunkDurations=Durations[Start:Start+ChunkSize]
+      Demand=numpy.maximum(EvaluateHeatingModel(ChunkTemperatures, HeatingPowerGain, HeatingPowerOffset, HeatingLimit), 0.0)*HoursPerSample
+      Capacity, COP = InterpolateHeatPumpCurves(HeatPumpModels, ChunkTemperatures)
+      HeatPumpHeat=numpy.minimum(Demand, Capacity*HoursPerSample)
+      BackupHeat=Demand-HeatPumpHeat
+      Sums=Sums+numpy.stack((HeatPumpHeat, HeatPumpHeat/COP, BackupHeat, (BackupHeat > 1e-9).astype(numpy.float64),
+                             numpy.broadcast_to(Demand, BackupHeat.shape))) @ ChunkDurations
+   HeatPumpHeat, HeatPumpElectricity, BackupHeat, BackupDurations, Demand = Sums
+   BackupElectricity=BackupHeat/BackupHeaterEfficiency
+   with numpy.errstate(invalid='ignore', divide='ignore'):
+      SeasonalCOP=HeatPumpHeat/HeatPumpElectricity
+   return({'Model':HeatPumpModels['Names'], 'HeatPumpHeat':numpy.round(HeatPumpHeat,1), 'HeatPumpElectricity':numpy.round(HeatPumpElectricity,1),
+           'SeasonalCOP':numpy.round(SeasonalCOP,2), 'BackupHeat':numpy.round(BackupHeat,1), 'BackupElectricity':numpy.round(BackupElectricity,1),
+           'Backup'+("Hours" if HourlyAnalysis else "Days"):numpy.round(BackupDurations,1), 'HeatPumpShare':numpy.round(HeatPumpHeat/numpy.maximum(Demand, 1e-9),3),
+           'Electricity':numpy.round(HeatPumpElectricity+BackupElectricity,1), 'Cost':numpy.round((HeatPumpElectricity+BackupElectricity)*CostPerkWh,2)})
+
+def SimulateHeatPumpModels(HeatPumpModelFile, HeatingPowerGain, HeatingPowerOffset, HeatingLimit):
+   # The heat pump results over the temperature distribution of the yearly energy, with the cheapest model.
+   HeatPumps=SimulateHeatPumps(LoadHeatPumpModels(HeatPumpModelFile), EnergyTemperatureList, GetDaysPerYearAverageTemperature(),
+                               HeatingPowerGain, HeatingPowerOffset, HeatingLimit)
+   Cheapest=int(numpy.argmin(HeatPumps['Cost']))
+   return({'HeatPumps':HeatPumps, 'BestHeatPump':HeatPumps['Model'][Cheapest], 'BestHeatPumpCost':float(HeatPumps['Cost'][Cheapest])})
+
+def WriteHeatPumpResults(Results, FileNameSuffix=""):
+   FileName, Extension = os.path.splitext(HeatPumpResultFile)
+   WriteFits(Results['HeatPumps'], FileName+FileNameSuffix+Extension)
+
+def PrintHeatPumpResults(Results):
+   HeatPumps=Results['HeatPumps']
+   BackupName=[Name for Name in HeatPumps if Name.startswith('Backup') and Name not in ('BackupHeat', 'BackupElectricity')][0]
+   for Index in numpy.argsort(HeatPumps['Cost'], kind='stable')[:HeatPumpPrintModels]:
+      print("Heat Pump "+HeatPumps['Model'][Index]+": "+HeatPumps['Cost'][Index].__str__()+" Euro/Year, "+HeatPumps['Electricity'][Index].__str__()+" kWh (SCOP "+HeatPumps['SeasonalCOP'][Index].__str__()+"), Backup "+HeatPumps['BackupHeat'][Index].__str__()+" kWh on "+HeatPumps[BackupName][Index].__str__()+" "+BackupName[len('Backup'):]+"/Year")
+
+def PlotEnergyDistribution(PlotReference, Results):
+   DaysPerYearAverageTemperature=Results['DaysPerYearAverageTemperature']
+   ScaledEnergyVsAverageTemperature=list(Results['EnergyDistribution'])
    #Now Scale the calculated energyback to fit the plot, max energy = max days
    EnergyScaleFactor=max(DaysPerYearAverageTemperature)/max(ScaledEnergyVsAverageTemperature)
    #EnergyScaleFactor=1.0
@@ -721,19 +2339,27 @@ def PlotEnergyDistribution(PlotReference):
    MaxEnergyXOffset=EnergyTemperatureList[MaxEnergyIndex]
    MaxEnergyYOffset=(ScaledEnergyVsAverageTemperature[MaxEnergyIndex]+0.3)
 
-   TotalEnergy=int(sum(ScaledEnergyVsAverageTemperature)/EnergyScaleFactor)
+   TotalEnergy=Results['YearlyHeatingEnergy']
    PlotReference.plot(EnergyTemperatureList,ScaledEnergyVsAverageTemperature,'-', label="Scaled Estimated Heating Energy Distribution")
-   PlotReference.plot(EnergyTemperatureList, DaysPerYearAverageTemperature,'-.', label="Average Daily Temperature Distribution")
+   if Results['HourlyAnalysis']:
+      PlotReference.plot(EnergyTemperatureList, DaysPerYearAverageTemperature,'-.', label="Hourly Temperature Distribution")
+   else:
+      PlotReference.plot(EnergyTemperatureList, DaysPerYearAverageTemperature,'-.', label="Average Daily Temperature Distribution")
    MaxEnergyString="Max="+MaxEnergy.__str__()+" kWh @"+MaxEnergyXOffset.__str__()+"C,\nEstimated Year Total="+TotalEnergy.__str__()+" kWh"
    PlotReference.text(MaxEnergyXOffset-5,MaxEnergyYOffset,MaxEnergyString)
    PlotReference.axis([PlotMinTemperature,30,0,(1.65*MaxScaledEnergy)])
    PlotReference.legend(loc="upper left")
    PlotReference.grid(True)
    PlotReference.set_xlabel("OutDoor Temperature [C]")
-   EnergyUsageString="Estimated Year Total Energy Required for Heating ="+(TotalEnergy/1000.0).__str__()+" MWh"
+   EnergyUsageString="Estimated Year Total Energy Required for Heating ="+(TotalEnergy/1000.0).__str__()+" MWh ("+Results['ClimatePeriod']+")\n"
+   EnergyUsageString=EnergyUsageString+"Over all climate periods: "+(Results['YearlyHeatingEnergyMin']/1000.0).__str__()+" - "+(Results['YearlyHeatingEnergyMax']/1000.0).__str__()+" MWh"
    return(EnergyUsageString)
 
-def PlotExternalEnergyData(PlotReference):
+def PlotExternalEnergyData(PlotReference, Results):
+   AverageIndoorTemp=Results['AverageIndoorTemp']
+   PowerPointAtIndoorTemperature=Results['PowerPointAtIndoorTemperature']
+   AverageInternalPower=Results['AverageInternalPower']
+   AverageExternalPower=Results['AverageExternalPower']
    # Create points to draw the lines for the internal and external Power.
    CrossSectionIndoorTempLine=[2.0, PowerPointAtIndoorTemperature]
    IndoorTempBaseLine=[AverageIndoorTemp, AverageIndoorTemp]
@@ -741,81 +2367,742 @@ def PlotExternalEnergyData(PlotReference):
    IndoorTemperatureValueString="Average\nTindoor="+round(AverageIndoorTemp,1).__str__()+" C"
    PlotReference.text((AverageIndoorTemp-5.0),(2.2),IndoorTemperatureValueString)
 
-   HeatingPowerPlusInternalFitline=[(HeatingPowerMax-AverageInternalPower),(HeatingPowerMin-AverageInternalPower)]
-   HeatingPowerPlusInternalPlusExternalFitline=[(HeatingPowerMax-AverageInternalPower-AverageExternalPower),(HeatingPowerMin-AverageInternalPower-AverageExternalPower)]
-   PlotReference.plot(HeatingPowerFitlineTemp, HeatingPowerPlusInternalFitline, 'b-.', label="+ Internal Power")
-   PlotReference.plot(HeatingPowerFitlineTemp, HeatingPowerPlusInternalPlusExternalFitline, 'b:', label="+ Internal & External Power")
+   HeatingPowerPlusInternalFitline=numpy.asarray(Results['HeatingPowerFitline'])-AverageInternalPower
+   HeatingPowerPlusInternalPlusExternalFitline=numpy.asarray(Results['HeatingPowerFitline'])-AverageInternalPower-AverageExternalPower
+   PlotReference.plot(Results['HeatingPowerFitlineTemp'], HeatingPowerPlusInternalFitline, 'b-.', label="+ Internal Power")
+   PlotReference.plot(Results['HeatingPowerFitlineTemp'], HeatingPowerPlusInternalPlusExternalFitline, 'b:', label="+ Internal & External Power")
    PlotReference.legend(loc="upper right")
 
 
 
+def AlignSnapshotOffset(Offset):
+   return(-(-Offset//SnapshotAlignment)*SnapshotAlignment)
 
-##############################################################################################################
-# Main
-##############################################################################################################
-HeatingLimit = 0.0
-if not EstimateAdditionalInternalAndExternalEnergy:
+def EncodeSnapshotValue(Value, Path, Arrays):
+   # The value as JSON types, the arrays in it are replaced by their Path and added to Arrays.
+   if isinstance(Value, numpy.ndarray):
+      if Value.dtype.hasobject:
+         raise ValueError("Can not store the object array "+Path+" in a snapshot")
+      Arrays[Path]=numpy.ascontiguousarray(Value)
+      return({'$Array':Path})
+   if isinstance(Value, dict):
+      return(collections.OrderedDict((str(Key), EncodeSnapshotValue(Item, Path+"/"+str(Key), Arrays)) for Key, Item in Value.items()))
+   if isinstance(Value, (list, tuple)):
+      return([EncodeSnapshotValue(Item, Path+"/"+Index.__str__(), Arrays) for Index, Item in enumerate(Value)])
+   if isinstance(Value, enum.Enum):
+      return({'$Enum':type(Value).__name__, 'Name':Value.name})
+   if isinstance(Value, datetime.datetime):
+      return({'$DateTime':Value.isoformat()})
+   if isinstance(Value, datetime.date):
+      return({'$Date':Value.isoformat()})
+   if isinstance(Value, numpy.generic):
+      return(Value.item())
+   return(Value)
+
+def DecodeSnapshotValue(Value, Arrays):
+   if isinstance(Value, list):
+      return([DecodeSnapshotValue(Item, Arrays) for Item in Value])
+   if not isinstance(Value, dict):
+      return(Value)
+   if '$Array' in Value:
+      return(Arrays[Value['$Array']])
+   if '$Enum' in Value:
+      return(SnapshotEnums[Value['$Enum']][Value['Name']])
+   if '$DateTime' in Value:
+      return(datetime.datetime.fromisoformat(Value['$DateTime']))
+   if '$Date' in Value:
+      return(datetime.date.fromisoformat(Value['$Date']))
+   return(collections.OrderedDict((Key, DecodeSnapshotValue(Item, Arrays)) for Key, Item in Value.items()))
+
+def WriteSnapshot(FileName, Config, Results):
+   # Writes the SnapshotMagic, the SnapshotVersion and the length of the JSON header as 2 little endian 32 bit
+   # numbers, the JSON header with the config, the results and the dtype, shape and offset of each array, and the
+   # arrays, each starting at a multiple of SnapshotAlignment bytes after the aligned end of the header.
+   Arrays=collections.OrderedDict()
+   Header=collections.OrderedDict([('Version', SnapshotVersion), ('Created', datetime.datetime.now().isoformat()),
+                                   ('Config', EncodeSnapshotValue(Config, 'Config', Arrays)),
+                                   ('Results', EncodeSnapshotValue(Results, 'Results', Arrays))])
+   Layout=collections.OrderedDict()
+   Offset=0
+   for Path, Array in Arrays.items():
+      Layout[Path]={'DType':Array.dtype.str, 'Shape':list(Array.shape), 'Offset':Offset}
+      Offset=AlignSnapshotOffset(Offset+Array.nbytes)
+   Header['Arrays']=Layout
+   HeaderBytes=json.dumps(Header).encode('utf-8')
+   HeaderEnd=len(SnapshotMagic)+8+len(HeaderBytes)
+   with open(FileName, 'wb') as SnapshotFile:
+      SnapshotFile.write(SnapshotMagic+numpy.array([SnapshotVersion, len(HeaderBytes)], dtype='<u4').tobytes()+HeaderBytes)
+      SnapshotFile.write(bytes(AlignSnapshotOffset(HeaderEnd)-HeaderEnd))
+      for Array in Arrays.values():
+         SnapshotFile.write(Array.tobytes())
+         SnapshotFile.write(bytes(AlignSnapshotOffset(Array.nbytes)-Array.nbytes))
+   return(AlignSnapshotOffset(HeaderEnd)+Offset)
+
+def ReadSnapshot(FileName):
+   # The config and results of a snapshot of WriteSnapshot. The arrays are read only views on the file mapped into
+   # memory, so only the parts used are read. Config parameters this version of the script does not know are left out.
+   with open(FileName, 'rb') as SnapshotFile:
+      Map=mmap.mmap(SnapshotFile.fileno(), 0, access=mmap.ACCESS_READ)
+   if Map[:len(SnapshotMagic)] != SnapshotMagic:
+      raise ValueError(FileName+" is not a snapshot")
+   Version, HeaderLength = numpy.frombuffer(Map, dtype='<u4', count=2, offset=len(SnapshotMagic)).tolist()
+   if Version > SnapshotVersion:
+      raise ValueError(FileName+" is a version "+Version.__str__()+" snapshot, this script reads up to version "+SnapshotVersion.__str__())
+   HeaderStart=len(SnapshotMagic)+8
+   Header=json.loads(Map[HeaderStart:HeaderStart+HeaderLength].decode('utf-8'))
+   DataStart=AlignSnapshotOffset(HeaderStart+HeaderLength)
+   Arrays={}
+   for Path, Layout in Header['Arrays'].items():
+      DType=numpy.dtype(Layout['DType'])
+      Count=int(numpy.prod(Layout['Shape'], dtype=numpy.int64))
+      if Count == 0:
+         Arrays[Path]=numpy.empty(Layout['Shape'], dtype=DType)
+      else:
+         Arrays[Path]=numpy.frombuffer(Map, dtype=DType, count=Count, offset=DataStart+Layout['Offset']).reshape(Layout['Shape'])
+   Config=DecodeSnapshotValue(Header['Config'], Arrays)
+   Config=collections.OrderedDict((Name, Value) for Name, Value in Config.items() if Name in ConfigParameterNames)
+   return(Config, DecodeSnapshotValue(Header['Results'], Arrays))
+
+def ReadSnapshotSamples(FileName):
+   # The samples of a snapshot in the order of LoadHouseData.
+   with MeasureStage("ReadSnapshot", FileName) as Stage:
+      Config, Results = ReadSnapshot(FileName)
+      Stage['Samples']=len(Results['OutdoorTempSamples'])
+      Stage['Bytes']=os.path.getsize(FileName)
+   if Config.get('HourlyAnalysis', False) != HourlyAnalysis:
+      raise ValueError(FileName+" has "+("hourly" if Config.get('HourlyAnalysis', False) else "daily")+" samples, set HourlyAnalysis to match")
+   return(tuple(Results[Name] for Name in ('OutdoorTempSamples', 'HeatingPowerSamples', 'IndoorTempSamples', 'ElectricitySamples', 'SampleDates')))
+
+def WriteHouseSnapshot(Results, FileNameSuffix=""):
+   FileName, Extension = os.path.splitext(SnapshotExportFile)
+   with MeasureStage("WriteSnapshot", FileName+FileNameSuffix+Extension) as Stage:
+      Stage['Bytes']=WriteSnapshot(FileName+FileNameSuffix+Extension, collections.OrderedDict((Name, globals()[Name]) for Name in ConfigParameterNames), Results)
+      Stage['Samples']=len(Results['OutdoorTempSamples'])
+
+def LoadHouseData():
+   # Get the data from Domoticz or csv file, or from a snapshot of an earlier run.
+   if SnapshotImportFile:
+      return(ReadSnapshotSamples(SnapshotImportFile))
    ElectricEnergyData = []
    IndoorData = []
+   IndoorTempSamples = []
+   ElectricitySamples = []
+   #The CSVFile has no dates.
+   SampleDates = None
+   if GetDataFrom == DataSource.FromCSVFile:
+      with MeasureStage("ReadCSVFile", CSVFile) as Stage:
+         OutdoorTempSamples, HeatingPowerSamples, IndoorTempSamples, ElectricitySamples = GetDataListsFromCSVFile()
+         Stage['Samples']=len(OutdoorTempSamples)
+         Stage['Bytes']=os.path.getsize(CSVFile)
+   elif GetDataFrom == DataSource.FromCSVFileGasOnly:
+      with MeasureStage("ReadGasOnlyCSVFile", CSVGasOnlyFile) as Stage:
+         GasDateSamples, GasEnergySamples = GetGasOnlyFromCSVFile()
+         Stage['Samples']=len(GasDateSamples)
+         Stage['Bytes']=os.path.getsize(CSVGasOnlyFile)
+      KNMIDateSamples, KNMITempSamples = GetTemperaturesFromKNMI(GasDateSamples)
+      PrintKNMICacheStatistics()
+      if HouseLatitude is not None and HouseLongitude is not None:
+         PrintNearestStations()
+      with MeasureStage("JoinGasAndKNMI", GasOnlyJoinType.name) as Stage:
+         JoinedDates, HeatingPowerSamples, OutdoorTempSamples, JoinReport = JoinDateSeries(GasDateSamples, GasEnergySamples, KNMIDateSamples, KNMITempSamples, GasOnlyJoinType, NearestJoinMaxDays, 'h' if HourlyAnalysis else 'D')
+         Stage['Samples']=len(JoinedDates)
+      PrintJoinReport(JoinReport, "Gas", "KNMI")
+      #Gas days without a temperature (left join) are reported above, but can not be used for fitting.
+      TemperatureFound=~numpy.isnan(OutdoorTempSamples)
+      HeatingPowerSamples=HeatingPowerSamples[TemperatureFound]
+      OutdoorTempSamples=OutdoorTempSamples[TemperatureFound]
+      SampleDates=JoinedDates[TemperatureFound]
+   else:
+      #All sensors are queried at the same time.
+      Executor = GetDomoticzFetchExecutor()
+      OutdoorFetch = Executor.submit(GetOutdoorTemp)
+      if UseGasDataForHeatingEnergyEstimation:
+         HeatingEnergyFetch = Executor.submit(GetHeatingEnergyFromGasUsage)
+      else:
+         HeatingEnergyFetch = Executor.submit(GetHeatingEnergy)
+      if EstimateAdditionalInternalAndExternalEnergy:
+         ElectricEnergyFetch = Executor.submit(GetTotalUsedElectricEnergy)
+         IndoorFetch = Executor.submit(GetIndoorTemp)
+         ElectricEnergyData = ProcessElectricEnergy(ElectricEnergyFetch.result())
+         IndoorData = IndoorFetch.result()
+      OutdoorData = OutdoorFetch.result()
+      HeatingEnergyData = HeatingEnergyFetch.result()
+      with MeasureStage("MergeDomoticzColumns") as Stage:
+         #Create One set of columns of measurements, date+time based.
+         Measurements=CreateColumnsOfData(IndoorData, OutdoorData, HeatingEnergyData, ElectricEnergyData)
+         # Now Create the lists of data for the fitting algorithm to use.
+         IndoorTempSamples, OutdoorTempSamples, HeatingPowerSamples, ElectricitySamples = GetDataListsFromColumns(Measurements)
+         Stage['Samples']=len(OutdoorTempSamples)
+      SampleDates = Measurements['Date'].astype('datetime64[h]' if HourlyAnalysis else 'datetime64[D]')
+   return(OutdoorTempSamples, HeatingPowerSamples, IndoorTempSamples, ElectricitySamples, SampleDates)
+
+def EstimateHeatingFromFit(HeatingPowerPerxxhGain, HeatingPowerPerxxhOffset, HeatingLimit=None):
+   # Returns a dictionary with the heating limit, power, alternative power and yearly energy estimates of a fit,
+   # the heating limit is where the line crosses zero unless the model gives it.
+   if HeatingLimit is None:
+      HeatingLimit=(-1.0*HeatingPowerPerxxhOffset)/HeatingPowerPerxxhGain
+
+   #When Outside Temperature of interest is higher than the temperature that does no require heating anymore,
+   # make it the same, to prevent negative heating capacity values 
+   TemperatureOfInterest=OutsideTemperatureOfInterest
+   if HeatingLimit < TemperatureOfInterest:
+      TemperatureOfInterest = round(HeatingLimit,2)
+
+   DaysAlternativePower=round(CalculateDaysPerYearBelowTemperature(TemperatureOfInterest),1)
+   HeatingPowerMinus15=HeatingPowerPerxxhGain*-15.0+HeatingPowerPerxxhOffset
+   HeatingPowerTemperatureOffInterest=HeatingPowerPerxxhGain*TemperatureOfInterest+HeatingPowerPerxxhOffset
+   AlternativePower=round(HeatingPowerMinus15-HeatingPowerTemperatureOffInterest,2)
+   AlternativeEnergy=round(((HeatingPowerMinus15-HeatingPowerTemperatureOffInterest)*DaysAlternativePower*GetHoursPerSample()*0.5),2)
+   AlternativeEnergyCost=round(CostPerkWh*AlternativeEnergy,2)
+   EnergyDistribution=CalculateEnergyDistribution(HeatingPowerPerxxhGain, HeatingPowerPerxxhOffset, HeatingLimit)
+   YearlyHeatingEnergy=int(sum(EnergyDistribution))
+   YearlyHeatingEnergyPerClimatePeriod=CalculateYearlyEnergyPerClimatePeriod(HeatingPowerPerxxhGain, HeatingPowerPerxxhOffset, HeatingLimit)
+   return({'HeatingLimit':HeatingLimit, 'OutsideTemperatureOfInterest':TemperatureOfInterest,
+           'DaysAlternativePower':DaysAlternativePower, 'HeatingPowerTemperatureOffInterest':HeatingPowerTemperatureOffInterest,
+           'AlternativePower':AlternativePower, 'AlternativeEnergy':AlternativeEnergy, 'AlternativeEnergyCost':AlternativeEnergyCost,
+           'YearlyHeatingEnergy':YearlyHeatingEnergy, 'EnergyDistribution':EnergyDistribution, 'ClimatePeriod':GetClimateDescription(),
+           'HeatingDegreeHours':int(CalculateHeatingDegreeHours(HeatingLimit)), 'SampleUnit':"Hours" if HourlyAnalysis else "Days",
+           'YearlyHeatingEnergyPerClimatePeriod':YearlyHeatingEnergyPerClimatePeriod,
+           'YearlyHeatingEnergyMin':int(min(YearlyHeatingEnergyPerClimatePeriod.values())),
+           'YearlyHeatingEnergyMax':int(max(YearlyHeatingEnergyPerClimatePeriod.values()))})
+
+def AnalyseHouseData(OutdoorTempSamples, HeatingPowerSamples, IndoorTempSamples, ElectricitySamples, SampleDates=None):
+   # Returns a dictionary with the samples, all results and the settings used to get them.
+   # Fit the model over the energy points and calculate the points of its curve for the plot.
+   with MeasureStage("FitHeatingModel", HeatingCurveModel.name) as Stage:
+      Model=FitHeatingModel(OutdoorTempSamples, HeatingPowerSamples)
+      Stage['Samples']=len(OutdoorTempSamples)
+   HeatingPowerPerxxhGain, HeatingPowerPerxxhOffset, Correlation = Model['Gain'], Model['Offset'], Model['Correlation']
+
+   HeatingPowerFitlineTemp=numpy.linspace(PlotMinTemperature, PlotMaxTemperature, PlotCurvePoints)
+   HeatingPowerFitline=EvaluateHeatingModel(HeatingPowerFitlineTemp, HeatingPowerPerxxhGain, HeatingPowerPerxxhOffset, Model['Limit'], Model['Base'])
+   HeatingPowerMax=float(HeatingPowerFitline[0])
+   HeatingPowerMin=float(HeatingPowerFitline[-1])
+   PlotMaxPower = round(HeatingPowerMax,2)+1.5
+   if GetDataFrom == DataSource.FromCSVFileGasOnly:
+      DataFile=CSVGasOnlyFile
+   else:
+      DataFile=CSVFile
+
+   Results={'OutdoorTempSamples':OutdoorTempSamples, 'HeatingPowerSamples':HeatingPowerSamples,
+            'IndoorTempSamples':IndoorTempSamples, 'ElectricitySamples':ElectricitySamples, 'SampleDates':SampleDates,
+            'FitModel':HeatingCurveModel.name, 'HeatingPowerBase':Model['Base'],
+            'HeatingPowerPerxxhGain':HeatingPowerPerxxhGain, 'HeatingPowerPerxxhOffset':HeatingPowerPerxxhOffset,
+            'Correlation':Correlation, 'HeatingPowerMax':HeatingPowerMax, 'HeatingPowerMin':HeatingPowerMin,
+            'PlotMaxPower':PlotMaxPower, 'PlotMinPower':0.0, 'HeatingPowerFitline':HeatingPowerFitline,
+            'HeatingPowerFitlineTemp':HeatingPowerFitlineTemp,
+            'DaysPerYearAverageTemperature':GetDaysPerYearAverageTemperature(),
+            #The settings used, so the results can be rendered in another process.
+            'GetDataFrom':GetDataFrom, 'DataFile':DataFile, 'DateStartAnalyses':DateStartAnalyses,
+            'DateEndAnalyses':DateEndAnalyses, 'UseGasDataForHeatingEnergyEstimation':UseGasDataForHeatingEnergyEstimation,
+            'EstimateAdditionalInternalAndExternalEnergy':EstimateAdditionalInternalAndExternalEnergy,
+            'HoursForHeatingADay':GetHoursPerSample(), 'HeatFromWarmBodies':HeatFromWarmBodies, 'HourlyAnalysis':HourlyAnalysis}
+   with MeasureStage("EstimateHeating"):
+      Results.update(EstimateHeatingFromFit(HeatingPowerPerxxhGain, HeatingPowerPerxxhOffset, Model['Limit']))
+   if HeatPumpModelFile:
+      with MeasureStage("SimulateHeatPumps", HeatPumpModelFile) as Stage:
+         Results.update(SimulateHeatPumpModels(HeatPumpModelFile, HeatingPowerPerxxhGain, HeatingPowerPerxxhOffset, Model['Limit']))
+         Stage['Samples']=len(Results['HeatPumps']['Model'])
+   #The resamples are fitted with a straight line, whose intervals do not belong to the other models, and those take
+   #too long to fit that often.
+   if BootstrapResamples > 0 and HeatingCurveModel != FitModel.Linear:
+      print("Bootstrap intervals are only calculated for FitModel.Linear, skipped for "+HeatingCurveModel.__str__())
+   elif BootstrapResamples > 0:
+      with MeasureStage("BootstrapIntervals") as Stage:
+         Results.update(CalculateBootstrapIntervals(OutdoorTempSamples, HeatingPowerSamples))
+         Stage['Samples']=BootstrapResamples
+
+   if EstimateAdditionalInternalAndExternalEnergy:
+      AverageIndoorTemp = numpy.mean(IndoorTempSamples)
+      PowerPointAtIndoorTemperature = HeatingPowerPerxxhGain*AverageIndoorTemp+HeatingPowerPerxxhOffset
+      ElectricPower = -1.0*(numpy.mean(ElectricitySamples)/GetHoursPerSample())
+      PowerFromPeople = -1.0*(HeatFromWarmBodies*GetDaysPerSample()/GetHoursPerSample())
+      AverageInternalPower = ElectricPower + PowerFromPeople
+      AverageExternalPower = PowerPointAtIndoorTemperature - AverageInternalPower
+      Results.update({'AverageIndoorTemp':AverageIndoorTemp, 'PowerPointAtIndoorTemperature':PowerPointAtIndoorTemperature,
+                      'PlotMinPower':PowerPointAtIndoorTemperature-1.0, 'AverageInternalPower':AverageInternalPower,
+                      'AverageExternalPower':AverageExternalPower})
+   return(Results)
+
+def ParseBoolean(Value):
+   return(Value.strip().lower() in ('1', 'true', 'yes'))
+
+def ParseDate(Value):
+   return(datetime.datetime.strptime(Value.strip(), '%Y-%m-%d').date())
+
+def SetHouseParameters(House):
+   # Sets the config of one house in a batch from its manifest row, parameters not in the row get their defaults.
+   globals().update(DefaultHouseParameters)
+   for Name, Convert in BatchHouseParameters.items():
+      if House.get(Name, "").strip():
+         globals()[Name] = Convert(House[Name])
+   if House.get('DataFile', "").strip():
+      if GetDataFrom == DataSource.FromCSVFileGasOnly:
+         globals()['CSVGasOnlyFile'] = House['DataFile'].strip()
+      else:
+         globals()['CSVFile'] = House['DataFile'].strip()
+   UpdateDomoticzURLs()
+
+def AnalyseBatchHouse(House):
+   # Runs in a worker process of the batch, so setting the module config for this house does not affect others.
+   # Returns the summary row and, when reports are rendered, the results to render them from.
+   # The stages measured for the house are returned too, so they can be summarised with those of the other houses.
+   Summary=collections.OrderedDict([('House', House.get('House', ""))])
+   Results=None
+   del StageRecords[:]
+   try:
+      SetHouseParameters(House)
+      with MeasureStage("AnalyseBatchHouse", Summary['House']):
+         Results=AnalyseHouseData(*LoadHouseData())
+         if RollingFitDays > 0:
+            WriteRollingFits(Results, "_"+Summary['House'])
+         if HeatPumpModelFile:
+            WriteHeatPumpResults(Results, "_"+Summary['House'])
+         if SnapshotExportFile:
+            WriteHouseSnapshot(Results, "_"+Summary['House'])
+      Summary['Samples']=len(Results['OutdoorTempSamples'])
+      for Name in BatchSummaryColumns:
+         #The intervals are only there when BootstrapResamples is set.
+         Summary[Name]=Results.get(Name, "")
+      Summary['Error']=""
+   except Exception as fout:
+      #One house with bad data or an unreachable source should not stop the whole batch.
+      print("Error: "+str(fout)+" House: "+Summary['House'])
+      Summary['Error']=str(fout)
+      Results=None
+   if RenderReport != RenderMode.File:
+      Results=None
+   return(Summary, Results, list(StageRecords))
+
+def GetBatchStationSpans(Houses):
+   # The first and last date per StationID of every KNMI station the houses need: the station or nearest stations
+   # over the dates of the gas file and the ClimateStation over its years.
+   Spans={}
+   def AddSpan(StationID, FirstDate, LastDate):
+      SpanFirstDate, SpanLastDate = Spans.get(StationID, (FirstDate, LastDate))
+      Spans[StationID]=(min(SpanFirstDate, FirstDate), max(SpanLastDate, LastDate))
+   for House in Houses:
+      try:
+         SetHouseParameters(House)
+         if HourlyAnalysis:
+            #Hourly temperatures are not shared, these are read from the KNMICacheFile.
+            continue
+         if GetDataFrom == DataSource.FromCSVFileGasOnly:
+            GasDateSamples, GasEnergySamples = GetGasOnlyFromCSVFile()
+            FirstDate=numpy.datetime64(GasDateSamples[0],'D').astype(datetime.date)
+            LastDate=numpy.datetime64(GasDateSamples[-1],'D').astype(datetime.date)
+            if HouseLatitude is not None and HouseLongitude is not None:
+               StationNames=FindNearestStations(HouseLatitude, HouseLongitude, KNMINearestStations)[0]
+            else:
+               StationNames=[KNMIStationToUse]
+            for Name in StationNames:
+               AddSpan(StationIDDictionary[Name], FirstDate, LastDate)
+         if ClimateStation:
+            AddSpan(StationIDDictionary[ClimateStation], datetime.date(ClimateFirstYear,1,1), min(datetime.date(ClimateLastYear,12,31), datetime.date.today()-datetime.timedelta(days=1)))
+      except (IOError, ValueError, KeyError, IndexError):
+         #The house reports its error when it is analysed.
+         pass
+   SetHouseParameters({})
+   return(Spans)
+
+def PrefetchBatchStationTemperatures(Houses):
+   # Fetches the KNMI temperatures of all stations the houses need once, for SharedStationTemperatures.
+   Shared={}
+   for StationID, (FirstDate, LastDate) in GetBatchStationSpans(Houses).items():
+      try:
+         DateList, TemperatureList = GetStationTemperatures(StationID, FirstDate, LastDate)
+      except (HTTPError, URLError, IOError, ValueError) as fout:
+         print("Error: "+str(fout)+" Station: "+StationID)
+         continue
+      Shared[StationID]=(FirstDate, LastDate, numpy.array(DateList, dtype='datetime64[D]'), numpy.array(TemperatureList, dtype=numpy.float64))
+   return(Shared)
+
+def SetSharedStationTemperatures(Shared):
+   # Initializer of the batch worker processes, the statistics of the prefetch are printed by the batch already.
+   SharedStationTemperatures.update(Shared)
+   KNMICacheStatistics.update({'Hits':0, 'Misses':0, 'Requests':0, 'BytesFetched':0})
+
+def RunBatch():
+   with open(BatchManifestFile) as csvfile:
+      Houses=list(csv.DictReader(csvfile))
+   Workers=BatchWorkers if BatchWorkers > 0 else os.cpu_count()
+   Shared=PrefetchBatchStationTemperatures(Houses)
+   if Shared:
+      print("Batch: KNMI temperatures of "+len(Shared).__str__()+" stations fetched for all houses")
+      PrintKNMICacheStatistics()
+   FieldNames=['House', 'Samples']+BatchSummaryColumns+['Error']
+   with open(BatchSummaryFile, 'w', newline='') as csvfile:
+      Writer=csv.DictWriter(csvfile, fieldnames=FieldNames)
+      Writer.writeheader()
+      with concurrent.futures.ProcessPoolExecutor(max_workers=Workers, initializer=SetSharedStationTemperatures, initargs=(Shared,)) as Executor:
+         for Summary, Results, HouseStageRecords in Executor.map(AnalyseBatchHouse, Houses, chunksize=max(1, len(Houses)//(4*Workers))):
+            Writer.writerow(Summary)
+            StageRecords.extend(HouseStageRecords)
+            if Results is not None:
+               SubmitReportRender(Results, ReportFileName+"_"+Summary['House'])
+   WaitForReportRenders()
+   print("Batch: "+len(Houses).__str__()+" houses analysed, results written to "+BatchSummaryFile)
+
+def SetSweepSamples(Samples):
+   # The samples of LoadHouse the sweep starts from, with the gas for warm water and cooking and the hours of heating
+   # they were loaded with. The steps below are remembered for their parameters only, so they are forgotten here.
+   SweepSamples.clear()
+   SweepSamples.update(Samples)
+   SweepSamples.update({'CubicMetersGasADay':CubicMetersGasADayForWarmWaterAndCooking, 'HoursPerSample':GetHoursPerSample(),
+                        'UsesGas':GetDataFrom == DataSource.FromCSVFileGasOnly or UseGasDataForHeatingEnergyEstimation})
+   for Step in (GetSweepHeatingPowerSamples, FitSweepModel, EstimateSweepPoint, SimulateSweepHeatPumps, GetSweepHeatPumpCapacity):
+      Step.cache_clear()
+
+@functools.lru_cache(maxsize=None)
+def GetSweepHeatingPowerSamples(CubicMetersGasADay, HoursForHeating):
+   # The heating power samples as if loaded with these values, the gas for warm water and cooking only shifts the
+   # energy of each sample and the hours of heating only scale it, so the data is not read again.
+   Energy=SweepSamples['HeatingPowerSamples']*SweepSamples['HoursPerSample']
+   if SweepSamples['UsesGas']:
+      Energy=Energy+(SweepSamples['CubicMetersGasADay']-CubicMetersGasADay)*GetDaysPerSample()*EnergyPerCubicMeterGas
+   return(Energy/(1.0 if HourlyAnalysis else HoursForHeating))
+
+@functools.lru_cache(maxsize=None)
+def FitSweepModel(CubicMetersGasADay, HoursForHeating):
+   return(FitHeatingModel(SweepSamples['OutdoorTempSamples'], GetSweepHeatingPowerSamples(CubicMetersGasADay, HoursForHeating)))
+
+@functools.lru_cache(maxsize=None)
+def EstimateSweepPoint(CubicMetersGasADay, HoursForHeating, TemperatureOfInterest):
+   # The estimates of EstimateHeatingFromFit, the alternative energy cost is that of the configured CostPerkWh.
+   Model=FitSweepModel(CubicMetersGasADay, HoursForHeating)
+   with UsingConfig({'HoursForHeatingADay':HoursForHeating, 'OutsideTemperatureOfInterest':TemperatureOfInterest}):
+      return(EstimateHeatingFromFit(Model['Gain'], Model['Offset'], Model['Limit']))
+
+@functools.lru_cache(maxsize=None)
+def SimulateSweepHeatPumps(CubicMetersGasADay, HoursForHeating):
+   Model=FitSweepModel(CubicMetersGasADay, HoursForHeating)
+   with UsingConfig({'HoursForHeatingADay':HoursForHeating}):
+      return(SimulateHeatPumps(LoadHeatPumpModels(HeatPumpModelFile), EnergyTemperatureList, GetDaysPerYearAverageTemperature(),
+                               Model['Gain'], Model['Offset'], Model['Limit']))
+
+@functools.lru_cache(maxsize=None)
+def GetSweepHeatPumpCapacity(TemperatureOfInterest):
+   Capacity, COP = InterpolateHeatPumpCurves(LoadHeatPumpModels(HeatPumpModelFile), [TemperatureOfInterest])
+   return(Capacity[:,0])
+
+def GetSweepValues(Values, ConfiguredValue):
+   return([float(Value) for Value in Values] if len(Values) > 0 else [ConfiguredValue])
+
+def SelectSweepHeatPump(Estimate, CubicMetersGasADay, HoursForHeating):
+   # The heat pump model with the lowest electricity use of the models that deliver the required heating power at the
+   # outside temperature of interest, or the one with the largest capacity there when none does.
+   HeatPumps=SimulateSweepHeatPumps(CubicMetersGasADay, HoursForHeating)
+   Capacity=GetSweepHeatPumpCapacity(Estimate['OutsideTemperatureOfInterest'])
+   Candidates=numpy.flatnonzero(Capacity >= Estimate['HeatingPowerTemperatureOffInterest'])
+   if len(Candidates) == 0:
+      Selected=int(numpy.argmax(Capacity))
+   else:
+      Selected=int(Candidates[numpy.argmin(HeatPumps['Electricity'][Candidates])])
+   return(HeatPumps['Model'][Selected], float(Capacity[Selected]), float(HeatPumps['Electricity'][Selected]))
 
-# Get the data from Domoticz or csv file
-if GetDataFrom == DataSource.FromCSVFile:
-   OutdoorTempSamples, HeatingPowerSamples, IndoorTempSamples, ElectricitySamples = GetDataListsFromCSVFile()
-elif GetDataFrom == DataSource.FromCSVFileGasOnly:
-   GasDateSamples, GasEnergySamples = GetGasOnlyFromCSVFile()
-   KNMIDateSamples, KNMITempSamples = GetTemperaturesFromKNMI(GasDateSamples)
+def FindParetoFront(Capacity, Cost):
+   # Indices of the points no other point beats on both capacity and cost, from small to large capacity: after
+   # sorting on capacity and cost these are the points that cost less than all points before them.
+   Order=numpy.lexsort((Cost, Capacity))
+   SortedCost=Cost[Order]
+   PreviousMinimum=numpy.concatenate(([numpy.inf], numpy.minimum.accumulate(SortedCost)[:-1]))
+   return(Order[SortedCost < PreviousMinimum])
+
+def CalculateSweep(Samples):
+   # The results of all combinations of the sweep values and the Pareto front per cost per kWh, both as columns.
+   # The costs are the last and fastest changing combination, so each estimate is repeated for all costs at once.
+   Costs=numpy.array(GetSweepValues(SweepCostPerkWh, CostPerkWh))
+   Points=collections.OrderedDict((Name, []) for Name in ('CubicMetersGasADayForWarmWaterAndCooking', 'HoursForHeatingADay',
+      'OutsideTemperatureOfInterest', 'HeatingPowerPerxxhGain', 'HeatingPowerPerxxhOffset', 'HeatingLimit',
+      'HeatingPowerTemperatureOffInterest', 'YearlyHeatingEnergy', 'AlternativeEnergy', 'HeatPump', 'InstalledCapacity', 'AnnualElectricity'))
+   with MeasureStage("Sweep") as Stage:
+      SetSweepSamples(Samples)
+      for CubicMetersGasADay, HoursForHeating, TemperatureOfInterest in itertools.product(
+            GetSweepValues(SweepCubicMetersGasADay, CubicMetersGasADayForWarmWaterAndCooking),
+            GetSweepValues(SweepHoursForHeatingADay, HoursForHeatingADay), GetSweepValues(SweepOutsideTemperatures, OutsideTemperatureOfInterest)):
+         #Without gas the gas for warm water and cooking changes nothing, so all its values share the steps.
+         FitGasADay=CubicMetersGasADay if SweepSamples['UsesGas'] else SweepSamples['CubicMetersGasADay']
+         Model=FitSweepModel(FitGasADay, HoursForHeating)
+         Estimate=EstimateSweepPoint(FitGasADay, HoursForHeating, TemperatureOfInterest)
+         if HeatPumpModelFile:
+            HeatPump, InstalledCapacity, AnnualElectricity = SelectSweepHeatPump(Estimate, FitGasADay, HoursForHeating)
+         else:
+            HeatPump, InstalledCapacity, AnnualElectricity = "", Estimate['HeatingPowerTemperatureOffInterest'], Estimate['AlternativeEnergy']
+         for Name, Value in zip(Points, (CubicMetersGasADay, HoursForHeating, Estimate['OutsideTemperatureOfInterest'], Model['Gain'],
+                                         Model['Offset'], Estimate['HeatingLimit'], Estimate['HeatingPowerTemperatureOffInterest'],
+                                         Estimate['YearlyHeatingEnergy'], Estimate['AlternativeEnergy'], HeatPump, InstalledCapacity, AnnualElectricity)):
+            Points[Name].append(Value)
+      Sweep=collections.OrderedDict((Name, numpy.repeat(numpy.array(Values), len(Costs))) for Name, Values in Points.items())
+      Sweep['CostPerkWh']=numpy.tile(Costs, len(Points['HeatPump']))
+      Sweep['InstalledCapacity']=numpy.round(Sweep['InstalledCapacity'],2)
+      Sweep['AnnualCost']=numpy.round(Sweep['AnnualElectricity']*Sweep['CostPerkWh'],2)
+      if not HeatPumpModelFile:
+         del Sweep['HeatPump']
+      Front=numpy.concatenate([Rows[FindParetoFront(Sweep['InstalledCapacity'][Rows], Sweep['AnnualCost'][Rows])]
+                               for Rows in [numpy.flatnonzero(Sweep['CostPerkWh'] == Cost) for Cost in Costs]])
+      Pareto=collections.OrderedDict((Name, Values[Front]) for Name, Values in Sweep.items())
+      Stage['Samples']=len(Sweep['CostPerkWh'])
+   return(Sweep, Pareto)
+
+def PrintParetoFront(Pareto):
+   for Cost in numpy.unique(Pareto['CostPerkWh']):
+      Rows=numpy.flatnonzero(Pareto['CostPerkWh'] == Cost)
+      print("Pareto front @ "+Cost.__str__()+" Euro/kWh, "+len(Rows).__str__()+" points:")
+      for Row in Rows[numpy.unique(numpy.linspace(0, len(Rows)-1, min(SweepPrintPoints, len(Rows))).astype(numpy.int64))]:
+         HeatPumpString=" "+Pareto['HeatPump'][Row] if 'HeatPump' in Pareto else ""
+         print("  "+Pareto['InstalledCapacity'][Row].__str__()+" kW"+HeatPumpString+": "+Pareto['AnnualCost'][Row].__str__()+" Euro/Year @ "+Pareto['OutsideTemperatureOfInterest'][Row].__str__()+" C, "+Pareto['HoursForHeatingADay'][Row].__str__()+" h, "+Pareto['CubicMetersGasADayForWarmWaterAndCooking'][Row].__str__()+" m3/day")
+
+def RunSweep():
+   StartTime=time.time()
+   #LoadHouse with no config changes loads the house configured here.
+   Sweep, Pareto = CalculateSweep(LoadHouse({}))
+   WriteFits(Sweep, SweepResultFile)
+   WriteFits(Pareto, SweepParetoFile)
+   print("Sweep: "+len(Sweep['CostPerkWh']).__str__()+" combinations, "+FitSweepModel.cache_info().currsize.__str__()+" fits and "+EstimateSweepPoint.cache_info().currsize.__str__()+" estimates in "+round(time.time()-StartTime,3).__str__()+" s, results written to "+SweepResultFile+" and "+SweepParetoFile)
+   PrintParetoFront(Pareto)
+
+def ResetLiveState():
+   global LiveFetchFromDate
+   LiveState.clear()
+   LiveState.update({'Samples':collections.OrderedDict(), 'FitSums':numpy.zeros(6), 'FileOffset':0, 'PendingGas':{}})
+   LiveFetchFromDate=None
+
+def ReadNewCSVLines(FileName):
+   # Returns the complete lines added to the file since the last call, when the file got shorter it was rewritten and
+   # the live state is reset so all of it is read again.
+   with open(FileName, 'rb') as File:
+      File.seek(0, os.SEEK_END)
+      if File.tell() < LiveState['FileOffset']:
+         ResetLiveState()
+      File.seek(LiveState['FileOffset'])
+      Data=File.read()
+   LinesEnd=Data.rfind(b'\n')+1
+   LiveState['FileOffset']=LiveState['FileOffset']+LinesEnd
+   return([Line for Line in Data[:LinesEnd].decode('utf-8').splitlines() if Line.strip()])
+
+def GetLiveSamplesFromDomoticz():
+   global LiveFetchFromDate
+   Executor = GetDomoticzFetchExecutor()
+   OutdoorFetch = Executor.submit(GetOutdoorTemp)
+   if UseGasDataForHeatingEnergyEstimation:
+      HeatingEnergyFetch = Executor.submit(GetHeatingEnergyFromGasUsage)
+   else:
+      HeatingEnergyFetch = Executor.submit(GetHeatingEnergy)
+   Columns=CreateColumnsOfData([], OutdoorFetch.result(), HeatingEnergyFetch.result(), [])
+   #Only the days with both a temperature and energy, the last one is read again at the next poll since Domoticz
+   #still updates the running day.
+   Complete=~(numpy.isnan(Columns['OutdoorTemperature']) | numpy.isnan(Columns['Energy']))
+   Days=Columns['Date'][Complete].tolist()
+   if Days:
+      LiveFetchFromDate=Days[-1].date()
+   return(Days, Columns['OutdoorTemperature'][Complete], Columns['Energy'][Complete]/HoursForHeatingADay)
+
+def GetLiveSamplesFromCSVFile():
+   Lines=ReadNewCSVLines(CSVFile)
+   if not Lines:
+      return([], numpy.empty(0), numpy.empty(0))
+   OutdoorTempSamples, HeatingPowerSamples, IndoorTempSamples, ElectricitySamples = GetDataListsFromCSVFile(Lines)
+   #The file has no dates, so the samples are numbered.
+   FirstRow=len(LiveState['Samples'])
+   return(list(range(FirstRow, FirstRow+len(OutdoorTempSamples))), OutdoorTempSamples, HeatingPowerSamples)
+
+def GetLiveSamplesFromGasOnlyCSVFile():
+   Lines=ReadNewCSVLines(CSVGasOnlyFile)
+   if Lines:
+      GasDateSamples, GasEnergySamples = GetGasOnlyFromCSVFile(Lines)
+      LiveState['PendingGas'].update(zip(GasDateSamples.astype(datetime.date).tolist(), GasEnergySamples.tolist()))
+   Days=[]
    OutdoorTempSamples=[]
    HeatingPowerSamples=[]
-   for KNMIDate, KNMITemp in zip (KNMIDateSamples, KNMITempSamples):
-      for GasDate, GasEnergy in zip (GasDateSamples, GasEnergySamples):
-         if KNMIDate == GasDate:
-            OutdoorTempSamples.append(KNMITemp)
-            HeatingPowerSamples.append(GasEnergy)
-else:
-   OutdoorData = GetOutdoorTemp()
-   if UseGasDataForHeatingEnergyEstimation:
-      HeatingEnergyData = GetHeatingEnergyFromGasUsage()
+   if LiveState['PendingGas']:
+      KNMIDateSamples, KNMITempSamples = GetTemperaturesFromKNMI(sorted(LiveState['PendingGas']))
+      for Day, Temperature in zip(KNMIDateSamples, KNMITempSamples):
+         if Day in LiveState['PendingGas']:
+            Days.append(Day)
+            OutdoorTempSamples.append(Temperature)
+            HeatingPowerSamples.append(LiveState['PendingGas'].pop(Day))
+   return(Days, numpy.array(OutdoorTempSamples), numpy.array(HeatingPowerSamples))
+
+def UpdateLiveSamples(Days, OutdoorTempSamples, HeatingPowerSamples):
+   # Adds the samples to the running fit sums, the sample of a day that is already known is subtracted first.
+   # Returns the number of days that are new or have changed.
+   Samples=LiveState['Samples']
+   NewSamples=list(zip(numpy.asarray(OutdoorTempSamples).tolist(), numpy.asarray(HeatingPowerSamples).tolist()))
+   Replaced=[Samples[Day] for Day in Days if Day in Samples]
+   if Replaced:
+      ReplacedOutdoorTemp, ReplacedHeatingPower = zip(*Replaced)
+      LiveState['FitSums']=LiveState['FitSums']-CalculateFitSums(ReplacedOutdoorTemp, ReplacedHeatingPower)
+   LiveState['FitSums']=LiveState['FitSums']+CalculateFitSums(OutdoorTempSamples, HeatingPowerSamples)
+   Changed=len([Day for Day, Sample in zip(Days, NewSamples) if Samples.get(Day) != Sample])
+   Samples.update(zip(Days, NewSamples))
+   return(Changed)
+
+def CalculateLiveResults():
+   # Results from the running fit sums, without the samples and plot data.
+   Samples=LiveState['Samples']
+   Results={'Updated':datetime.datetime.now().isoformat(timespec='seconds'), 'Samples':len(Samples)}
+   if len(Samples) > 0:
+      Results.update({'FirstDay':str(next(iter(Samples))), 'LastDay':str(next(reversed(Samples)))})
+   if len(Samples) > 1:
+      HeatingPowerPerxxhGain, HeatingPowerPerxxhOffset, Correlation = [float(Value) for Value in SolveFitSums(LiveState['FitSums'])]
+      Results.update({'HeatingPowerPerxxhGain':HeatingPowerPerxxhGain, 'HeatingPowerPerxxhOffset':HeatingPowerPerxxhOffset,
+                      'Correlation':round(Correlation,3)})
+      Results.update(EstimateHeatingFromFit(HeatingPowerPerxxhGain, HeatingPowerPerxxhOffset))
+      Results['HeatingLimit']=float(Results['HeatingLimit'])
+      del Results['EnergyDistribution']
+   return(Results)
+
+def UpdateLive():
+   # Adds the new days and updates the results, returns the number of days that are new or have changed.
+   global DateEndAnalyses, LiveResults
+   DateEndAnalyses=datetime.date.today()
+   if GetDataFrom == DataSource.FromCSVFile:
+      Days, OutdoorTempSamples, HeatingPowerSamples = GetLiveSamplesFromCSVFile()
+   elif GetDataFrom == DataSource.FromCSVFileGasOnly:
+      Days, OutdoorTempSamples, HeatingPowerSamples = GetLiveSamplesFromGasOnlyCSVFile()
    else:
-      HeatingEnergyData = GetHeatingEnergy()
-   if EstimateAdditionalInternalAndExternalEnergy:
-      RawElectricEnergyData = GetTotalUsedElectricEnergy()
-      ElectricEnergyData = ProcessElectricEnergy(RawElectricEnergyData)
-      IndoorData = GetIndoorTemp()
-   #Create One dictionary of measurements, date+time based.
-   Measurements=CreateDictionaryOfData(IndoorData, OutdoorData, HeatingEnergyData, ElectricEnergyData)
-   # Now Create the lists of data for the fitting algorithm to use.
-   IndoorTempSamples, OutdoorTempSamples, HeatingPowerSamples, ElectricitySamples = GetDataListsFromDictionary(Measurements)
-
-# Fit a straight line over the energy points and calculate some points for the plot.
-HeatingPowerPerxxhGain, HeatingPowerPerxxhOffset, Correlation = FitHeatingAndTemperatureData(OutdoorTempSamples, HeatingPowerSamples)
-
-HeatingPowerMax=HeatingPowerPerxxhGain*PlotMinTemperature+HeatingPowerPerxxhOffset
-HeatingPowerMin=HeatingPowerPerxxhGain*PlotMaxTemperature+HeatingPowerPerxxhOffset
-PlotMaxPower = round(HeatingPowerMax,2)+1.5
-HeatingPowerFitline=[HeatingPowerMax,HeatingPowerMin]
-HeatingPowerFitlineTemp=[PlotMinTemperature,PlotMaxTemperature]
-HeatingLimit=(-1.0*HeatingPowerPerxxhOffset)/HeatingPowerPerxxhGain
-
-#When Outside Temperature of interest is higher than the temperature that does no require heating anymore,
-# make it the same, to prevent negative heating capacity values 
-if HeatingLimit < OutsideTemperatureOfInterest:
-   OutsideTemperatureOfInterest = round(HeatingLimit,2)
-
-DaysAlternativePower=round(CalculateDaysPerYearBelowTemperature(OutsideTemperatureOfInterest),1)
-HeatingPowerMinus15=HeatingPowerPerxxhGain*-15.0+HeatingPowerPerxxhOffset
-HeatingPowerTemperatureOffInterest=HeatingPowerPerxxhGain*OutsideTemperatureOfInterest+HeatingPowerPerxxhOffset
-AlternativePower=round(HeatingPowerMinus15-HeatingPowerTemperatureOffInterest,2)
-AlternativeEnergy=round(((HeatingPowerMinus15-HeatingPowerTemperatureOffInterest)*DaysAlternativePower*HoursForHeatingADay*0.5),2)
-AlternativeEnergyCost=round(CostPerkWh*AlternativeEnergy,2)
-
-PlotMinPower = 0.0
-if EstimateAdditionalInternalAndExternalEnergy:
-   AverageIndoorTemp = sum(IndoorTempSamples)/len(IndoorTempSamples)
-   PowerPointAtIndoorTemperature = HeatingPowerPerxxhGain*AverageIndoorTemp+HeatingPowerPerxxhOffset
-   PlotMinPower = PowerPointAtIndoorTemperature-1.0
-   ElectricPower = -1.0*((sum(ElectricitySamples)/len(ElectricitySamples))/HoursForHeatingADay)
-   PowerFromPeople = -1.0*(HeatFromWarmBodies/HoursForHeatingADay)
-   AverageInternalPower = ElectricPower + PowerFromPeople
-   AverageExternalPower = PowerPointAtIndoorTemperature - AverageInternalPower
-
-PlotData()
+      Days, OutdoorTempSamples, HeatingPowerSamples = GetLiveSamplesFromDomoticz()
+   with LiveLock, MeasureStage("UpdateLive") as Stage:
+      ChangedDays=UpdateLiveSamples(Days, OutdoorTempSamples, HeatingPowerSamples)
+      LiveResults=CalculateLiveResults()
+      Stage['Samples']=ChangedDays
+   return(ChangedDays)
+
+class LiveRequestHandler(BaseHTTPRequestHandler):
+   def do_GET(self):
+      with LiveLock:
+         Body=json.dumps(LiveResults, indent=3).encode('utf-8')
+      self.send_response(200)
+      self.send_header("Content-Type", "application/json")
+      self.send_header("Content-Length", str(len(Body)))
+      self.end_headers()
+      self.wfile.write(Body)
+
+   def log_message(self, Format, *Arguments):
+      pass
+
+class LiveHTTPServer(ThreadingMixIn, HTTPServer):
+   daemon_threads = True
+
+def RunLive():
+   if HourlyAnalysis:
+      raise ValueError("Live mode works per day, set HourlyAnalysis to False")
+   ResetLiveState()
+   Server=LiveHTTPServer((LiveHost, LivePort), LiveRequestHandler)
+   ServerThread=threading.Thread(target=Server.serve_forever)
+   ServerThread.daemon=True
+   ServerThread.start()
+   print("Live results on http://"+LiveHost+":"+Server.server_address[1].__str__()+"/")
+   try:
+      while True:
+         try:
+            NewDays=UpdateLive()
+            Results=LiveResults
+            if NewDays == 0:
+               pass
+            elif 'HeatingLimit' in Results:
+               print(Results['Updated']+": "+NewDays.__str__()+" new days, "+Results['Samples'].__str__()+" days, Power = "+round(Results['HeatingPowerPerxxhGain'],5).__str__()+" * temperature + "+round(Results['HeatingPowerPerxxhOffset'],3).__str__()+", Heating until "+round(Results['HeatingLimit'],2).__str__()+" C, "+round(Results['HeatingPowerTemperatureOffInterest'],2).__str__()+" kW @ "+Results['OutsideTemperatureOfInterest'].__str__()+" C, "+(Results['YearlyHeatingEnergy']/1000.0).__str__()+" MWh/Year")
+            else:
+               print(Results['Updated']+": "+NewDays.__str__()+" new days, not enough days to fit yet")
+         except (HTTPError, URLError, IOError, ValueError) as fout:
+            print("Error: "+str(fout))
+         time.sleep(LivePollSeconds)
+   except KeyboardInterrupt:
+      Server.shutdown()
+
+@contextlib.contextmanager
+def UsingConfig(Config):
+   # Sets the config parameters of Config for the with block and restores the previous ones after it. Holds the
+   # ConfigLock meanwhile, so calls with different configs from several threads wait for each other.
+   UnknownNames=[Name for Name in Config if Name not in ConfigParameterNames]
+   if UnknownNames:
+      raise ValueError("Unknown config parameters: "+", ".join(UnknownNames))
+   with ConfigLock:
+      PreviousConfig={Name:globals()[Name] for Name in Config}
+      globals().update(Config)
+      UpdateDomoticzURLs()
+      try:
+         yield(Config)
+      finally:
+         globals().update(PreviousConfig)
+         UpdateDomoticzURLs()
+
+def CreateConfig(**Settings):
+   # A config for the functions below, every config parameter with the value configured in this script, changed by
+   # the Settings given, e.g.: CreateConfig(GetDataFrom=DataSource.FromCSVFile, CSVFile="Home.csv")
+   Config=collections.OrderedDict((Name, DefaultConfig[Name]) for Name in ConfigParameterNames)
+   UnknownNames=[Name for Name in Settings if Name not in Config]
+   if UnknownNames:
+      raise ValueError("Unknown config parameters: "+", ".join(UnknownNames))
+   Config.update(Settings)
+   return(Config)
+
+def LoadHouse(Config):
+   # The samples of the house of Config, the keys are the sample names of AnalyseHouseData.
+   with UsingConfig(Config):
+      return(dict(zip(('OutdoorTempSamples', 'HeatingPowerSamples', 'IndoorTempSamples', 'ElectricitySamples', 'SampleDates'), LoadHouseData())))
+
+def FitHouse(Config, Samples):
+   # The HeatingCurveModel of Config fitted to the samples of LoadHouse, see FitHeatingModel.
+   with UsingConfig(Config):
+      return(FitHeatingModel(Samples['OutdoorTempSamples'], Samples['HeatingPowerSamples']))
+
+def EstimateHouse(Config, Model):
+   # The heating limit, power and yearly energy estimates of a model of FitHouse, see EstimateHeatingFromFit.
+   with UsingConfig(Config):
+      return(EstimateHeatingFromFit(Model['Gain'], Model['Offset'], Model['Limit']))
+
+def AnalyseHouse(Config, Samples=None):
+   # All results of the house of Config as in the Main part, the samples are loaded when not given.
+   with UsingConfig(Config):
+      if Samples is None:
+         Samples=LoadHouse(Config)
+      return(AnalyseHouseData(**Samples))
+
+def SweepHouse(Config, Samples=None):
+   # The results of all combinations of the sweep values of Config and their Pareto front, see CalculateSweep.
+   with UsingConfig(Config):
+      if Samples is None:
+         Samples=LoadHouse(Config)
+      return(CalculateSweep(Samples))
+
+def RenderHouseReport(Config, Results, FileName=None):
+   # Writes the report of the results of AnalyseHouse to FileName, or the ReportFileName of Config, in each of
+   # the ReportFileFormats without a display. Returns the files written.
+   with UsingConfig(Config):
+      return(RenderReportFiles(Results, FileName or ReportFileName))
+
+##############################################################################################################
+# Main
+##############################################################################################################
+if __name__ == "__main__":
+   if BatchManifestFile:
+      RunBatch()
+      if InstrumentStages:
+         PrintStageSummary()
+   elif SweepMode:
+      RunSweep()
+      if InstrumentStages:
+         PrintStageSummary()
+   elif LiveMode:
+      RunLive()
+   else:
+      Results=AnalyseHouseData(*LoadHouseData())
+      PrintResults(Results)
+      if HeatPumpModelFile:
+         WriteHeatPumpResults(Results)
+      if SnapshotExportFile:
+         WriteHouseSnapshot(Results)
+         print("Snapshot written to: "+SnapshotExportFile)
+      if RollingFitDays > 0:
+         SeasonFits=WriteRollingFits(Results)
+         if SeasonFits is not None:
+            PrintSeasonFits(SeasonFits)
+      if RenderReport == RenderMode.Window:
+         PlotData(Results)
+      elif RenderReport == RenderMode.File:
+         Report=SubmitReportRender(Results, ReportFileName)
+         print("Report written to: "+", ".join(Report.result()))
+         WaitForReportRenders()
+      if InstrumentStages:
+         PrintStageSummary()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+##############################################################################################################
+# HouseHeatingCurveBenchmark.py
+# Last Update: October 16th 2026
+# V0.1 : Initial Creation, scaling of the KNMI/Gas date matching on synthetic series.
+# V0.2 : Added timing of every stage of HouseHeatingCurve.py on synthetic houses with local Domoticz and KNMI
+#        stand-ins, written to a JSON file that can be compared with the results of an earlier commit.
+##############################################################################################################
+#
+# This script measures the performance of parts of HouseHeatingCurve.py on synthetic data, so no Domoticz, KNMI
+# or data files are needed. HouseHeatingCurve.py must be in the same directory.
+#
+# Date Join:
+##########################
+# Synthetic gas and KNMI series of [BenchmarkYears] years are matched with the nested date loop that was used
+# before V0.6 of HouseHeatingCurve.py and with JoinDateSeries. [MissingGasDayFraction] of the gas days are left
+# out to have unmatched dates in the join. Set [BenchmarkDateJoinScaling] to False to skip this.
+#
+# Stages:
+##########################
+# For each number of days in [StageBenchmarkDays] a synthetic house and weather are generated, with a heating power
+# noise of [StageBenchmarkNoise] kW, and each stage of HouseHeatingCurve.py is timed [StageBenchmarkRepeats] times
+# ([StageBenchmarkRenderRepeats] times for rendering the report): reading the .csv files, querying and parsing
+# Domoticz, merging the sensors into columns, querying and parsing the KNMI, reading the KNMI cache, matching gas
+# and KNMI dates, the fit of every model, the days per year below a temperature, the whole analyses and the report.
+# When [StageBenchmarkAdditionalSensors] is True the indoor temperature and electricity sensors are used as well.
+# Domoticz and the KNMI are replaced by local HTTP servers serving the synthetic data.
+#
+# Per stage the latency percentiles, the samples per second at the median and the peak memory (measured in one
+# extra run with tracemalloc) are printed and written to [BenchmarkResultFile] together with the git commit.
+# When [BenchmarkBaselineFile] is set to the result file of an earlier commit, stages with a median more than
+# [BenchmarkRegressionFactor] times slower are reported and the script exits with an error.
+#
+##############################################################################################################
+# Imports
+##############################################################################################################
+import datetime
+import random
+import time
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+import numpy
+import HouseHeatingCurve
+
+##############################################################################################################
+# Config Start                                                                                               #
+##############################################################################################################
+BenchmarkYears=[1, 2, 5, 10]
+MissingGasDayFraction=0.05
+BenchmarkRandomSeed=1
+BenchmarkDateJoinScaling=True
+
+StageBenchmarkDays=[365, 3650]
+StageBenchmarkNoise=0.3
+StageBenchmarkAdditionalSensors=True
+StageBenchmarkRepeats=20
+StageBenchmarkRenderRepeats=3
+
+BenchmarkResultFile="BenchmarkResults.json"
+BenchmarkBaselineFile=""
+BenchmarkRegressionFactor=1.25
+##############################################################################################################
+# Config End                                                                                                 #
+##############################################################################################################
+
+#Station of the synthetic KNMI data, the sensor IDs of the Domoticz stand-in are the ones configured in
+#HouseHeatingCurve.py.
+SyntheticStationName="Volkel"
+SyntheticFirstDate=datetime.date(2010,1,1)
+
+##############################################################################################################
+# Functions
+##############################################################################################################
+
+def CreateSyntheticSeries(Years):
+   FirstDate=datetime.date(2010,1,1)
+   KNMIDateSamples=[FirstDate+datetime.timedelta(days=Day) for Day in range(int(Years*365.25))]
+   KNMITempSamples=[round(random.uniform(-10.0,25.0),1) for Date in KNMIDateSamples]
+   GasDateSamples=[Date for Date in KNMIDateSamples if random.random() >= MissingGasDayFraction]
+   GasEnergySamples=[round(random.uniform(0.0,1.5),3) for Date in GasDateSamples]
+   return(GasDateSamples, GasEnergySamples, KNMIDateSamples, KNMITempSamples)
+
+def NestedLoopJoin(GasDateSamples, GasEnergySamples, KNMIDateSamples, KNMITempSamples):
+   #The date matching as it was done before V0.6 of HouseHeatingCurve.py
+   OutdoorTempSamples=[]
+   HeatingPowerSamples=[]
+   for KNMIDate, KNMITemp in zip (KNMIDateSamples, KNMITempSamples):
+      for GasDate, GasEnergy in zip (GasDateSamples, GasEnergySamples):
+         if KNMIDate == GasDate:
+            OutdoorTempSamples.append(KNMITemp)
+            HeatingPowerSamples.append(GasEnergy)
+   return(OutdoorTempSamples, HeatingPowerSamples)
+
+def TimeFunction(Function, *Arguments):
+   StartTime=time.perf_counter()
+   Result=Function(*Arguments)
+   return(time.perf_counter()-StartTime, Result)
+
+def BenchmarkDateJoin():
+   print("Years    Days   NestedLoop[s]  Inner[s]  Left[s]  Nearest[s]  Speedup")
+   for Years in BenchmarkYears:
+      GasDateSamples, GasEnergySamples, KNMIDateSamples, KNMITempSamples = CreateSyntheticSeries(Years)
+      NestedTime, NestedResult = TimeFunction(NestedLoopJoin, GasDateSamples, GasEnergySamples, KNMIDateSamples, KNMITempSamples)
+      JoinTimes=[]
+      for Join in (HouseHeatingCurve.JoinType.Inner, HouseHeatingCurve.JoinType.Left, HouseHeatingCurve.JoinType.Nearest):
+         JoinTime, JoinResult = TimeFunction(HouseHeatingCurve.JoinDateSeries, GasDateSamples, GasEnergySamples, KNMIDateSamples, KNMITempSamples, Join)
+         JoinTimes.append(JoinTime)
+         if Join == HouseHeatingCurve.JoinType.Inner and sorted(JoinResult[2]) != sorted(NestedResult[0]):
+            print("Error: Inner join result differs from the nested loop result for "+Years.__str__()+" years")
+      print("%5d %7d %15.4f %9.4f %8.4f %11.4f %8.0f" % (Years, len(KNMIDateSamples), NestedTime, JoinTimes[0], JoinTimes[1], JoinTimes[2], NestedTime/JoinTimes[0]))
+
+def CreateSyntheticHouse(Days, Noise):
+   # A house heated below 16 C with a hot water base load, a yearly temperature cycle with day to day variation
+   # and MissingGasDayFraction of the days missing in the gas data.
+   Generator=numpy.random.default_rng(BenchmarkRandomSeed)
+   Dates=numpy.datetime64(SyntheticFirstDate)+numpy.arange(Days)
+   OutdoorTemperature=numpy.round(10.0-8.0*numpy.cos(2.0*numpy.pi*(numpy.arange(Days)-20)/365.25)+Generator.normal(0.0, 3.0, Days), 1)
+   HeatingPower=numpy.maximum(0.0, 0.35*(16.0-OutdoorTemperature))+0.3+Generator.normal(0.0, Noise, Days)
+   HeatingEnergy=numpy.round(numpy.maximum(0.0, HeatingPower*HouseHeatingCurve.HoursForHeatingADay), 3)
+   Gas=numpy.round(HeatingEnergy/HouseHeatingCurve.EnergyPerCubicMeterGas+HouseHeatingCurve.CubicMetersGasADayForWarmWaterAndCooking, 3)
+   return({'Dates':Dates, 'OutdoorTemperature':OutdoorTemperature, 'HeatingEnergy':HeatingEnergy, 'Gas':Gas,
+           'IndoorTemperature':numpy.round(20.5+Generator.normal(0.0, 0.5, Days), 2),
+           'Electricity':numpy.round(8.0+Generator.normal(0.0, 2.0, Days), 3),
+           'GasDays':Generator.random(Days) >= MissingGasDayFraction})
+
+def WriteSyntheticCSVFiles(House, Directory):
+   CSVFile=os.path.join(Directory, "Synthetic.csv")
+   with open(CSVFile, 'w') as File:
+      for Row in zip(House['OutdoorTemperature'], House['HeatingEnergy'], House['IndoorTemperature'], House['Electricity']):
+         File.write("%s,%s,%s,%s\n" % Row)
+   CSVGasOnlyFile=os.path.join(Directory, "SyntheticGasOnly.csv")
+   with open(CSVGasOnlyFile, 'w') as File:
+      for Date, Gas in zip(House['Dates'][House['GasDays']], House['Gas'][House['GasDays']]):
+         File.write("%s,%s\n" % (Date, Gas))
+   return(CSVFile, CSVGasOnlyFile)
+
+def CreateKNMIResponse(House, StationID, FirstDate, LastDate):
+   # The KNMI daily data of the synthetic house between FirstDate and LastDate, in the format of the KNMI site.
+   Dates=House['Dates']
+   InSpan=(Dates >= numpy.datetime64(FirstDate)) & (Dates <= numpy.datetime64(LastDate))
+   Lines=["# BRON: KONINKLIJK NEDERLANDS METEOROLOGISCH INSTITUUT (KNMI)", "# ", "# STN,YYYYMMDD,   TG", "# "]
+   for Date, Temperature in zip(Dates[InSpan].astype(datetime.date), House['OutdoorTemperature'][InSpan]):
+      Lines.append("  %s,%s,%5d" % (StationID, Date.strftime('%Y%m%d'), int(round(Temperature*10.0))))
+   return(("\n".join(Lines)+"\n").encode('utf-8'))
+
+def CreateDomoticzResponses(House):
+   # The Domoticz graph responses of the synthetic house per sensor ID, like Domoticz sends them.
+   DateStrings=House['Dates'].astype(str).tolist()
+   CumulativeEnergy=1000.0+numpy.cumsum(House['HeatingEnergy'])
+   Results={
+      HouseHeatingCurve.OutDoorTemperatureSensorID:[{'d':Date, 'ta':Value, 'te':Value+3.0, 'tm':Value-3.0} for Date, Value in zip(DateStrings, House['OutdoorTemperature'].tolist())],
+      HouseHeatingCurve.InDoorTemperatureSensorID:[{'d':Date, 'ta':Value, 'te':Value+1.0, 'tm':Value-1.0} for Date, Value in zip(DateStrings, House['IndoorTemperature'].tolist())],
+      HouseHeatingCurve.HeatingEnergySensorID:[{'d':Date, 'v_max':round(Maximum,3), 'v_min':round(Maximum-Energy,3)} for Date, Maximum, Energy in zip(DateStrings, CumulativeEnergy.tolist(), House['HeatingEnergy'].tolist())],
+      HouseHeatingCurve.GasSensorID:[{'d':Date, 'v':Value} for Date, Value in zip(DateStrings, House['Gas'].tolist())],
+      HouseHeatingCurve.TotalElectricSensorID:[{'d':Date, 'v':Value} for Date, Value in zip(DateStrings, House['Electricity'].tolist())]}
+   return({SensorID:json.dumps({'result':Result, 'status':'OK', 'title':'Graph'}).encode('utf-8') for SensorID, Result in Results.items()})
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+   # Answers Domoticz graph queries (GET) and KNMI daily data queries (POST) from the synthetic house of the server.
+   protocol_version="HTTP/1.1"
+   #Headers and body are written separately, without this the kept open connections wait for delayed ACKs.
+   disable_nagle_algorithm=True
+
+   def do_GET(self):
+      Query=parse_qs(urlsplit(self.path).query)
+      Body=self.server.DomoticzResponses.get(Query.get('idx', [""])[0])
+      self.SendBody(Body)
+
+   def do_POST(self):
+      Query=parse_qs(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+      FirstDate=datetime.datetime.strptime(Query['start'][0], '%Y%m%d').date()
+      LastDate=datetime.datetime.strptime(Query['end'][0], '%Y%m%d').date()
+      self.SendBody(CreateKNMIResponse(self.server.House, Query['stns'][0], FirstDate, LastDate))
+
+   def SendBody(self, Body):
+      if Body is None:
+         self.send_error(404)
+         return
+      self.send_response(200)
+      self.send_header('Content-Length', str(len(Body)))
+      self.end_headers()
+      self.wfile.write(Body)
+
+   def log_message(self, Format, *Arguments):
+      pass
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+   daemon_threads=True
+
+def StartStandInServer(House):
+   # Serves the synthetic house on a free local port in a background thread, returns the server and its URL.
+   Server=StandInServer(('127.0.0.1', 0), StandInRequestHandler)
+   Server.House=House
+   Server.DomoticzResponses=CreateDomoticzResponses(House)
+   threading.Thread(target=Server.serve_forever, daemon=True).start()
+   return(Server, "http://127.0.0.1:"+Server.server_address[1].__str__()+"/")
+
+def SetSyntheticHouseParameters(House, CSVFile, CSVGasOnlyFile, URL, KNMICacheFile):
+   HouseHeatingCurve.CSVFile=CSVFile
+   HouseHeatingCurve.CSVGasOnlyFile=CSVGasOnlyFile
+   HouseHeatingCurve.KNMIStationToUse=SyntheticStationName
+   HouseHeatingCurve.KNMIDataURL=URL
+   HouseHeatingCurve.KNMICacheFile=KNMICacheFile
+   HouseHeatingCurve.DomoticzHostAndPort=URL
+   HouseHeatingCurve.UpdateDomoticzURLs()
+   HouseHeatingCurve.DateStartAnalyses=SyntheticFirstDate
+   HouseHeatingCurve.DateEndAnalyses=House['Dates'][-1].astype(datetime.date)
+   HouseHeatingCurve.EstimateAdditionalInternalAndExternalEnergy=StageBenchmarkAdditionalSensors
+   HouseHeatingCurve.UseGasDataForHeatingEnergyEstimation=False
+   HouseHeatingCurve.RenderReport=HouseHeatingCurve.RenderMode.Off
+
+def TimeStage(Stage, Days, Samples, Repeats, Function, *Arguments):
+   # Runs Function Repeats times for the latencies and once more with tracemalloc for the peak memory, returns
+   # the result of the last run and the measurements of the stage.
+   Latencies=[]
+   for Repeat in range(Repeats):
+      Latency, Result = TimeFunction(Function, *Arguments)
+      Latencies.append(Latency)
+   tracemalloc.start()
+   Function(*Arguments)
+   PeakMemory=tracemalloc.get_traced_memory()[1]
+   tracemalloc.stop()
+   P50, P90, P99 = numpy.percentile(Latencies, [50, 90, 99]).tolist()
+   Measurement={'Stage':Stage, 'Days':Days, 'Samples':Samples, 'Repeats':Repeats, 'MinSeconds':min(Latencies),
+                'P50Seconds':P50, 'P90Seconds':P90, 'P99Seconds':P99, 'MaxSeconds':max(Latencies),
+                'SamplesPerSecond':Samples/P50 if P50 > 0 else None, 'PeakMemoryBytes':PeakMemory}
+   print("%-22s %7d %8d %11.3f %11.3f %11.3f %13.0f %12d" % (Stage, Days, Samples, P50*1000.0, P90*1000.0, P99*1000.0, Measurement['SamplesPerSecond'] or 0.0, PeakMemory))
+   return(Result, Measurement)
+
+def BenchmarkStages(Days, Directory):
+   House=CreateSyntheticHouse(Days, StageBenchmarkNoise)
+   CSVFile, CSVGasOnlyFile = WriteSyntheticCSVFiles(House, Directory)
+   Server, URL = StartStandInServer(House)
+   KNMICacheFile=os.path.join(Directory, "SyntheticKNMICache"+Days.__str__()+".sqlite")
+   SetSyntheticHouseParameters(House, CSVFile, CSVGasOnlyFile, URL, "")
+   StationID=HouseHeatingCurve.StationIDDictionary[SyntheticStationName]
+   FirstDate=SyntheticFirstDate
+   LastDate=House['Dates'][-1].astype(datetime.date)
+   KNMIResponse=CreateKNMIResponse(House, StationID, FirstDate, LastDate)
+   Repeats=StageBenchmarkRepeats
+   Measurements=[]
+   def Measure(Stage, Samples, Function, *Arguments, **Options):
+      Result, Measurement = TimeStage(Stage, Days, Samples, Options.get('Repeats', Repeats), Function, *Arguments)
+      Measurements.append(Measurement)
+      return(Result)
+   try:
+      #Ingestion
+      OutdoorTempSamples, HeatingPowerSamples, IndoorTempSamples, ElectricitySamples = Measure("ReadCSVFile", Days, HouseHeatingCurve.GetDataListsFromCSVFile)
+      GasDateSamples, GasEnergySamples = Measure("ReadGasOnlyCSVFile", int(House['GasDays'].sum()), HouseHeatingCurve.GetGasOnlyFromCSVFile)
+      HouseHeatingCurve.GetDataFrom=HouseHeatingCurve.DataSource.FromDomoticz
+      Measure("LoadDomoticz", Days, HouseHeatingCurve.LoadHouseData)
+      SensorData=(HouseHeatingCurve.GetIndoorTemp(), HouseHeatingCurve.GetOutdoorTemp(), HouseHeatingCurve.GetHeatingEnergy(),
+                  HouseHeatingCurve.ProcessElectricEnergy(HouseHeatingCurve.GetTotalUsedElectricEnergy()))
+      Measure("MergeDomoticzColumns", Days, lambda: HouseHeatingCurve.GetDataListsFromColumns(HouseHeatingCurve.CreateColumnsOfData(*SensorData)))
+      Measure("ParseKNMIData", Days, HouseHeatingCurve.ParseKNMIData, KNMIResponse, StationID)
+      Measure("FetchKNMI", Days, HouseHeatingCurve.GetStationTemperatures, StationID, FirstDate, LastDate)
+      HouseHeatingCurve.KNMICacheFile=KNMICacheFile
+      KNMIDateSamples, KNMITempSamples = HouseHeatingCurve.GetStationTemperatures(StationID, FirstDate, LastDate)
+      Measure("ReadKNMICache", Days, HouseHeatingCurve.GetStationTemperatures, StationID, FirstDate, LastDate)
+      Measure("JoinGasAndKNMI", len(GasDateSamples), HouseHeatingCurve.JoinDateSeries, GasDateSamples, GasEnergySamples, KNMIDateSamples, KNMITempSamples)
+      #Analyses of the samples read from the .csv file
+      HouseHeatingCurve.GetDataFrom=HouseHeatingCurve.DataSource.FromCSVFile
+      for Model in HouseHeatingCurve.FitModel:
+         HouseHeatingCurve.HeatingCurveModel=Model
+         Measure("Fit"+Model.name, Days, HouseHeatingCurve.FitHeatingModel, OutdoorTempSamples, HeatingPowerSamples)
+      HouseHeatingCurve.HeatingCurveModel=HouseHeatingCurve.FitModel.Linear
+      Measure("DaysPerYearBelow", Days, HouseHeatingCurve.CalculateDaysPerYearBelowTemperature, OutdoorTempSamples)
+      Results=Measure("AnalyseHouseData", Days, HouseHeatingCurve.AnalyseHouseData, OutdoorTempSamples, HeatingPowerSamples, IndoorTempSamples, ElectricitySamples)
+      Measure("RenderReport", Days, HouseHeatingCurve.RenderReportFiles, Results, os.path.join(Directory, "SyntheticReport"), Repeats=StageBenchmarkRenderRepeats)
+   finally:
+      Server.shutdown()
+      Server.server_close()
+   return(Measurements)
+
+def GetGitCommit():
+   # The commit of the scripts and whether they were changed since, empty when this is not a git checkout.
+   Directory=os.path.dirname(os.path.abspath(__file__))
+   try:
+      Commit=subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=Directory, capture_output=True, text=True, check=True).stdout.strip()
+      Changes=subprocess.run(['git', 'status', '--porcelain', '--', 'HouseHeatingCurve.py', 'HouseHeatingCurveBenchmark.py'], cwd=Directory, capture_output=True, text=True, check=True).stdout.strip()
+   except (OSError, subprocess.CalledProcessError):
+      return("", False)
+   return(Commit, bool(Changes))
+
+def CompareWithBaseline(Report, BaselineFile):
+   # Prints the median of each stage against the baseline, returns the stages that got slower than allowed.
+   with open(BaselineFile) as File:
+      Baseline=json.load(File)
+   BaselineStages={(Stage['Stage'], Stage['Days']):Stage for Stage in Baseline['Stages']}
+   print("Compared with "+Baseline['Commit'][:12]+" ("+Baseline['Date']+"):")
+   Regressions=[]
+   for Stage in Report['Stages']:
+      Previous=BaselineStages.get((Stage['Stage'], Stage['Days']))
+      if Previous is None or Previous['P50Seconds'] <= 0:
+         continue
+      Ratio=Stage['P50Seconds']/Previous['P50Seconds']
+      Flag=""
+      if Ratio > BenchmarkRegressionFactor:
+         Flag="  REGRESSION"
+         Regressions.append(Stage['Stage']+" "+Stage['Days'].__str__())
+      print("%-22s %7d %11.3f %11.3f %7.2fx%s" % (Stage['Stage'], Stage['Days'], Previous['P50Seconds']*1000.0, Stage['P50Seconds']*1000.0, Ratio, Flag))
+   return(Regressions)
+
+def RunStageBenchmarks():
+   print("Stage                     Days  Samples     p50[ms]     p90[ms]     p99[ms]  Samples/s  PeakMem[B]")
+   Stages=[]
+   with tempfile.TemporaryDirectory() as Directory:
+      for Days in StageBenchmarkDays:
+         Stages.extend(BenchmarkStages(Days, Directory))
+   Commit, Changed = GetGitCommit()
+   Report={'Commit':Commit, 'Changed':Changed, 'Date':datetime.datetime.now().isoformat(timespec='seconds'),
+           'Python':platform.python_version(), 'Numpy':numpy.__version__, 'Platform':platform.platform(),
+           'Config':{'Days':StageBenchmarkDays, 'Noise':StageBenchmarkNoise, 'AdditionalSensors':StageBenchmarkAdditionalSensors,
+                     'Repeats':StageBenchmarkRepeats, 'RenderRepeats':StageBenchmarkRenderRepeats, 'Seed':BenchmarkRandomSeed},
+           'Stages':Stages}
+   with open(BenchmarkResultFile, 'w') as File:
+      json.dump(Report, File, indent=1)
+   print("Results written to "+BenchmarkResultFile)
+   Regressions=[]
+   if BenchmarkBaselineFile:
+      Regressions=CompareWithBaseline(Report, BenchmarkBaselineFile)
+   return(Regressions)
+
+##############################################################################################################
+# Main
+##############################################################################################################
+if __name__ == "__main__":
+   random.seed(BenchmarkRandomSeed)
+   if BenchmarkDateJoinScaling:
+      BenchmarkDateJoin()
+   Regressions=RunStageBenchmarks()
+   if Regressions:
+      print("Error: stages slower than "+BenchmarkRegressionFactor.__str__()+" times the baseline: "+", ".join(Regressions))
+      sys.exit(1)